@@ -1,5 +1,5 @@
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { generateMetadata } from './services/geminiService';
 import { Metadata, AnalysisRecord, BatchItem, SupabaseSession } from './types';
 import Header from './components/Header';
@@ -26,14 +26,19 @@ interface ToastState {
   type: 'success' | 'error' | 'info';
 }
 
-interface DbHistoryRecord {
+// Lightweight history entry; the full result is loaded via GET /history/{id}
+interface DbHistorySummary {
   id: number;
-  user_id: string;
   file_name: string;
-  result: string; // Comes as a JSON string from the DB
+  summary: Partial<Metadata>;
   timestamp: string;
 }
 
+interface DbHistoryPage {
+  items: DbHistorySummary[];
+  next_cursor: string | null;
+}
+
 export default function App() {
   const [batch, setBatch] = useState<BatchItem[]>([]);
   const [isProcessingBatch, setIsProcessingBatch] = useState(false);
@@ -41,6 +46,8 @@ export default function App() {
   const [activeAnalysis, setActiveAnalysis] = useState<BatchItem | null>(null);
 
   const [analysisHistory, setAnalysisHistory] = useState<AnalysisRecord[]>([]);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
+  const [isLoadingHistory, setIsLoadingHistory] = useState(false);
   const [theme, setTheme] = useState<Theme>('dark');
   const [toastMessage, setToastMessage] = useState<ToastState | null>(null);
   const [isProMode, setIsProMode] = useState(false);
@@ -66,36 +73,45 @@ export default function App() {
     }
   }, []);
 
-  useEffect(() => {
-    const fetchHistory = async () => {
-      if (session) {
-        try {
-          const response = await fetch('/history', {
-            headers: { 'Authorization': `Bearer ${session.access_token}` }
-          });
-          if (response.ok) {
-            const dbRecords: DbHistoryRecord[] = await response.json();
-            const mappedHistory: AnalysisRecord[] = dbRecords.map(rec => ({
-              id: rec.id.toString(),
-              metadata: typeof rec.result === 'string' ? JSON.parse(rec.result) : rec.result,
-              inputType: 'file',
-              input: { fileName: rec.file_name }
-            }));
-            setAnalysisHistory(mappedHistory);
-          } else {
-            setAnalysisHistory([]);
-          }
-        } catch (error) {
-          console.error("Error fetching history:", error);
-          setAnalysisHistory([]);
-        }
-      } else {
+  // /history is paginated; each page is appended and next_cursor loads the next
+  const loadHistoryPage = useCallback(async (cursor: string | null) => {
+    if (!session) return;
+    setIsLoadingHistory(true);
+    try {
+      const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`/history${params}`, {
+        headers: { 'Authorization': `Bearer ${session.access_token}` }
+      });
+      if (response.ok) {
+        const page: DbHistoryPage = await response.json();
+        const mappedHistory: AnalysisRecord[] = page.items.map(rec => ({
+          id: rec.id.toString(),
+          metadata: rec.summary as Metadata,
+          inputType: 'file',
+          input: { fileName: rec.file_name }
+        }));
+        setAnalysisHistory(prev => (cursor ? [...prev, ...mappedHistory] : mappedHistory));
+        setHistoryCursor(page.next_cursor);
+      } else if (!cursor) {
         setAnalysisHistory([]);
       }
-    };
-    fetchHistory();
+    } catch (error) {
+      console.error("Error fetching history:", error);
+      if (!cursor) setAnalysisHistory([]);
+    } finally {
+      setIsLoadingHistory(false);
+    }
   }, [session]);
 
+  useEffect(() => {
+    setHistoryCursor(null);
+    if (session) {
+      loadHistoryPage(null);
+    } else {
+      setAnalysisHistory([]);
+    }
+  }, [session, loadHistoryPage]);
+
   // --- THEME ---
   useEffect(() => {
     if (theme === 'dark') {
@@ -380,7 +396,12 @@ export default function App() {
             )}
 
             {view === 'history' && (
-              <HistoryPanel history={analysisHistory} />
+              <HistoryPanel
+                history={analysisHistory}
+                hasMore={historyCursor !== null}
+                isLoadingMore={isLoadingHistory}
+                onLoadMore={() => loadHistoryPage(historyCursor)}
+              />
             )}
           </main>
 
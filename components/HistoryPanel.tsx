@@ -5,9 +5,12 @@ import { Music, Lightbulb } from './icons';
 interface HistoryPanelProps {
   history: AnalysisRecord[];
   onSelectItem: (record: AnalysisRecord) => void;
+  hasMore?: boolean;
+  isLoadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
-const HistoryPanel: React.FC<HistoryPanelProps> = ({ history, onSelectItem }) => {
+const HistoryPanel: React.FC<HistoryPanelProps> = ({ history, onSelectItem, hasMore, isLoadingMore, onLoadMore }) => {
   const getTitle = (record: AnalysisRecord) => {
     if (record.inputType === 'idea') {
       return record.input.description || 'Generated idea';
@@ -40,6 +43,15 @@ const HistoryPanel: React.FC<HistoryPanelProps> = ({ history, onSelectItem }) =>
             </div>
           </button>
         ))}
+        {hasMore && onLoadMore && (
+          <button
+            onClick={onLoadMore}
+            disabled={isLoadingMore}
+            className="w-full py-2 text-sm font-semibold rounded-lg border border-slate-300 dark:border-slate-700 text-slate-600 dark:text-slate-300 hover:bg-slate-100 dark:hover:bg-slate-800 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading…' : 'Load more'}
+          </button>
+        )}
       </div>
     </div>
   );
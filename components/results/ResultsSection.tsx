@@ -242,7 +242,7 @@ const ResultsSection: React.FC<ResultsSectionProps> = ({ isLoading, error, resul
 
       {isOriginalFileAvailable ? (
         <div className="animate-slide-up" style={{ animationDelay: '100ms' }}>
-          <WaveformDisplay file={uploadedFile} theme={theme} />
+          <WaveformDisplay file={uploadedFile} trackKey={results.trackKey} theme={theme} />
         </div>
       ) : (
         <div className="p-4 bg-slate-100 dark:bg-slate-800/50 rounded-lg text-center text-sm text-slate-500 dark:text-slate-400 animate-slide-up">
@@ -2,13 +2,36 @@
 import React, { useEffect, useRef, useState } from 'react';
 import WaveSurfer from 'wavesurfer.js';
 import { Play, Pause, BarChart, Zap } from '../icons';
+import { API_BASE_URL } from '../../services/geminiService';
 
 interface WaveformDisplayProps {
   file: File;
+  trackKey?: string; // core.track_key: draw the stored peaks instead of decoding the file
   theme: 'light' | 'dark';
 }
 
-const WaveformDisplay: React.FC<WaveformDisplayProps> = ({ file, theme }) => {
+interface StoredPeaks {
+  peaks: number[];
+  duration: number;
+}
+
+// Peaks precomputed at analysis time (audiowaveform JSON, min/max pairs)
+const fetchPeaks = async (trackKey: string): Promise<StoredPeaks | null> => {
+  try {
+    const res = await fetch(`${API_BASE_URL}/waveform/${trackKey}.json`);
+    if (!res.ok) return null;
+    const data = await res.json();
+    const scale = 2 ** (data.bits - 1);
+    return {
+      peaks: data.data.map((v: number) => v / scale),
+      duration: (data.length * data.samples_per_pixel) / data.sample_rate,
+    };
+  } catch {
+    return null;
+  }
+};
+
+const WaveformDisplay: React.FC<WaveformDisplayProps> = ({ file, trackKey, theme }) => {
   const containerRef = useRef<HTMLDivElement>(null);
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const wavesurferRef = useRef<WaveSurfer | null>(null);
@@ -21,57 +44,76 @@ const WaveformDisplay: React.FC<WaveformDisplayProps> = ({ file, theme }) => {
 
   useEffect(() => {
     if (!containerRef.current) return;
-
-    // Create WaveSurfer
-    const ws = WaveSurfer.create({
-      container: containerRef.current,
-      waveColor: theme === 'dark' ? '#4b5563' : '#cbd5e1',
-      progressColor: '#8b5cf6',
-      cursorColor: '#8b5cf6',
-      barWidth: 2,
-      barRadius: 3,
-      barGap: 2,
-      height: 80,
-      url: URL.createObjectURL(file),
-      normalize: true,
-    });
-
-    wavesurferRef.current = ws;
-
-    ws.on('play', () => setIsPlaying(true));
-    ws.on('pause', () => setIsPlaying(false));
-    ws.on('finish', () => setIsPlaying(false));
-    ws.on('ready', () => setIsReady(true));
+    const container = containerRef.current;
+    const url = URL.createObjectURL(file);
+    let cancelled = false;
+    let instance: WaveSurfer | null = null;
+
+    const attachHandlers = (ws: WaveSurfer) => {
+      ws.on('play', () => setIsPlaying(true));
+      ws.on('pause', () => setIsPlaying(false));
+      ws.on('finish', () => setIsPlaying(false));
+      ws.on('ready', () => setIsReady(true));
     
-    // Setup Web Audio API Analyser when ready
-    ws.on('ready', () => {
-        const mediaElement = ws.getMediaElement();
-        if (mediaElement) {
-            // Check if context is locked (browser policy)
-            const audioContext = new (window.AudioContext || (window as any).webkitAudioContext)();
-            const source = audioContext.createMediaElementSource(mediaElement);
-            const analyser = audioContext.createAnalyser();
+      // Setup Web Audio API Analyser when ready
+      ws.on('ready', () => {
+          const mediaElement = ws.getMediaElement();
+          if (mediaElement) {
+              // Check if context is locked (browser policy)
+              const audioContext = new (window.AudioContext || (window as any).webkitAudioContext)();
+              const source = audioContext.createMediaElementSource(mediaElement);
+              const analyser = audioContext.createAnalyser();
             
-            analyser.fftSize = 256; // Resolution
-            source.connect(analyser);
-            analyser.connect(audioContext.destination);
+              analyser.fftSize = 256; // Resolution
+              source.connect(analyser);
+              analyser.connect(audioContext.destination);
             
-            // Override wavesurfer internal connecting to prevent double audio
-            // Note: This is a simplified integration, wavesurfer 7 handles this well usually
-            analyserRef.current = analyser;
-        }
-    });
+              // Override wavesurfer internal connecting to prevent double audio
+              // Note: This is a simplified integration, wavesurfer 7 handles this well usually
+              analyserRef.current = analyser;
+          }
+      });
+
+      ws.on('destroy', () => {
+          if (animationRef.current) cancelAnimationFrame(animationRef.current);
+      });
+    };
+
+    const setup = async () => {
+      // With stored peaks WaveSurfer only streams the file for playback;
+      // without them it falls back to decoding the whole file
+      const stored = trackKey ? await fetchPeaks(trackKey) : null;
+      if (cancelled) return;
+
+      const ws = WaveSurfer.create({
+        container,
+        waveColor: theme === 'dark' ? '#4b5563' : '#cbd5e1',
+        progressColor: '#8b5cf6',
+        cursorColor: '#8b5cf6',
+        barWidth: 2,
+        barRadius: 3,
+        barGap: 2,
+        height: 80,
+        url,
+        ...(stored ? { peaks: [stored.peaks], duration: stored.duration } : {}),
+        normalize: true,
+      });
+      instance = ws;
+      wavesurferRef.current = ws;
+      attachHandlers(ws);
+    };
 
-    ws.on('destroy', () => {
-        if (animationRef.current) cancelAnimationFrame(animationRef.current);
-    });
+    setup();
 
     return () => {
-      ws.destroy();
+      cancelled = true;
+      instance?.destroy();
       wavesurferRef.current = null;
+      setIsReady(false);
+      URL.revokeObjectURL(url);
       if (animationRef.current) cancelAnimationFrame(animationRef.current);
     };
-  }, [file, theme]);
+  }, [file, trackKey, theme]);
 
   // Visualizer Loop
   useEffect(() => {
@@ -17,10 +17,128 @@ class Settings:
     DISCOGS_CONSUMER_SECRET = os.getenv("DISCOGS_CONSUMER_SECRET")
     AUDD_API_TOKEN = os.getenv("AUDD_API_TOKEN")
 
+    # Upstream base URLs (overridden to point at the load-test mock upstreams)
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # None = Groq SDK default
+    GEMINI_API_URL = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com")
+    SPOTIFY_ACCOUNTS_URL = os.getenv("SPOTIFY_ACCOUNTS_URL", "https://accounts.spotify.com")
+    SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com")
+    LASTFM_API_URL = os.getenv("LASTFM_API_URL", "http://ws.audioscrobbler.com")
+    DISCOGS_API_URL = os.getenv("DISCOGS_API_URL", "https://api.discogs.com")
+    AUDD_API_URL = os.getenv("AUDD_API_URL", "https://api.audd.io")
+
     # Database
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+    # Local JWT verification: HS256 secret and/or JWKS for asymmetric keys
+    SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+    SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL")  # default: <SUPABASE_URL>/auth/v1/.well-known/jwks.json
+    SUPABASE_JWKS_TTL_SECONDS = int(os.getenv("SUPABASE_JWKS_TTL_SECONDS", "3600"))
+    AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
     DATABASE_URL = os.getenv("DATABASE_URL")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    HISTORY_WRITE_BATCH_SIZE = int(os.getenv("HISTORY_WRITE_BATCH_SIZE", "100"))
+    HISTORY_WRITE_FLUSH_MS = int(os.getenv("HISTORY_WRITE_FLUSH_MS", "50"))
+
+    # Quota counters (local store, synced back to Supabase)
+    QUOTA_DB_PATH = os.getenv("QUOTA_DB_PATH", "quota.db")
+    QUOTA_DEFAULT_LIMIT = int(os.getenv("QUOTA_DEFAULT_LIMIT", "10"))
+    # Sliding-window request limit per user (0 disables)
+    QUOTA_RATE_LIMIT = int(os.getenv("QUOTA_RATE_LIMIT", "30"))
+    QUOTA_RATE_WINDOW_SECONDS = int(os.getenv("QUOTA_RATE_WINDOW_SECONDS", "60"))
+    QUOTA_SYNC_INTERVAL_SECONDS = float(os.getenv("QUOTA_SYNC_INTERVAL_SECONDS", "30"))
+    QUOTA_SYNC_BATCH_SIZE = int(os.getenv("QUOTA_SYNC_BATCH_SIZE", "100"))
+
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+    # Startup / warmup
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+    # Comma-separated subset of warmup steps to run (empty = all)
+    WARMUP_COMPONENTS = [
+        c.strip() for c in os.getenv("WARMUP_COMPONENTS", "").split(",") if c.strip()
+    ]
+    WARMUP_WHISPER_MODEL = os.getenv("WARMUP_WHISPER_MODEL", "base")
+
+    # Per-request profiling (off unless an admin token is set)
+    PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_ENGINE = os.getenv("PROFILING_ENGINE", "sampling")  # sampling | cprofile | pyinstrument
+    PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "1"))
+    PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+    PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+    PROFILING_PATHS = [
+        p.strip() for p in os.getenv("PROFILING_PATHS", "/analysis,/mir").split(",") if p.strip()
+    ]
+
+    # Mood model inference
+    MOOD_MODEL_PATH = os.getenv("MOOD_MODEL_PATH", "models/mood_model_v2_finetuned.h5")
+    # auto | keras | onnx | tflite (auto prefers ONNX, then TFLite, then Keras)
+    MOOD_MODEL_BACKEND = os.getenv("MOOD_MODEL_BACKEND", "auto")
+    MOOD_MODEL_ONNX_PATH = os.getenv("MOOD_MODEL_ONNX_PATH")  # default: next to the .h5
+    MOOD_MODEL_TFLITE_PATH = os.getenv("MOOD_MODEL_TFLITE_PATH")
+    MOOD_MODEL_THREADS = int(os.getenv("MOOD_MODEL_THREADS", "0"))  # 0 = runtime default
+    MOOD_BATCH_SIZE = int(os.getenv("MOOD_BATCH_SIZE", "32"))
+    MOOD_BATCH_WAIT_MS = int(os.getenv("MOOD_BATCH_WAIT_MS", "20"))
+    MOOD_PREPROCESS_WORKERS = int(os.getenv("MOOD_PREPROCESS_WORKERS", "0"))  # 0 = auto
+    # JSON rules table for heuristic mood tags (empty = built-in rules)
+    MOOD_RULES_PATH = os.getenv("MOOD_RULES_PATH", "")
+    # Windowed mode: windows per track, spread evenly or every HOP seconds
+    MOOD_WINDOWS = int(os.getenv("MOOD_WINDOWS", "5"))
+    MOOD_WINDOW_HOP_SECONDS = float(os.getenv("MOOD_WINDOW_HOP_SECONDS", "0"))
+
+    # Local audio fingerprint index (duplicate detection)
+    FINGERPRINT_DB_PATH = os.getenv("FINGERPRINT_DB_PATH", "fingerprints.db")
+    FINGERPRINT_SAMPLE_RATE = int(os.getenv("FINGERPRINT_SAMPLE_RATE", "11025"))
+    FINGERPRINT_MAX_SECONDS = float(os.getenv("FINGERPRINT_MAX_SECONDS", "0"))  # 0 = whole track
+    FINGERPRINT_FAN_OUT = int(os.getenv("FINGERPRINT_FAN_OUT", "10"))
+    # Aligned hashes needed for a match, and the share of hashes for a duplicate
+    FINGERPRINT_MIN_SCORE = int(os.getenv("FINGERPRINT_MIN_SCORE", "20"))
+    FINGERPRINT_DUPLICATE_CONFIDENCE = float(
+        os.getenv("FINGERPRINT_DUPLICATE_CONFIDENCE", "0.1")
+    )
+    FINGERPRINT_WORKERS = int(os.getenv("FINGERPRINT_WORKERS", "0"))  # 0 = one per CPU
+
+    # Similar-track index (embeddings from analyze_core)
+    SIMILARITY_ENABLED = os.getenv("SIMILARITY_ENABLED", "true").lower() == "true"
+    SIMILARITY_DIR = os.getenv("SIMILARITY_DIR", "similarity_index")
+    # Below this many tracks every search is an exact scan
+    SIMILARITY_IVF_MIN_ROWS = int(os.getenv("SIMILARITY_IVF_MIN_ROWS", "4096"))
+    SIMILARITY_NLIST = int(os.getenv("SIMILARITY_NLIST", "0"))  # 0 = sqrt(tracks)
+    SIMILARITY_NPROBE = int(os.getenv("SIMILARITY_NPROBE", "8"))
+
+    # Columnar feature store (catalog analytics)
+    FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE_ENABLED", "true").lower() == "true"
+    FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", "feature_store")
+
+    # Frame-level feature timelines (RMS, centroid, onsets, beats)
+    TIMELINE_ENABLED = os.getenv("TIMELINE_ENABLED", "false").lower() == "true"
+    TIMELINE_DIR = os.getenv("TIMELINE_DIR", "timelines")
+
+    # Key detection: "krumhansl" or "temperley" profiles; window > 0 also reports key changes
+    KEY_PROFILE = os.getenv("KEY_PROFILE", "krumhansl")
+    KEY_CHANGE_WINDOW_SECONDS = float(os.getenv("KEY_CHANGE_WINDOW_SECONDS", "0"))
+
+    # Tempo: estimates outside this range are halved/doubled when that octave is supported
+    TEMPO_MIN_BPM = float(os.getenv("TEMPO_MIN_BPM", "70"))
+    TEMPO_MAX_BPM = float(os.getenv("TEMPO_MAX_BPM", "180"))
+
+    # Waveform peaks for the web player (audiowaveform .dat/JSON)
+    WAVEFORM_ENABLED = os.getenv("WAVEFORM_ENABLED", "true").lower() == "true"
+    WAVEFORM_DIR = os.getenv("WAVEFORM_DIR", "waveforms")
+    WAVEFORM_SAMPLES_PER_PIXEL = int(os.getenv("WAVEFORM_SAMPLES_PER_PIXEL", "256"))
+    WAVEFORM_BITS = int(os.getenv("WAVEFORM_BITS", "8"))  # 8 or 16
+    WAVEFORM_CACHE_MAX_AGE = int(os.getenv("WAVEFORM_CACHE_MAX_AGE", "86400"))
+
+    # Gemini gateway
+    GEMINI_MAX_CONCURRENT_PER_USER = int(
+        os.getenv("GEMINI_MAX_CONCURRENT_PER_USER", "2")
+    )
 
 
 settings = Settings()
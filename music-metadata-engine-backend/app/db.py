@@ -1,28 +1,286 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import (
+    create_engine,
+    event,
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Index,
+    LargeBinary,
+    inspect,
+    insert,
+    text,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.types import JSON
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from typing import Any, Dict, Optional
+from datetime import datetime
+from app.config import settings
+from app.utils.result_codec import decode_result, encode_result
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+
+def to_async_url(url: str) -> str:
+    """Maps a sync database URL onto its asyncio driver."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers proceed during writes; NORMAL sync is safe with WAL and
+    avoids an fsync per commit; busy_timeout waits instead of failing on locks.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    cursor.close()
+
+
+# Sync engine: schema creation/upgrades and scripts
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: used by request handlers so DB I/O never blocks the event loop
+async_engine = create_async_engine(
+    to_async_url(DATABASE_URL),
+    **(
+        {}
+        if IS_SQLITE
+        else {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+            "pool_pre_ping": True,
+        }
+    ),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+if IS_SQLITE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
 # Use SQLAlchemy 2.0 DeclarativeBase instead of deprecated declarative_base
 class Base(DeclarativeBase):
     pass
 
 
+# Fields copied from the full result into the lightweight history summary
+SUMMARY_FIELDS = ("title", "artist", "mainGenre", "bpm", "key", "mode")
+
+
+def build_summary(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Small projection of an analysis result used by history listings."""
+    result = result or {}
+    return {field: result.get(field) for field in SUMMARY_FIELDS if field in result}
+
+
 # Example model for analysis history
 class AnalysisHistory(Base):
     __tablename__ = "analysis_history"
+    __table_args__ = (
+        # Serves "latest analyses for a user" listings and keyset pagination
+        Index("ix_analysis_history_user_id_timestamp", "user_id", "timestamp"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
     file_name = Column(String)
-    result = Column(JSON)
+    # Legacy inline result; new rows reference analysis_results via result_hash
+    result = Column(JSON(none_as_null=True))
+    result_hash = Column(String(64), index=True)
+    summary = Column(JSON)
     timestamp = Column(DateTime)
 
 
+class AnalysisResult(Base):
+    """Content-addressed, compressed analysis result shared by history rows."""
+
+    __tablename__ = "analysis_results"
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String(16), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    raw_size = Column(Integer)
+    stored_size = Column(Integer)
+    created_at = Column(DateTime)
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "AnalysisResult":
+        digest, codec, blob, raw_size = encode_result(result)
+        return cls(
+            hash=digest,
+            codec=codec,
+            data=blob,
+            raw_size=raw_size,
+            stored_size=len(blob),
+            created_at=datetime.utcnow(),
+        )
+
+    def load(self) -> Dict[str, Any]:
+        return decode_result(self.codec, self.data)
+
+
+class SchemaMigration(Base):
+    """Data migrations that have finished, so they are not re-run on every boot."""
+
+    __tablename__ = "schema_migrations"
+    name = Column(String(64), primary_key=True)
+    applied_at = Column(DateTime)
+
+
+def run_once(bind, name: str, migrate) -> bool:
+    """Runs `migrate(bind)` unless `name` is recorded as applied; True if it ran."""
+    SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+    session = sessionmaker(bind=bind)()
+    try:
+        if session.get(SchemaMigration, name) is not None:
+            return False
+        migrate(bind)
+        session.add(SchemaMigration(name=name, applied_at=datetime.utcnow()))
+        try:
+            session.commit()
+        except IntegrityError:  # another worker finished it at the same time
+            session.rollback()
+        return True
+    finally:
+        session.close()
+
+
+def insert_results_ignore_existing(bind_dialect: str, rows):
+    """
+    INSERT ... ON CONFLICT DO NOTHING for result blobs, so concurrent
+    workers storing the same content never fail on the primary key.
+    """
+    values = [
+        {
+            "hash": r.hash,
+            "codec": r.codec,
+            "data": r.data,
+            "raw_size": r.raw_size,
+            "stored_size": r.stored_size,
+            "created_at": r.created_at,
+        }
+        for r in rows
+    ]
+    if bind_dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif bind_dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(AnalysisResult).values(values)
+    return dialect_insert(AnalysisResult).values(values).on_conflict_do_nothing(
+        index_elements=["hash"]
+    )
+
+
+def upgrade_schema(bind=engine, batch_size: int = 500):
+    """
+    Brings databases created before a column/index existed up to date.
+    create_all() only creates missing tables, so added columns and indexes
+    are applied here; new columns are backfilled once.
+    """
+    inspector = inspect(bind)
+    if not inspector.has_table(AnalysisHistory.__tablename__):
+        return
+
+    columns = {c["name"] for c in inspector.get_columns(AnalysisHistory.__tablename__)}
+    added_columns = {
+        "summary": "JSON",
+        "result_hash": "VARCHAR(64)",
+    }
+    for name, sql_type in added_columns.items():
+        if name not in columns:
+            with bind.begin() as conn:
+                conn.execute(
+                    text(f"ALTER TABLE analysis_history ADD COLUMN {name} {sql_type}")
+                )
+
+    if "summary" not in columns:
+        session = sessionmaker(bind=bind)()
+        try:
+            last_id = 0
+            while True:
+                rows = (
+                    session.query(AnalysisHistory)
+                    .filter(AnalysisHistory.id > last_id)
+                    .order_by(AnalysisHistory.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                for row in rows:
+                    row.summary = build_summary(row.result)
+                session.commit()
+                last_id = rows[-1].id
+        finally:
+            session.close()
+
+    for index in AnalysisHistory.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+
+    run_once(bind, "inline_results", lambda b: migrate_inline_results(b, batch_size))
+
+
+def migrate_inline_results(bind=engine, batch_size: int = 500) -> int:
+    """
+    Moves inline result JSON into the content-addressed analysis_results
+    table and clears the inline copy. Safe to re-run; returns rows migrated.
+    upgrade_schema runs it once per database (recorded in schema_migrations).
+    """
+    AnalysisResult.__table__.create(bind=bind, checkfirst=True)
+    session = sessionmaker(bind=bind)()
+    migrated = 0
+    last_id = 0
+    try:
+        while True:
+            rows = (
+                session.query(AnalysisHistory)
+                .filter(
+                    AnalysisHistory.id > last_id,
+                    AnalysisHistory.result_hash.is_(None),
+                )
+                .order_by(AnalysisHistory.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+            # Older rows may hold a JSON 'null' rather than SQL NULL
+            rows = [row for row in rows if row.result is not None]
+            blobs = {}
+            for row in rows:
+                blob = AnalysisResult.from_result(row.result)
+                blobs.setdefault(blob.hash, blob)
+                row.result_hash = blob.hash
+                row.result = None
+            if blobs:
+                session.execute(
+                    insert_results_ignore_existing(bind.dialect.name, blobs.values())
+                )
+            session.commit()
+            migrated += len(rows)
+    finally:
+        session.close()
+    return migrated
+
+
 Base.metadata.create_all(bind=engine)
+upgrade_schema()
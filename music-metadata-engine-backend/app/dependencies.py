@@ -1,42 +1,68 @@
-from fastapi import Depends, HTTPException, status
+import logging
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
+from app.config import settings
 from app.routes.auth import get_current_user
-from app.supabase_client import supabase
-from app.types import User
+from app.profiling import token_matches
+from app.services.quota import QuotaExceeded, RateLimitExceeded, quota_service
+from app.types import User, user_key, user_metadata
+
+logger = logging.getLogger(__name__)
 
 
 def get_user_and_check_quota(current_user: User = Depends(get_current_user)):
     """
-    A dependency that gets the current user and checks if they have
-    sufficient analysis quota.
+    A dependency that gets the current user and reserves one unit of their
+    analysis quota. The check and the increment are a single atomic step in
+    the local quota store, so concurrent requests cannot overshoot the limit.
+    The unit is given back if the handler fails (it raises, including the
+    HTTPExceptions the generative routes use for 4xx/5xx answers).
     """
-    user_metadata = current_user.user_metadata or {}
-    analysis_count = user_metadata.get("analysis_count", 0)
-    analysis_limit = user_metadata.get("analysis_limit", 10)
+    user_id = user_key(current_user)
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Unknown user."
+        )
 
-    if analysis_count >= analysis_limit:
+    try:
+        quota_service.consume(user_id, user_metadata(current_user))
+    except RateLimitExceeded as e:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Quota exceeded. Limit: {analysis_limit}, Used: {analysis_count}",
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e)
         )
 
-    return current_user
+    try:
+        yield current_user
+    except BaseException:
+        quota_service.release(user_id)
+        raise
 
 
 async def increment_user_quota(user_id: str):
     """
-    Increments the analysis count for a given user.
+    Increments the analysis count for a given user without a limit check.
+    The new count reaches Supabase with the next background quota sync.
     """
     try:
-        # First, get the current count
-        response = supabase.auth.admin.get_user_by_id(user_id)
-        current_metadata = response.user.user_metadata or {}
-        current_count = current_metadata.get("analysis_count", 0)
-
-        # Then, update with the incremented count
-        updated_metadata = {**current_metadata, "analysis_count": current_count + 1}
-        supabase.auth.admin.update_user_by_id(
-            user_id, {"user_metadata": updated_metadata}
-        )
+        quota_service.increment(user_id)
     except Exception as e:
         # Log this error, but don't block the user's request from completing
-        print(f"CRITICAL: Failed to increment quota for user {user_id}. Error: {e}")
+        logger.error(f"Failed to increment quota for user {user_id}: {e}")
+
+
+def require_profiling_admin(x_profile_token: Optional[str] = Header(None)):
+    """Gates the stored request profiles behind the profiling admin token."""
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled."
+        )
+    if not token_matches(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token."
+        )
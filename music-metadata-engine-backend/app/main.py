@@ -1,4 +1,21 @@
-from fastapi import FastAPI
+# Profile imports from the very first line so the cold-start budget covers everything
+from app.startup import import_profiler
+
+import_profiler.start()
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from app.config import settings
+from app.db import async_engine
+from app.profiling import ProfilingMiddleware
+from app.metrics import HTTP_REQUEST_SECONDS, POOL_IN_USE, POOL_SIZE, QUEUE_DEPTH
+from app.warmup import warmup
+from app.services.history_writer import history_writer
+from app.services.quota import quota_service
+from app.services.gemini_gateway import gemini_gateway
+from app.services.mood_inference import pending_mood_inferences, stop_mood_batcher
 from app.routes import (
     proxy_router,
     spotify_router,
@@ -15,12 +32,85 @@ from app.routes import (
     generative_router,
     health_router,
     mir_router,
+    metrics_router,
+    profiles_router,
+    fingerprint_router,
+    similar_router,
+    features_router,
+    timeline_router,
+    waveform_router,
 )
 
-app = FastAPI()
+import_profiler.stop()
+
+logger = logging.getLogger(__name__)
+
+if import_profiler.total_seconds > settings.IMPORT_BUDGET_SECONDS:
+    logger.warning(
+        "App import took %.2fs (budget %.2fs). Slowest modules: %s",
+        import_profiler.total_seconds,
+        settings.IMPORT_BUDGET_SECONDS,
+        [m["module"] for m in import_profiler.report(top=5)["slowest"]],
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy libraries load in the background; /health/ready gates traffic on it
+    if settings.WARMUP_ENABLED:
+        warmup.start(only=settings.WARMUP_COMPONENTS or None)
+    else:
+        warmup.skip()
+    # Local quota counters are written back to Supabase in batches
+    if settings.SUPABASE_URL and settings.QUOTA_SYNC_INTERVAL_SECONDS > 0:
+        quota_service.start_sync(
+            settings.QUOTA_SYNC_INTERVAL_SECONDS, settings.QUOTA_SYNC_BATCH_SIZE
+        )
+    yield
+    # Commit any history rows still waiting in the write-behind buffer
+    await history_writer.stop()
+    await quota_service.stop_sync(settings.QUOTA_SYNC_BATCH_SIZE)
+    await stop_mood_batcher()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Queue depths and pool usage, read at scrape time
+QUEUE_DEPTH.set_function(lambda: history_writer.pending, queue="history_writes")
+QUEUE_DEPTH.set_function(pending_mood_inferences, queue="mood_inference")
+QUEUE_DEPTH.set_function(lambda: gemini_gateway.inflight, queue="gemini_inflight")
+POOL_IN_USE.set_function(lambda: gemini_gateway.active_calls, pool="gemini_user_slots")
+POOL_IN_USE.set_function(lambda: async_engine.pool.checkedout(), pool="db")
+POOL_SIZE.set_function(lambda: async_engine.pool.size(), pool="db")
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template (e.g. /history/{history_id}) keeps label cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        )
+
+
+# Opt-in per-request profiling; not installed at all unless an admin token is set
+if settings.PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
 
 app.include_router(proxy_router)
 app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(profiles_router)
 app.include_router(mir_router)
 app.include_router(spotify_router)
 app.include_router(lastfm_router)
@@ -32,6 +122,11 @@ app.include_router(quota_router)
 app.include_router(batch_router)
 app.include_router(tagging_router)
 app.include_router(ddex_router)
+app.include_router(fingerprint_router)
+app.include_router(similar_router)
+app.include_router(features_router)
+app.include_router(timeline_router)
+app.include_router(waveform_router)
 app.include_router(analysis_router)
 app.include_router(generative_router)
 
@@ -41,4 +136,3 @@ def read_root():
     return {"message": "Music Metadata Engine Backend is running"}
     
 # Force reload for env vars
-
@@ -0,0 +1,383 @@
+"""
+Per-Request Profiling
+Opt-in profiling of individual requests, for finding out why one upload was
+slow. A request carrying the admin token (X-Profile-Token header or
+?profile_token=) is run under a profiler, and the profile is stored under an
+id. The response gets X-Profile-Id and a Server-Timing breakdown of the
+analysis stages, model loads, LLM and upstream calls that ran inside it.
+
+The middleware is only installed when PROFILING_TOKEN is set, so requests
+pay nothing when profiling is off.
+
+Engines:
+    sampling     built-in stack sampler over all busy threads -> speedscope JSON
+    cprofile     deterministic, event-loop thread only -> .pstats
+    pyinstrument async-aware sampler (if installed) -> speedscope JSON
+"""
+
+import contextvars
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile-token"
+PROFILE_QUERY = "profile_token"
+
+# Histogram -> (stage prefix, label naming the stage)
+STAGE_METRICS = {
+    "analysis_stage_duration_seconds": ("", "stage"),
+    "model_load_duration_seconds": ("load:", "model"),
+    "llm_request_duration_seconds": ("llm:", "provider"),
+    "upstream_request_duration_seconds": ("upstream:", "service"),
+}
+
+# Leaf frames of threads that are parked, not working
+IDLE_FILES = (
+    "threading.py",
+    "queue.py",
+    "selectors.py",
+    os.path.join("concurrent", "futures", "thread.py"),
+)
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+
+def get_pyinstrument():
+    import pyinstrument
+
+    return pyinstrument
+
+
+def token_matches(token: Optional[str]) -> bool:
+    return bool(settings.PROFILING_TOKEN and token) and hmac.compare_digest(
+        token.encode(), settings.PROFILING_TOKEN.encode()
+    )
+
+
+class RequestProfile:
+    """Stage timings collected while one request runs."""
+
+    def __init__(self, method: str, path: str, engine: str):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.engine = engine
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stages: List[Dict[str, Any]] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        self.stages.append(
+            {
+                "stage": name,
+                "seconds": round(seconds, 6),
+                "ended_at": round(time.perf_counter() - self.started, 6),
+            }
+        )
+
+    def breakdown(self) -> Dict[str, float]:
+        """Total seconds per stage, in first-seen order."""
+        totals: Dict[str, float] = {}
+        for stage in self.stages:
+            totals[stage["stage"]] = totals.get(stage["stage"], 0.0) + stage["seconds"]
+        return totals
+
+    def server_timing(self) -> str:
+        parts = [
+            f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)};dur={seconds * 1000:.1f}"
+            for name, seconds in self.breakdown().items()
+        ]
+        parts.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "engine": self.engine,
+            "status": self.status,
+            "created_at": self.created_at,
+            "duration_seconds": self.duration,
+            "breakdown": self.breakdown(),
+            "stages": self.stages,
+        }
+
+
+def _observe(metric: str, labels: Dict[str, str], value: float) -> None:
+    profile = _current.get()
+    if profile is None:
+        return
+    stage = STAGE_METRICS.get(metric)
+    if stage is not None:
+        prefix, label = stage
+        profile.record(f"{prefix}{labels.get(label)}", value)
+
+
+class StackSampler:
+    """
+    Samples Python stacks from a background thread via sys._current_frames().
+    The requesting thread is always sampled (time awaiting I/O shows up as the
+    event loop's select); other threads only while they are doing work.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.frames: List[Dict[str, Any]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _frame_id(self, frame) -> int:
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, frame.f_lineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return index
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident != self.target and frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.setdefault(ident, []).append((stack, elapsed))
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        profiles = []
+        for ident, samples in self.samples.items():
+            total = sum(weight for _, weight in samples)
+            thread_name = names.get(ident, str(ident))
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": f"{thread_name} (request)" if ident == self.target else thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": total,
+                    "samples": [stack for stack, _ in samples],
+                    "weights": [weight for _, weight in samples],
+                }
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "music-metadata-engine",
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+class _Profiler:
+    """Common start/stop interface over the three engines."""
+
+    def __init__(self, engine: str, name: str):
+        self.engine = engine
+        self.name = name
+        self._impl: Any = None
+
+    def start(self) -> None:
+        if self.engine == "cprofile":
+            import cProfile
+
+            self._impl = cProfile.Profile()
+            self._impl.enable()  # raises ValueError if another profiler is active
+        elif self.engine == "pyinstrument":
+            self._impl = get_pyinstrument().Profiler(
+                interval=settings.PROFILING_SAMPLE_INTERVAL_MS / 1000, async_mode="enabled"
+            )
+            self._impl.start()
+        else:
+            self._impl = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+            self._impl.start()
+
+    def stop(self) -> Tuple[str, bytes]:
+        """Stops profiling; returns (file extension, profile bytes)."""
+        if self.engine == "cprofile":
+            import marshal
+            import pstats
+
+            self._impl.disable()
+            self._impl.create_stats()
+            return ".pstats", marshal.dumps(pstats.Stats(self._impl).stats)
+        if self.engine == "pyinstrument":
+            from pyinstrument.renderers import SpeedscopeRenderer
+
+            session = self._impl.stop()
+            return ".speedscope.json", SpeedscopeRenderer().render(session).encode()
+        self._impl.stop()
+        return ".speedscope.json", json.dumps(self._impl.speedscope(self.name)).encode()
+
+
+class ProfileStore:
+    """Profiles on disk: <id>.json summary plus the profiler output, oldest pruned."""
+
+    ID_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _summary_path(self, profile_id: str) -> Optional[str]:
+        if not self.ID_PATTERN.match(profile_id):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, profile: RequestProfile, extension: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        artifact = f"{profile.id}{extension}"
+        with open(os.path.join(self.directory, artifact), "wb") as f:
+            f.write(data)
+        summary = {**profile.summary(), "artifact": artifact}
+        with open(self._summary_path(profile.id), "w", encoding="utf-8") as f:
+            json.dump(summary, f)
+        self.prune()
+
+    def prune(self) -> None:
+        summaries = sorted(
+            (
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".json") and self.ID_PATTERN.match(name[:-5])
+            ),
+            key=os.path.getmtime,
+        )
+        for path in summaries[: max(0, len(summaries) - self.max_profiles)]:
+            profile_id = os.path.basename(path)[:-5]
+            for name in os.listdir(self.directory):
+                if name.startswith(profile_id):
+                    os.remove(os.path.join(self.directory, name))
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        path = self._summary_path(profile_id)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def artifact_path(self, profile_id: str) -> Optional[str]:
+        summary = self.get(profile_id)
+        if summary is None:
+            return None
+        path = os.path.join(self.directory, summary["artifact"])
+        return path if os.path.exists(path) else None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and self.ID_PATTERN.match(name[:-5]):
+                summary = self.get(name[:-5])
+                if summary:
+                    summary.pop("stages", None)
+                    summaries.append(summary)
+        summaries.sort(key=lambda s: s["created_at"], reverse=True)
+        return summaries[:limit]
+
+
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: profiles requests under `paths` that carry the admin
+    token. Everything else passes straight through.
+    """
+
+    def __init__(self, app, paths: Optional[List[str]] = None, store: ProfileStore = None):
+        self.app = app
+        self.paths = tuple(paths if paths is not None else settings.PROFILING_PATHS)
+        self.store = store or profile_store
+        metrics.set_observer(_observe)
+
+    def _requested(self, scope) -> bool:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                return token_matches(value.decode("latin-1"))
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return token_matches((query.get(PROFILE_QUERY) or [None])[0])
+
+    async def __call__(self, scope, receive, send):
+        if not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], settings.PROFILING_ENGINE)
+        profiler = _Profiler(profile.engine, f"{profile.method} {profile.path}")
+        try:
+            profiler.start()
+        except (ImportError, ValueError) as e:
+            # pyinstrument missing, or cProfile already running for another request
+            logger.warning(f"Profiling {profile.path} with the built-in sampler: {e}")
+            profile.engine = "sampling"
+            profiler = _Profiler("sampling", profiler.name)
+            profiler.start()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode()),
+                    (b"server-timing", profile.server_timing().encode()),
+                ]
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            profile.duration = round(time.perf_counter() - profile.started, 6)
+            extension, data = profiler.stop()
+            try:
+                self.store.save(profile, extension, data)
+                logger.info(
+                    f"Stored profile {profile.id} for {profile.method} {profile.path} "
+                    f"({profile.duration:.2f}s)"
+                )
+            except OSError as e:
+                logger.error(f"Failed to store profile {profile.id}: {e}")
@@ -15,3 +15,10 @@ from .analysis import router as analysis_router
 from .health import router as health_router
 from .mir import router as mir_router
 from .generative import router as generative_router
+from .metrics import router as metrics_router
+from .profiles import router as profiles_router
+from .fingerprint import router as fingerprint_router
+from .similar import router as similar_router
+from .features import router as features_router
+from .timeline import router as timeline_router
+from .waveform import router as waveform_router
@@ -3,6 +3,9 @@ Analysis Routes - Zero-Cost Local + Groq Pipeline
 """
 
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+import asyncio
 import os
 import uuid
 import logging
@@ -24,13 +27,14 @@ async def generate_analysis(
     file: UploadFile = File(...),
     is_pro_mode: bool = Form(False),
     transcribe: bool = Form(True),  # Enable Whisper transcription
+    force_regenerate: bool = Form(False),  # Bypass the LLM response cache
 ):
     """
     Zero-cost audio analysis pipeline:
     1. Save file temporarily
     2. Run local analysis (librosa, pyloudnorm)
     3. Run Whisper transcription (optional)
-    4. Generate metadata with Groq LLM
+    4. Generate metadata with Groq LLM (cached per analysis fingerprint)
     5. Return combined results
     """
     file_content = await file.read()
@@ -60,6 +64,7 @@ async def generate_analysis(
                 file_path=temp_file_name,
                 transcribe=transcribe
                 and is_pro_mode,  # Transcribe only in Pro mode (slower)
+                use_cache=not force_regenerate,
             )
 
             metadata = result.get("metadata", {})
@@ -74,6 +79,8 @@ async def generate_analysis(
                 metadata["technical"] = core.get("spectral", {})
                 metadata["technical"]["rhythm"] = core.get("rhythm", {})
                 metadata["technical"]["energy"] = core.get("energy", {})
+                # Key of the stored peaks, so the player can skip decoding the file
+                metadata["trackKey"] = core.get("track_key")
                 
                 # Merge heuristic moods if AI didn't return any
                 if not metadata.get("moods"):
@@ -123,6 +130,7 @@ async def generate_analysis(
                 "instrumentation": [],
                 "technical": core.get("spectral", {}),
                 "loudness": analysis.get("loudness", {}),
+                "trackKey": core.get("track_key"),
                 "trackDescription": f"Audio track at {core.get('bpm', '?')} BPM in {core.get('full_key', '?')}",
                 "_note": "AI metadata generation unavailable. Configure GROQ_API_KEY for full features.",
             }
@@ -140,13 +148,95 @@ async def generate_analysis(
             logger.warning(f"Could not delete temp file: {e}")
 
 
+@router.post("/moods")
+async def predict_moods(
+    files: List[UploadFile] = File(...),
+    top_n: int = Form(5),
+    windowed: bool = Form(False),  # Score windows across the whole track
+):
+    """
+    Mood-model predictions for one or more tracks. Requests are micro-batched
+    with other concurrent mood requests into shared model calls. In windowed
+    mode each track's windows are scored as one batch and the response adds a
+    per-window timeline.
+    """
+    from app.config import settings
+    from app.services.mood_inference import get_mood_batcher
+
+    batcher = get_mood_batcher()
+    if batcher.handler.model is None:
+        await asyncio.to_thread(batcher.handler.load_model)
+    if batcher.handler.model is None:
+        raise HTTPException(status_code=503, detail="Mood model is not available.")
+
+    contents = [await f.read() for f in files]
+    if windowed:
+        return {
+            "results": [
+                {
+                    "file": f.filename,
+                    **await asyncio.to_thread(
+                        batcher.handler.predict_moods_windowed,
+                        content,
+                        settings.MOOD_WINDOWS,
+                        settings.MOOD_WINDOW_HOP_SECONDS or None,
+                        top_n,
+                    ),
+                }
+                for f, content in zip(files, contents)
+            ]
+        }
+
+    predictions = await batcher.predict_many(contents, top_n)
+    return {
+        "results": [
+            {"file": f.filename, "moods": moods} for f, moods in zip(files, predictions)
+        ]
+    }
+
+
+class RetagRequest(BaseModel):
+    tracks: List[Dict[str, Any]]  # analyze_core results or flat feature dicts
+    rules: Optional[List[Dict[str, Any]]] = None  # override the configured rules
+
+
+@router.post("/retag")
+async def retag_moods(request: RetagRequest):
+    """
+    Re-applies the heuristic mood rules to stored features, without
+    re-analyzing audio. Returns moods and the firing rules per track.
+    """
+    from app.services.mood_rules import (
+        MoodRuleEngine,
+        feature_matrix,
+        get_mood_rule_engine,
+    )
+
+    try:
+        engine = (
+            MoodRuleEngine(request.rules)
+            if request.rules is not None
+            else get_mood_rule_engine()
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid mood rules: {e}")
+
+    try:
+        matrix = feature_matrix(request.tracks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": engine.tag(matrix)}
+
+
 @router.post("/local-only")
 async def local_analysis_only(
     file: UploadFile = File(...),
+    timeline: Optional[bool] = Form(None),  # Store frame curves (default TIMELINE_ENABLED)
 ):
     """
     Run local analysis only (no AI, no internet required).
     Returns: BPM, Key, Loudness, Spectral features, existing metadata.
+    With timeline, core.timeline describes the curves served by /timeline.
     """
     file_content = await file.read()
     if not file_content:
@@ -160,7 +250,7 @@ async def local_analysis_only(
 
         from app.services.audio_analyzer import AdvancedAudioAnalyzer
 
-        result = await AdvancedAudioAnalyzer.full_analysis(temp_file_name)
+        result = await AdvancedAudioAnalyzer.full_analysis(temp_file_name, timeline)
         return result
 
     except Exception as e:
@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Request
 from app.config import settings
-import httpx
+from app.utils.upstream import upstream_client
 
 router = APIRouter()
 
 
 @router.post("/proxy/audd")
 async def proxy_audd(request: Request):
+    """
+    Passes a request (e.g. {"url": ...}) straight to AudD. The audio is never
+    seen here, so the local fingerprint index cannot answer it; uploads should
+    use /fingerprint/identify, which only calls AudD for unknown recordings.
+    """
     body = await request.json()
     data = {"api_token": settings.AUDD_API_TOKEN, **body}
-    async with httpx.AsyncClient() as client:
-        response = await client.post("https://api.audd.io/", data=data)
+    async with upstream_client("audd") as client:
+        response = await client.post(f"{settings.AUDD_API_URL}/", data=data)
     return response.json()
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, EmailStr
-from app.supabase_client import supabase
+from app.supabase_client import get_supabase
+from app.services.token_verifier import InvalidToken, token_verifier
 # Note: gotrue is deprecated, using generic exception handling instead
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -27,7 +28,7 @@ async def signup(request: SignUpRequest):
     """
     try:
         # Create a new user in Supabase Auth with default quota
-        user = supabase.auth.sign_up(
+        user = get_supabase().auth.sign_up(
             {
                 "email": request.email,
                 "password": request.password,
@@ -55,7 +56,7 @@ async def signin(request: SignInRequest):
     """
     try:
         # Authenticate the user with email and password
-        session = supabase.auth.sign_in_with_password(
+        session = get_supabase().auth.sign_in_with_password(
             {"email": request.email, "password": request.password}
         )
         return session
@@ -73,11 +74,16 @@ async def signin(request: SignInRequest):
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Gets the current user's profile from the provided JWT.
+    The token is verified locally (and cached) when possible, so most
+    requests do not call the Supabase auth server.
     """
     try:
-        # Verify the token and get the user
-        user = supabase.auth.get_user(token)
-        return user
+        return token_verifier.verify(token)
+    except InvalidToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid token: {e}",
+        )
     except Exception as e:
         # Handle auth errors (e.g., invalid token)
         error_msg = str(e) if hasattr(e, '__str__') else "Invalid token"
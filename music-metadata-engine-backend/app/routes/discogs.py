@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.config import settings
-import httpx
+from app.utils.upstream import upstream_client
 
 router = APIRouter()
 
@@ -10,8 +10,8 @@ async def get_discogs_release(release_id: str):
     headers = {
         "Authorization": f"Discogs key={settings.DISCOGS_CONSUMER_KEY}, secret={settings.DISCOGS_CONSUMER_SECRET}"
     }
-    async with httpx.AsyncClient() as client:
+    async with upstream_client("discogs") as client:
         response = await client.get(
-            f"https://api.discogs.com/releases/{release_id}", headers=headers
+            f"{settings.DISCOGS_API_URL}/releases/{release_id}", headers=headers
         )
     return response.json()
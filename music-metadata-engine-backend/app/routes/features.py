@@ -0,0 +1,97 @@
+"""
+Feature Store Routes - Catalog Analytics
+Filters and aggregates over the columnar feature store that full_analysis
+appends to, e.g. BPM distributions, key histograms, loudness compliance.
+"""
+
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from app.services.feature_store import COLUMNS, feature_store
+
+router = APIRouter(prefix="/features", tags=["features"])
+
+
+class Filter(BaseModel):
+    column: str
+    op: str = "eq"  # eq ne lt le gt ge between in isnull notnull
+    value: Any = None
+
+
+class QueryRequest(BaseModel):
+    filters: List[Filter] = []
+    columns: Optional[List[str]] = None
+    order_by: Optional[str] = None
+    descending: bool = False
+    limit: int = Field(100, ge=0, le=10000)
+    offset: int = Field(0, ge=0)
+
+
+class AggregateRequest(BaseModel):
+    filters: List[Filter] = []
+    group_by: List[str] = []  # columns, or "column:width" to bin numbers
+    metrics: List[str] = ["count"]  # "count" or "<mean|sum|min|max|p10|p50|p90>:<column>"
+
+
+class HistogramRequest(BaseModel):
+    column: str
+    bins: int = 20
+    range: Optional[Tuple[float, float]] = None
+    filters: List[Filter] = []
+
+
+async def _run(fn, *args, **kwargs):
+    try:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _filters(filters: List[Filter]) -> List[dict]:
+    return [f.model_dump() for f in filters]
+
+
+@router.post("/query")
+async def query(request: QueryRequest):
+    """Matching tracks (selected columns) and the total match count."""
+    return await _run(
+        feature_store.query,
+        _filters(request.filters),
+        request.columns,
+        request.order_by,
+        request.descending,
+        request.limit,
+        request.offset,
+    )
+
+
+@router.post("/aggregate")
+async def aggregate(request: AggregateRequest):
+    return await _run(
+        feature_store.aggregate, _filters(request.filters), request.group_by, request.metrics
+    )
+
+
+@router.post("/histogram")
+async def histogram(request: HistogramRequest):
+    return await _run(
+        feature_store.histogram,
+        request.column,
+        request.bins,
+        request.range,
+        _filters(request.filters),
+    )
+
+
+@router.get("/report")
+async def report():
+    """Catalog overview: BPM distribution, key histogram, loudness compliance."""
+    return await _run(feature_store.report)
+
+
+@router.get("/stats")
+async def stats():
+    return {**await _run(feature_store.stats), "columns": {n: d for n, (d, _) in COLUMNS.items()}}
@@ -0,0 +1,131 @@
+"""
+Fingerprint Routes - Local Duplicate Detection
+Batch ingestion into the local fingerprint index, lookups, and duplicate
+reports across the catalog. /fingerprint/identify only calls AudD for
+recordings the index does not already know.
+"""
+
+import asyncio
+import json
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+
+from app.config import settings
+from app.services.fingerprint import fingerprint_index
+from app.utils.upstream import upstream_client
+
+router = APIRouter(prefix="/fingerprint", tags=["fingerprint"])
+logger = logging.getLogger(__name__)
+
+
+async def _read(file: UploadFile) -> bytes:
+    content = await file.read()
+    if not content:
+        raise HTTPException(status_code=400, detail=f"Uploaded file {file.filename} is empty.")
+    return content
+
+
+@router.post("/ingest")
+async def ingest(
+    files: List[UploadFile] = File(...),
+    metadata: Optional[str] = Form(None),
+):
+    """
+    Fingerprints and indexes a batch of recordings. `metadata` is an optional
+    JSON list (one object per file, e.g. an AudD result) stored with each track.
+    Each result lists the catalog tracks the new one duplicates.
+    """
+    try:
+        extra = json.loads(metadata) if metadata else [None] * len(files)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="metadata must be a JSON list.")
+    if not isinstance(extra, list) or len(extra) != len(files):
+        raise HTTPException(status_code=400, detail="metadata needs one entry per file.")
+
+    items = [(await _read(f), f.filename, meta) for f, meta in zip(files, extra)]
+    results = await asyncio.to_thread(fingerprint_index.add_many, items)
+    return {"results": results}
+
+
+@router.post("/match")
+async def match(file: UploadFile = File(...), limit: int = Form(5)):
+    """Catalog tracks containing the uploaded recording, with their stored metadata."""
+    content = await _read(file)
+    return await asyncio.to_thread(fingerprint_index.match, content, limit)
+
+
+@router.post("/identify")
+async def identify(file: UploadFile = File(...)):
+    """
+    Local lookup first; unknown recordings go to AudD and are indexed with
+    its result, so the next upload of the same recording costs nothing.
+    """
+    content = await _read(file)
+    result = await asyncio.to_thread(fingerprint_index.match, content, 1)
+    if result["exact_duplicate_of"] is not None:
+        track = await asyncio.to_thread(fingerprint_index.track, result["exact_duplicate_of"])
+        return {"source": "local", "result": (track or {}).get("metadata"), **result}
+    if result["matches"]:
+        return {"source": "local", "result": result["matches"][0]["metadata"], **result}
+    if not settings.AUDD_API_TOKEN:
+        raise HTTPException(
+            status_code=404, detail="Not in the local index and AudD is not configured."
+        )
+
+    async with upstream_client("audd") as client:
+        response = await client.post(
+            f"{settings.AUDD_API_URL}/",
+            data={"api_token": settings.AUDD_API_TOKEN},
+            files={"file": (file.filename or "audio", content)},
+        )
+    body = response.json()
+    recognized = body.get("result") if body.get("status") == "success" else None
+    track_id = None
+    if recognized:
+        added = await asyncio.to_thread(
+            fingerprint_index.add, content, file.filename, recognized
+        )
+        track_id = added.get("track_id")
+    return {"source": "audd", "result": recognized, "track_id": track_id, **result}
+
+
+@router.get("/duplicates")
+async def duplicates(
+    min_confidence: Optional[float] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Groups of catalog tracks that are the same recording (pairs stored at ingest)."""
+    return await asyncio.to_thread(
+        fingerprint_index.duplicate_groups, min_confidence, limit, offset
+    )
+
+
+@router.post("/duplicates/rebuild")
+async def rebuild_duplicates():
+    """Recomputes stored duplicate pairs for indexes built before they were kept."""
+    pairs = await asyncio.to_thread(fingerprint_index.rebuild_duplicates)
+    return {"pairs": pairs}
+
+
+@router.get("/tracks/{track_id}/duplicates")
+async def track_duplicates(track_id: int, min_confidence: Optional[float] = None):
+    track = await asyncio.to_thread(fingerprint_index.track, track_id)
+    if track is None:
+        raise HTTPException(status_code=404, detail="Track not found.")
+    matches = await asyncio.to_thread(fingerprint_index.duplicates_of, track_id, min_confidence)
+    return {"track": track, "duplicates": matches}
+
+
+@router.delete("/tracks/{track_id}")
+async def remove_track(track_id: int):
+    if not await asyncio.to_thread(fingerprint_index.remove, track_id):
+        raise HTTPException(status_code=404, detail="Track not found.")
+    return {"deleted": track_id}
+
+
+@router.get("/stats")
+async def stats():
+    return await asyncio.to_thread(fingerprint_index.stats)
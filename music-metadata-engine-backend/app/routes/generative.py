@@ -1,18 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, Any
 
-from app.config import settings
 from app.dependencies import get_user_and_check_quota
+from app.services.gemini_gateway import (
+    ConcurrencyLimitExceeded,
+    compact_context,
+    gemini_gateway,
+    user_key,
+)
 from app.types import User
-import google.generativeai as genai
 import json
+import os
+import shutil
+import tempfile
 
 router = APIRouter(prefix="/generate", tags=["generative"])
 
-# Configure the Gemini client
-genai.configure(api_key=settings.GEMINI_API_KEY)
-
 # --- Pydantic Models for Request Bodies ---
 
 
@@ -50,17 +55,15 @@ class CoverArtRequest(BaseModel):
     )
 
 
-# --- Helper for Gemini JSON response ---
+# --- Helpers for Gemini responses (via the shared gateway) ---
 async def call_gemini_json(
-    prompt: str, model_name: str = "gemini-2.0-flash"
+    prompt: str, current_user: User, model_name: str = "gemini-2.0-flash"
 ) -> Dict[str, Any]:
     try:
-        model = genai.GenerativeModel(
-            model_name=model_name,
-            generation_config={"response_mime_type": "application/json"},
-        )
-        response = await model.generate_content_async(prompt)
-        return json.loads(response.text)
+        async with gemini_gateway.user_slot(user_key(current_user)):
+            return await gemini_gateway.generate(prompt, model_name=model_name)
+    except ConcurrencyLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="AI model returned invalid JSON.")
     except Exception as e:
@@ -69,46 +72,89 @@ async def call_gemini_json(
         )
 
 
+def marketing_prompt(request: MarketingContentRequest) -> str:
+    return f"""
+    Generate '{request.content_type}' content with a '{request.tone}' tone 
+    for a track with this metadata: {compact_context(request.metadata)}.
+    Return as plain text.
+    """
+
+
 # --- New Endpoints ---
 
 
-@router.post("/refine_field", dependencies=[Depends(get_user_and_check_quota)])
-async def refine_metadata_field(request: RefineFieldRequest):
+@router.post("/refine_field")
+async def refine_metadata_field(
+    request: RefineFieldRequest, current_user: User = Depends(get_user_and_check_quota)
+):
     prompt = f"""
     Context: Music Metadata Refinement.
-    Current Data: {json.dumps(request.current_metadata)}
+    Current Data: {compact_context(request.current_metadata)}
     Task: Rewrite/Update the field "{request.field_to_refine}".
     Instruction: {request.refinement_instruction}
     Output JSON with ONLY the key "{request.field_to_refine}".
     """
-    return await call_gemini_json(prompt)
+    return await call_gemini_json(prompt, current_user)
 
 
-@router.post("/marketing_content", dependencies=[Depends(get_user_and_check_quota)])
-async def generate_marketing_content(request: MarketingContentRequest):
-    prompt = f"""
-    Generate '{request.content_type}' content with a '{request.tone}' tone 
-    for a track with this metadata: {json.dumps(request.metadata)}.
-    Return as plain text.
+@router.post("/marketing_content")
+async def generate_marketing_content(
+    request: MarketingContentRequest,
+    current_user: User = Depends(get_user_and_check_quota),
+):
+    try:
+        async with gemini_gateway.user_slot(user_key(current_user)):
+            return await gemini_gateway.generate(
+                marketing_prompt(request), model_name="gemini-1.5-flash", json_mode=False
+            )
+    except ConcurrencyLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+@router.post("/marketing_content/stream")
+async def stream_marketing_content(
+    request: MarketingContentRequest,
+    current_user: User = Depends(get_user_and_check_quota),
+):
     """
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    response = await model.generate_content_async(prompt)
-    return {"content": response.text}
+    Same as /marketing_content, but streams plain-text chunks as they are
+    generated so the UI can render the first tokens immediately.
+    """
+    uid = user_key(current_user)
+    try:
+        gemini_gateway.acquire(uid)
+    except ConcurrencyLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    async def body():
+        try:
+            async for chunk in gemini_gateway.stream(
+                marketing_prompt(request), model_name="gemini-1.5-flash"
+            ):
+                yield chunk
+        finally:
+            gemini_gateway.release(uid)
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
 
 
-@router.post("/cover_art_idea", dependencies=[Depends(get_user_and_check_quota)])
-async def generate_cover_art_idea(request: CoverArtRequest):
+@router.post("/cover_art_idea")
+async def generate_cover_art_idea(
+    request: CoverArtRequest, current_user: User = Depends(get_user_and_check_quota)
+):
     prompt = f"""
     Generate a visual prompt for an AI image generator (like Midjourney or DALL-E) 
-    to create cover art for a track with this metadata: {json.dumps(request.metadata)}.
+    to create cover art for a track with this metadata: {compact_context(request.metadata)}.
     Return a JSON object with a single key "visual_prompt".
     """
-    return await call_gemini_json(prompt)
+    return await call_gemini_json(prompt, current_user)
 
 
-@router.post("/analyze_lyrics", dependencies=[Depends(get_user_and_check_quota)])
+@router.post("/analyze_lyrics")
 async def analyze_lyrics(
-    metadata: str = Form(...), file: UploadFile = File(...)  # JSON string of metadata
+    metadata: str = Form(...),  # JSON string of metadata
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_user_and_check_quota),
 ):
     metadata_dict = json.loads(metadata)
     lyrics = metadata_dict.get("lyrics", "")
@@ -126,35 +172,46 @@ async def analyze_lyrics(
     Determine the theme, mood, and provide a short summary.
     Return a JSON object with keys "theme", "mood", "summary".
     """
-    return await call_gemini_json(prompt)
+    return await call_gemini_json(prompt, current_user)
 
 
-@router.post("/lyrical_ideas", dependencies=[Depends(get_user_and_check_quota)])
-async def generate_lyrical_ideas(request: LyricalIdeasRequest):
+@router.post("/lyrical_ideas")
+async def generate_lyrical_ideas(
+    request: LyricalIdeasRequest, current_user: User = Depends(get_user_and_check_quota)
+):
     prompt = f"""
     Based on the following track metadata, generate lyrical ideas for a new song.
-    Metadata: {json.dumps(request.metadata)}
+    Metadata: {compact_context(request.metadata)}
     Provide a sample verse and chorus, and a brief explanation.
     Return a JSON object with keys "verse", "chorus", "explanation".
     """
-    return await call_gemini_json(prompt)
+    return await call_gemini_json(prompt, current_user)
 
 
 @router.post("/analyze_structure")
 async def analyze_structure(
     file: UploadFile = File(...), current_user: User = Depends(get_user_and_check_quota)
 ):
-    # This still reads the whole file into memory. It will be fixed in Step 2.
-    audio_file = {"mime_type": file.content_type, "data": await file.read()}
-    prompt = """
-    Analyze the structure of this audio file. Identify segments like 'intro', 'verse', 'chorus', 'bridge', 'outro'.
-    For each segment, provide the start and end time in seconds.
-    Return a JSON list where each item is an object with keys "label", "start", and "end".
-    Example: [{"label": "intro", "start": 0.0, "end": 15.5}, ...]
     """
-    model = genai.GenerativeModel(
-        model_name="gemini-1.5-flash",
-        generation_config={"response_mime_type": "application/json"},
-    )
-    response = await model.generate_content_async([prompt, audio_file])
-    return json.loads(response.text)
+    Segments the track into intro/verse/chorus/bridge/outro locally
+    (self-similarity + novelty), without uploading the audio to an LLM.
+    Returns a JSON list of {"label", "start", "end"} in seconds.
+    """
+    from app.services.structure import StructureAnalyzer
+
+    suffix = os.path.splitext(file.filename or "")[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(file.file, tmp)
+        tmp_path = tmp.name
+
+    try:
+        return await StructureAnalyzer.analyze(tmp_path)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Structure analysis failed: {str(e)}"
+        )
+    finally:
+        try:
+            os.remove(tmp_path)
+        except Exception:
+            pass
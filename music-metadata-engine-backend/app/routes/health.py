@@ -1,5 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from app.config import settings
+from app.startup import import_profiler
+from app.warmup import warmup
 import os
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -22,3 +25,24 @@ async def diagnose_system():
         "system": {"os": os.name, "cwd": os.getcwd()},
     }
     return checks
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 503 until background warmup has finished, so new
+    workers only receive traffic once heavy libraries are loaded. Failed
+    steps (optional dependencies) do not hold readiness back; they are
+    listed under "failed".
+    """
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@router.get("/startup")
+async def startup_profile(top: int = 20):
+    """Import cost per module measured while the app booted."""
+    report = import_profiler.report(top=top)
+    report["budget_ms"] = settings.IMPORT_BUDGET_SECONDS * 1000
+    report["within_budget"] = report["total_ms"] <= report["budget_ms"]
+    return report
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List, Dict, Any
-from app.db import SessionLocal, AnalysisHistory
+from typing import Dict, Any, Optional, Tuple
+from app.db import AsyncSessionLocal, AnalysisHistory, AnalysisResult, build_summary
 from app.routes.auth import get_current_user
+from app.services.history_writer import history_writer
 from app.types import User
 from datetime import datetime
+import base64
 
 router = APIRouter(prefix="/history", tags=["history"])
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
 
 # Pydantic model for the request body
 class HistoryCreate(BaseModel):
@@ -16,46 +23,139 @@ class HistoryCreate(BaseModel):
     result: Dict[str, Any]
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def serialize_record(
+    record: AnalysisHistory, result: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    return {
+        "id": record.id,
+        "user_id": record.user_id,
+        "file_name": record.file_name,
+        "timestamp": record.timestamp,
+        "summary": record.summary or {},
+        "result": result,
+    }
+
+
+def encode_cursor(timestamp: datetime, record_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(record_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid history cursor.")
 
 
 @router.post("/", response_model=None)  # Response model can be defined if needed
 async def add_history(
     history_data: HistoryCreate,
-    db: Session = Depends(get_db),
+    wait: bool = True,
     current_user: User = Depends(get_current_user),
 ):
     """
     Adds a new analysis record for the currently authenticated user.
+    Inserts are batched by the history write buffer; with wait=false the
+    request returns 202 without waiting for the batch to commit.
+    The result is stored compressed and deduplicated by content hash.
     """
+    stored_result = AnalysisResult.from_result(history_data.result)
     history_entry = AnalysisHistory(
         user_id=current_user.id,
         file_name=history_data.file_name,
-        result=history_data.result,
+        result_hash=stored_result.hash,
+        summary=build_summary(history_data.result),
         timestamp=datetime.utcnow(),
     )
-    db.add(history_entry)
-    db.commit()
-    db.refresh(history_entry)
-    return history_entry
+    if not wait:
+        await history_writer.add(history_entry, stored_result, wait=False)
+        return JSONResponse(status_code=202, content={"status": "queued"})
+    await history_writer.add(history_entry, stored_result)
+    return serialize_record(history_entry, history_data.result)
 
 
-@router.get("/", response_model=List[Dict[str, Any]])
+@router.get("/")
 async def get_history(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
 ):
     """
-    Retrieves all analysis records for the currently authenticated user.
+    Lists the user's analyses, newest first, as lightweight summaries
+    (no full result JSON). Pass `next_cursor` back as `cursor` for the
+    next page; use GET /history/{id} to load a full result.
     """
-    history_records = (
-        db.query(AnalysisHistory)
-        .filter(AnalysisHistory.user_id == current_user.id)
-        .order_by(AnalysisHistory.timestamp.desc())
-        .all()
+    query = select(
+        AnalysisHistory.id,
+        AnalysisHistory.file_name,
+        AnalysisHistory.timestamp,
+        AnalysisHistory.summary,
+    ).where(AnalysisHistory.user_id == current_user.id)
+
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                AnalysisHistory.timestamp < cursor_ts,
+                and_(
+                    AnalysisHistory.timestamp == cursor_ts,
+                    AnalysisHistory.id < cursor_id,
+                ),
+            )
+        )
+
+    result = await db.execute(
+        query.order_by(AnalysisHistory.timestamp.desc(), AnalysisHistory.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "items": [
+            {
+                "id": row.id,
+                "file_name": row.file_name,
+                "timestamp": row.timestamp,
+                "summary": row.summary or {},
+            }
+            for row in rows
+        ],
+        "next_cursor": (
+            encode_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None
+        ),
+    }
+
+
+@router.get("/{history_id}")
+async def get_history_item(
+    history_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Loads one full analysis record (including the result JSON).
+    """
+    result = await db.execute(
+        select(AnalysisHistory).where(
+            AnalysisHistory.id == history_id,
+            AnalysisHistory.user_id == current_user.id,
+        )
     )
-    return history_records
+    record = result.scalar_one_or_none()
+    if record is None:
+        raise HTTPException(status_code=404, detail="History record not found.")
+
+    if record.result_hash is None:
+        return serialize_record(record, record.result)  # legacy inline row
+    stored = await db.get(AnalysisResult, record.result_hash)
+    return serialize_record(record, stored.load() if stored is not None else None)
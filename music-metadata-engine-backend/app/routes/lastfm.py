@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.config import settings
-import httpx
+from app.utils.upstream import upstream_client
 
 router = APIRouter()
 
@@ -13,6 +13,6 @@ async def get_lastfm_artist(artist: str):
         "api_key": settings.LASTFM_API_KEY,
         "format": "json",
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.get("http://ws.audioscrobbler.com/2.0/", params=params)
+    async with upstream_client("lastfm") as client:
+        response = await client.get(f"{settings.LASTFM_API_URL}/2.0/", params=params)
     return response.json()
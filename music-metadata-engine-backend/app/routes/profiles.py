@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.dependencies import require_profiling_admin
+from app.profiling import profile_store
+
+router = APIRouter(
+    prefix="/profiles", tags=["profiles"], dependencies=[Depends(require_profiling_admin)]
+)
+
+
+@router.get("")
+async def list_profiles(limit: int = 50):
+    """Most recent request profiles (summaries without the stage list)."""
+    return {"profiles": profile_store.list(limit)}
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str):
+    """Stage timing breakdown of one profiled request."""
+    summary = profile_store.get(profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return summary
+
+
+@router.get("/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """The raw profile: speedscope JSON (open at speedscope.app) or .pstats."""
+    path = profile_store.artifact_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return FileResponse(path, filename=path.rsplit("/", 1)[-1])
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Request
 from app.config import settings
-import httpx
+from app.utils.upstream import upstream_client
 
 router = APIRouter()
 
@@ -9,9 +9,9 @@ router = APIRouter()
 async def proxy_gemini(request: Request):
     body = await request.json()
     headers = {"Authorization": f"Bearer {settings.GEMINI_API_KEY}"}
-    async with httpx.AsyncClient() as client:
+    async with upstream_client("gemini") as client:
         response = await client.post(
-            "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent",
+            f"{settings.GEMINI_API_URL}/v1beta/models/gemini-pro:generateContent",
             json=body,
             headers=headers,
         )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from app.routes.auth import get_current_user
-from app.types import User
+from app.services.quota import quota_service
+from app.types import User, user_key, user_metadata
 
 router = APIRouter(prefix="/quota", tags=["quota"])
 
@@ -9,12 +10,7 @@ router = APIRouter(prefix="/quota", tags=["quota"])
 async def get_quota_status(current_user: User = Depends(get_current_user)):
     """
     Returns the analysis count and limit for the currently authenticated user.
+    Served from the local quota store, which is ahead of Supabase metadata
+    until the next background sync.
     """
-    user_metadata = current_user.user_metadata or {}
-    analysis_count = user_metadata.get("analysis_count", 0)
-    analysis_limit = user_metadata.get("analysis_limit", 10)
-
-    return {
-        "analysis_count": analysis_count,
-        "analysis_limit": analysis_limit,
-    }
+    return quota_service.status(user_key(current_user), user_metadata(current_user))
@@ -0,0 +1,86 @@
+"""
+Similar-Track Routes
+Nearest neighbours in the embedding index that full_analysis feeds, by
+indexed track key (SHA-256 of the file) or for a new upload.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+import uuid
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+
+from app.services.similarity import similarity_index
+
+router = APIRouter(prefix="/similar", tags=["similar"])
+logger = logging.getLogger(__name__)
+
+
+@router.post("")
+async def similar_to_upload(
+    file: UploadFile = File(...),
+    k: int = Form(10),
+    add: bool = Form(False),  # Also index the upload
+):
+    """Analyzes the upload (core features only) and returns the k most similar tracks."""
+    file_content = await file.read()
+    if not file_content:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+
+    safe_filename = re.sub(r"[^\w\-.]", "_", file.filename or "audio")
+    temp_file_name = f"temp_{uuid.uuid4()}_{safe_filename}"
+    try:
+        with open(temp_file_name, "wb") as buffer:
+            buffer.write(file_content)
+
+        from app.services.audio_analyzer import AdvancedAudioAnalyzer
+
+        results = {"core": await AdvancedAudioAnalyzer.analyze_core(temp_file_name)}
+        start = time.perf_counter()
+        matches = await asyncio.to_thread(
+            similarity_index.search, results["core"]["embedding"], k
+        )
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        if add:
+            await AdvancedAudioAnalyzer.index_embedding(temp_file_name, results)
+        return {
+            "key": results["core"].get("track_key"),
+            "results": matches,
+            "search_ms": elapsed_ms,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Similarity search failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Similarity search failed: {str(e)}")
+    finally:
+        if os.path.exists(temp_file_name):
+            os.remove(temp_file_name)
+
+
+@router.get("/tracks/{key}")
+async def similar_to_track(key: str, k: int = 10, nprobe: int = 0):
+    """The k tracks nearest to an indexed track."""
+    start = time.perf_counter()
+    matches = await asyncio.to_thread(similarity_index.similar, key, k, nprobe)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Track not in the similarity index.")
+    return {
+        "key": key,
+        "results": matches,
+        "search_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+@router.get("/stats")
+async def stats():
+    return await asyncio.to_thread(similarity_index.stats)
+
+
+@router.post("/rebuild")
+async def rebuild(nlist: int = 0):
+    """Retrains normalization and clusters over the whole catalog."""
+    return await asyncio.to_thread(similarity_index.train, nlist)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from app.config import settings
-import httpx
+from app.utils.upstream import upstream_client
 import time
 
 router = APIRouter()
@@ -21,9 +21,9 @@ async def get_spotify_access_token():
     if token_cache["access_token"] and time.time() < token_cache["expires_at"]:
         return token_cache["access_token"]
 
-    async with httpx.AsyncClient() as client:
+    async with upstream_client("spotify") as client:
         response = await client.post(
-            "https://accounts.spotify.com/api/token",
+            f"{settings.SPOTIFY_ACCOUNTS_URL}/api/token",
             data={
                 "grant_type": "client_credentials",
                 "client_id": settings.SPOTIFY_CLIENT_ID,
@@ -52,9 +52,9 @@ async def search_spotify(
     """
     Proxies a search request to the Spotify API.
     """
-    async with httpx.AsyncClient() as client:
+    async with upstream_client("spotify") as client:
         response = await client.get(
-            f"https://api.spotify.com/v1/search?q={query.query}&type=track&limit=1",
+            f"{settings.SPOTIFY_API_URL}/v1/search?q={query.query}&type=track&limit=1",
             headers={"Authorization": f"Bearer {token}"},
         )
 
@@ -71,9 +71,9 @@ async def get_audio_features(
     """
     Proxies a request for a track's audio features to the Spotify API.
     """
-    async with httpx.AsyncClient() as client:
+    async with upstream_client("spotify") as client:
         response = await client.get(
-            f"https://api.spotify.com/v1/audio-features/{track_id}",
+            f"{settings.SPOTIFY_API_URL}/v1/audio-features/{track_id}",
             headers={"Authorization": f"Bearer {token}"},
         )
 
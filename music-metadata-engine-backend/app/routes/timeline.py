@@ -0,0 +1,49 @@
+"""
+Timeline Routes
+Range queries over stored feature timelines at a resolution chosen by the
+number of points the client wants to draw.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+from app.services.timeline import timeline_store
+
+router = APIRouter(prefix="/timeline", tags=["timeline"])
+
+
+@router.get("/{key}")
+async def get_timeline(
+    key: str,
+    start: float = 0.0,
+    end: Optional[float] = None,
+    points: int = 1000,
+    curves: Optional[str] = None,  # comma-separated, e.g. "rms,centroid"
+):
+    """
+    Curves (rms, centroid, onset) and beat times between `start` and `end`
+    seconds, with at most about `points` values per curve.
+    """
+    try:
+        result = await asyncio.to_thread(
+            timeline_store.query,
+            key,
+            start,
+            end,
+            min(points, 20000),
+            curves.split(",") if curves else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Timeline not found.")
+    return result
+
+
+@router.delete("/{key}")
+async def delete_timeline(key: str):
+    if not await asyncio.to_thread(timeline_store.delete, key):
+        raise HTTPException(status_code=404, detail="Timeline not found.")
+    return {"deleted": key}
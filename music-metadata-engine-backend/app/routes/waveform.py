@@ -0,0 +1,59 @@
+"""
+Waveform Routes
+Precomputed peaks for the web player, as audiowaveform binary data (.dat)
+or JSON, with cache validators so repeat visits cost a 304.
+"""
+
+import asyncio
+import json
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.config import settings
+from app.services.waveform import waveform_store
+
+router = APIRouter(prefix="/waveform", tags=["waveform"])
+
+MEDIA_TYPES = {"dat": "application/octet-stream", "json": "application/json"}
+
+
+@router.get("/{key}.{fmt}")
+async def get_waveform(
+    key: str,
+    fmt: str,
+    request: Request,
+    samples_per_pixel: Optional[int] = None,  # a multiple of the stored zoom level
+):
+    """Peaks of an analyzed track (key = core.track_key) as `.dat` or `.json`."""
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Use .dat or .json.")
+    try:
+        stat = os.stat(waveform_store.path(key))
+    except (KeyError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="Waveform not found.")
+
+    # Peaks only change when the track is re-analyzed, which rewrites the file
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{samples_per_pixel or 0}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.WAVEFORM_CACHE_MAX_AGE}",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    peaks = await asyncio.to_thread(waveform_store.load, key)
+    if peaks is None:
+        raise HTTPException(status_code=404, detail="Waveform not found.")
+    if samples_per_pixel:
+        try:
+            peaks = peaks.resample(samples_per_pixel)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if fmt == "dat":
+        content = peaks.to_dat()
+    else:
+        content = json.dumps(peaks.to_json(), separators=(",", ":"))
+    return Response(content=content, media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -4,9 +4,13 @@ Zero-cost local audio analysis using open-source libraries.
 """
 
 import os
+import re
+import asyncio
 import logging
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from app.config import settings
+from app.metrics import ANALYSIS_STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -63,37 +67,41 @@ class AdvancedAudioAnalyzer:
             return False
 
     @staticmethod
-    async def analyze_core(file_path: str) -> Dict[str, Any]:
+    async def analyze_core(file_path: str, timeline: bool = False) -> Dict[str, Any]:
         """
         Core analysis: BPM, Key, Spectral features, Duration.
+        With timeline=True the per-frame curves are kept under "_frames"
+        (numpy arrays, for the timeline store; not JSON-serializable).
         Uses: librosa
         """
         librosa = get_librosa()
 
         try:
             # Load audio (full duration for accuracy)
-            y, sr = librosa.load(file_path, duration=None)
+            with ANALYSIS_STAGE_SECONDS.time(stage="decode"):
+                y, sr = librosa.load(file_path, duration=None)
 
-            # === BPM & Beat Detection ===
-            tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
-            bpm = float(tempo) if isinstance(tempo, (int, float)) else float(tempo[0])
+            # === BPM, Beats & Danceability (one onset envelope) ===
+            from app.services.tempo import analyze_rhythm
 
-            # === Key Detection (Chroma-based) ===
-            chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-            key_idx = int(np.argmax(np.mean(chroma, axis=1)))
-            keys = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-            detected_key = keys[key_idx]
+            rhythm = analyze_rhythm(y, sr)
+            bpm, beat_frames = rhythm["bpm"], rhythm["beat_frames"]
+            onset_env, danceability = rhythm["onset_env"], rhythm["danceability"]
 
-            # Major/Minor detection (simplified)
-            # Compare energy in major vs minor third intervals
-            major_energy = np.mean(chroma[(key_idx + 4) % 12])
-            minor_energy = np.mean(chroma[(key_idx + 3) % 12])
-            mode = "Major" if major_energy > minor_energy else "Minor"
+            # === Key Detection (chroma vs. the 24 key profiles) ===
+            from app.services.key_detection import estimate_key
 
-            # === Spectral Features ===
-            spectral_centroid = float(
-                np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
+            chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+            key_estimate = estimate_key(
+                chroma,
+                frame_seconds=512 / sr,  # chroma_stft default hop
+                window_seconds=settings.KEY_CHANGE_WINDOW_SECONDS,
             )
+            detected_key, mode = key_estimate["key"], key_estimate["mode"]
+
+            # === Spectral Features ===
+            centroid_frames = librosa.feature.spectral_centroid(y=y, sr=sr)
+            spectral_centroid = float(np.mean(centroid_frames))
             spectral_rolloff = float(
                 np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))
             )
@@ -107,11 +115,6 @@ class AdvancedAudioAnalyzer:
             energy_mean = float(np.mean(rms))
             energy_std = float(np.std(rms))
 
-            # === Danceability (rhythm stability) ===
-            onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-            pulse = librosa.beat.plp(onset_envelope=onset_env, sr=sr)
-            danceability = float(np.mean(pulse))
-
             # === Duration ===
             duration = librosa.get_duration(y=y, sr=sr)
 
@@ -119,30 +122,49 @@ class AdvancedAudioAnalyzer:
             mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
             mfcc_mean = [float(x) for x in np.mean(mfcc, axis=1)]
 
-            # === Heuristic Mood Detection ===
-            detected_moods = []
-            if energy_mean > 0.1 and bpm > 120:
-                detected_moods.append("Energetic")
-            if energy_mean < 0.05 and bpm < 100:
-                detected_moods.append("Calm")
-            if mode == "Major" and bpm > 110:
-                detected_moods.append("Happy")
-            if mode == "Minor" and bpm < 110:
-                detected_moods.append("Melancholic")
-            if danceability > 1.2:  # Assuming arbitrary threshold for high danceability
-                detected_moods.append("Danceable")
-            if spectral_centroid < 1500:
-                detected_moods.append("Dark")
-            if spectral_centroid > 3500:
-                detected_moods.append("Bright")
+            # === Embedding (similar-track index) ===
+            from app.services.similarity import track_embedding
+
+            embedding = track_embedding(
+                mfcc,
+                chroma,
+                {
+                    "centroid": spectral_centroid,
+                    "rolloff": spectral_rolloff,
+                    "bandwidth": spectral_bandwidth,
+                    "zero_crossing_rate": zero_crossing_rate,
+                    "energy_mean": energy_mean,
+                    "energy_std": energy_std,
+                    "bpm": bpm,
+                    "danceability": danceability,
+                },
+            )
 
-            return {
+            # === Heuristic Mood Detection (rules table) ===
+            from app.services.mood_rules import get_mood_rule_engine
+
+            mood_tags = get_mood_rule_engine().tag_one(
+                {
+                    "energy_mean": energy_mean,
+                    "bpm": bpm,
+                    "mode": mode,
+                    "danceability": danceability,
+                    "spectral_centroid": spectral_centroid,
+                }
+            )
+
+            result = {
                 "bpm": round(bpm, 1),
                 "key": detected_key,
                 "mode": mode,
                 "full_key": f"{detected_key} {mode}",
+                "key_confidence": key_estimate["confidence"],
+                "key_detection": {
+                    k: v for k, v in key_estimate.items() if k not in ("key", "mode", "full_key")
+                },
                 "duration_seconds": round(duration, 2),
-                "moods": detected_moods, 
+                "moods": mood_tags["moods"],
+                "mood_rules": mood_tags["rules"],
                 "spectral": {
                     "centroid": round(spectral_centroid, 2),
                     "rolloff": round(spectral_rolloff, 2),
@@ -158,9 +180,24 @@ class AdvancedAudioAnalyzer:
                 "rhythm": {
                     "danceability": round(danceability, 2),
                     "beat_count": len(beat_frames),
+                    "tempo_confidence": round(rhythm["confidence"], 3),
+                    "tempo_octave": rhythm["octave"],
                 },
                 "mfcc": mfcc_mean,
+                "embedding": [round(float(x), 5) for x in embedding],
             }
+            if timeline:
+                result["_frames"] = {
+                    "sample_rate": sr,
+                    "hop_length": 512,  # librosa default for rms, centroid and onsets
+                    "curves": {
+                        "rms": rms[0],
+                        "centroid": centroid_frames[0],
+                        "onset": onset_env,
+                    },
+                    "beat_times": librosa.frames_to_time(beat_frames, sr=sr),
+                }
+            return result
         except Exception as e:
             logger.error(f"Core analysis failed: {e}")
             raise
@@ -374,38 +411,109 @@ class AdvancedAudioAnalyzer:
             return {"error": str(e)}
 
     @staticmethod
-    async def full_analysis(file_path: str) -> Dict[str, Any]:
+    async def full_analysis(
+        file_path: str, timeline: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
-        Run all available analyses and combine results.
+        Run all available analyses and combine results. `timeline` (default
+        TIMELINE_ENABLED) also stores per-frame curves for /timeline.
         """
-        results = {}
+        if timeline is None:
+            timeline = settings.TIMELINE_ENABLED
 
-        # Core analysis (always run)
-        try:
-            results["core"] = await AdvancedAudioAnalyzer.analyze_core(file_path)
-        except Exception as e:
-            results["core"] = {"error": str(e)}
+        async def analyze_core(path: str) -> Dict[str, Any]:
+            return await AdvancedAudioAnalyzer.analyze_core(path, timeline=timeline)
 
-        # Loudness
-        try:
-            results["loudness"] = await AdvancedAudioAnalyzer.analyze_loudness(
-                file_path
-            )
-        except Exception as e:
-            results["loudness"] = {"error": str(e)}
+        results = {}
+        stages = [
+            ("core", analyze_core),  # always run
+            ("loudness", AdvancedAudioAnalyzer.analyze_loudness),
+            ("pitch", AdvancedAudioAnalyzer.analyze_pitch),  # optional, can be slow
+            ("existing_metadata", AdvancedAudioAnalyzer.read_metadata),
+        ]
+
+        with ANALYSIS_STAGE_SECONDS.time(stage="full_analysis"):
+            for name, analyze in stages:
+                try:
+                    with ANALYSIS_STAGE_SECONDS.time(stage=name):
+                        results[name] = await analyze(file_path)
+                except Exception as e:
+                    results[name] = {"error": str(e)}
+
+        if "embedding" in results.get("core", {}):
+            await AdvancedAudioAnalyzer.persist_features(file_path, results)
+        return results
+
+    @staticmethod
+    async def persist_features(file_path: str, results: Dict[str, Any]) -> None:
+        """
+        Feeds the catalog stores (similar-track index, columnar feature store,
+        timelines, waveform peaks). All are keyed by the SHA-256 of the file, returned as
+        core.track_key, so re-analyzing a file updates its entries.
+        """
+        frames = results["core"].pop("_frames", None)
+        if not (
+            settings.SIMILARITY_ENABLED
+            or settings.FEATURE_STORE_ENABLED
+            or settings.WAVEFORM_ENABLED
+            or frames
+        ):
+            return
+        from app.services.feature_store import feature_store
+        from app.services.fingerprint import content_hash
+        from app.services.timeline import timeline_store
+        from app.services.waveform import waveform_store
 
-        # Pitch (optional, can be slow)
         try:
-            results["pitch"] = await AdvancedAudioAnalyzer.analyze_pitch(file_path)
-        except Exception as e:
-            results["pitch"] = {"error": str(e)}
+            results["core"]["track_key"] = await asyncio.to_thread(content_hash, file_path)
+        except OSError as e:
+            logger.warning(f"Could not hash {file_path}: {e}")
+            return
+        if settings.SIMILARITY_ENABLED:
+            await AdvancedAudioAnalyzer.index_embedding(file_path, results)
+        if settings.FEATURE_STORE_ENABLED:
+            try:
+                await asyncio.to_thread(
+                    feature_store.append, results["core"]["track_key"], results
+                )
+            except Exception as e:
+                logger.warning(f"Feature store append failed: {e}")
+        if frames:
+            try:
+                results["core"]["timeline"] = await asyncio.to_thread(
+                    timeline_store.save, results["core"]["track_key"], **frames
+                )
+            except Exception as e:
+                logger.warning(f"Timeline save failed: {e}")
+        if settings.WAVEFORM_ENABLED:
+            try:
+                results["core"]["waveform"] = await asyncio.to_thread(
+                    waveform_store.generate, results["core"]["track_key"], file_path
+                )
+            except Exception as e:
+                logger.warning(f"Waveform peaks failed: {e}")
 
-        # Existing metadata
+    @staticmethod
+    async def index_embedding(file_path: str, results: Dict[str, Any]) -> None:
+        """Adds the track to the similar-track index under core.track_key."""
+        from app.services.fingerprint import content_hash
+        from app.services.similarity import similarity_index
+
+        core = results["core"]
+        existing = results.get("existing_metadata") or {}
+        # Routes analyze uploads as temp_<uuid>_<original name>
+        name = re.sub(r"^temp_[0-9a-f-]{36}_", "", os.path.basename(file_path))
+        metadata = {
+            "title": existing.get("title"),
+            "artist": existing.get("artist"),
+            "bpm": core.get("bpm"),
+            "key": core.get("full_key"),
+        }
         try:
-            results["existing_metadata"] = await AdvancedAudioAnalyzer.read_metadata(
-                file_path
+            key = core.get("track_key") or await asyncio.to_thread(content_hash, file_path)
+            await asyncio.to_thread(
+                similarity_index.add, key, core["embedding"], name, metadata
             )
+            core["track_key"] = key
         except Exception as e:
-            results["existing_metadata"] = {"error": str(e)}
-
-        return results
+            logger.warning(f"Similarity indexing failed: {e}")
@@ -0,0 +1,500 @@
+"""
+Columnar Feature Store
+One memory-mapped NumPy file per feature (BPM, key, loudness, spectral
+statistics, ...) with a row per analyzed track, appended to by
+full_analysis. Filters and aggregates are vectorized over whole columns, so
+catalog reports over millions of tracks never parse JSON.
+
+Layout: `<column>.bin` (raw values, capacity grown by doubling) plus
+`meta.json` with the committed row count and schema. Writers hold a file
+lock and publish rows by replacing meta.json, so readers in other
+processes only ever see complete rows.
+"""
+
+import json
+import logging
+import numbers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+KEYS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+MODES = ["Minor", "Major"]
+
+# name -> (dtype, categories). Missing values: NaN, -1, or 255 for categories.
+COLUMNS: Dict[str, Tuple[str, Optional[List[str]]]] = {
+    "track_key": ("S64", None),
+    "analyzed_at": ("float64", None),
+    "bpm": ("float32", None),
+    "key": ("uint8", KEYS),
+    "mode": ("uint8", MODES),
+    "duration_seconds": ("float32", None),
+    "spectral_centroid": ("float32", None),
+    "spectral_rolloff": ("float32", None),
+    "spectral_bandwidth": ("float32", None),
+    "zero_crossing_rate": ("float32", None),
+    "energy_mean": ("float32", None),
+    "energy_std": ("float32", None),
+    "danceability": ("float32", None),
+    "beat_count": ("int32", None),
+    "lufs": ("float32", None),
+    "true_peak_db": ("float32", None),
+    "loudness_range_lu": ("float32", None),
+    "gain_needed_db": ("float32", None),
+    "vocal_presence": ("float32", None),
+    "average_pitch_hz": ("float32", None),
+}
+
+METRICS = {
+    "mean": np.nanmean,
+    "sum": np.nansum,
+    "min": np.nanmin,
+    "max": np.nanmax,
+    "p10": lambda v: np.nanpercentile(v, 10),
+    "p50": lambda v: np.nanpercentile(v, 50),
+    "p90": lambda v: np.nanpercentile(v, 90),
+}
+
+COMPARISONS = {
+    "eq": np.equal,
+    "ne": np.not_equal,
+    "lt": np.less,
+    "le": np.less_equal,
+    "gt": np.greater,
+    "ge": np.greater_equal,
+}
+
+
+def missing_value(dtype: str) -> Any:
+    if dtype.startswith("float"):
+        return np.nan
+    if dtype == "uint8":
+        return 255
+    if dtype.startswith("S"):
+        return b""
+    return -1
+
+
+def feature_row(track_key: str, results: Dict[str, Any]) -> Dict[str, Any]:
+    """Flattens a full_analysis result into one store row."""
+
+    def section(name: str) -> Dict[str, Any]:
+        value = results.get(name)
+        return value if isinstance(value, dict) and "error" not in value else {}
+
+    core, loudness, pitch = section("core"), section("loudness"), section("pitch")
+    spectral, energy, rhythm = (core.get(k) or {} for k in ("spectral", "energy", "rhythm"))
+    return {
+        "track_key": track_key,
+        "analyzed_at": time.time(),
+        "bpm": core.get("bpm"),
+        "key": core.get("key"),
+        "mode": core.get("mode"),
+        "duration_seconds": core.get("duration_seconds"),
+        "spectral_centroid": spectral.get("centroid"),
+        "spectral_rolloff": spectral.get("rolloff"),
+        "spectral_bandwidth": spectral.get("bandwidth"),
+        "zero_crossing_rate": spectral.get("zero_crossing_rate"),
+        "energy_mean": energy.get("mean"),
+        "energy_std": energy.get("std"),
+        "danceability": rhythm.get("danceability"),
+        "beat_count": rhythm.get("beat_count"),
+        "lufs": loudness.get("lufs"),
+        "true_peak_db": loudness.get("true_peak_db"),
+        "loudness_range_lu": loudness.get("loudness_range_lu"),
+        "gain_needed_db": (loudness.get("normalization") or {}).get("gain_needed_db"),
+        "vocal_presence": pitch.get("vocal_presence"),
+        "average_pitch_hz": pitch.get("average_pitch_hz"),
+    }
+
+
+class FeatureStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._columns: Dict[str, np.memmap] = {}
+        self._rows = 0
+        self._capacity = 0
+        self._meta_mtime: Optional[float] = None
+
+    # --- Storage ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _write_lock(self):
+        """Serializes writers across threads and (where supported) processes."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Picks up rows (and growth) committed by other writers."""
+        meta_path = self._path("meta.json")
+        mtime = os.path.getmtime(meta_path) if os.path.exists(meta_path) else None
+        if mtime == self._meta_mtime:
+            return
+        meta = {"rows": 0, "capacity": 0}
+        if mtime is not None:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        self._meta_mtime = mtime
+        self._rows = meta["rows"]
+        if meta["capacity"] != self._capacity or set(meta.get("columns", [])) != set(COLUMNS):
+            self._map(meta["capacity"], meta.get("columns", []))
+
+    def _map(self, capacity: int, existing: Sequence[str]) -> None:
+        """Maps every column at `capacity` rows, creating columns new to the schema."""
+        self._columns = {}
+        self._capacity = capacity
+        if not capacity:
+            return
+        for name, (dtype, _) in COLUMNS.items():
+            path = self._path(f"{name}.bin")
+            size = capacity * np.dtype(dtype).itemsize
+            fill = name not in existing or not os.path.exists(path)
+            if fill:
+                open(path, "wb").close()
+            if os.path.getsize(path) < size:
+                os.truncate(path, size)
+            column = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,))
+            if fill:
+                column[:] = missing_value(dtype)
+            self._columns[name] = column
+
+    def _grow(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        old = self._capacity
+        capacity = max(1024, 1 << (rows - 1).bit_length())
+        self._map(capacity, list(COLUMNS))
+        for name, (dtype, _) in COLUMNS.items():
+            self._columns[name][old:] = missing_value(dtype)
+
+    def _commit(self) -> None:
+        for column in self._columns.values():
+            column.flush()
+        temp_path = self._path("meta.tmp.json")
+        with open(temp_path, "w") as f:
+            meta = {"rows": self._rows, "capacity": self._capacity, "columns": list(COLUMNS)}
+            json.dump(meta, f)
+        os.replace(temp_path, self._path("meta.json"))
+        self._meta_mtime = os.path.getmtime(self._path("meta.json"))
+
+    # --- Ingestion ---
+
+    def append(self, track_key: str, results: Dict[str, Any]) -> int:
+        return self.append_rows([feature_row(track_key, results)])[0]
+
+    def append_rows(self, rows: Sequence[Dict[str, Any]]) -> List[int]:
+        """
+        Writes rows and returns their indexes. A row whose track_key is already
+        stored replaces it, so re-analyzing a file keeps one row per track.
+        """
+        with self._write_lock():
+            self._refresh()
+            keys = np.array([str(row["track_key"]).encode() for row in rows], dtype="S64")
+            found: Dict[bytes, int] = {}
+            if self._rows:
+                stored = self._columns["track_key"][: self._rows]
+                found = {bytes(stored[i]): int(i) for i in np.flatnonzero(np.isin(stored, keys))}
+            indexes = []
+            for key in keys.tolist():
+                if key not in found:
+                    found[key] = self._rows
+                    self._rows += 1
+                indexes.append(found[key])
+            self._grow(self._rows)
+
+            positions = np.asarray(indexes, dtype=np.int64)
+            for name, (dtype, categories) in COLUMNS.items():
+                if name == "track_key":
+                    self._columns[name][positions] = keys
+                    continue
+                values = [row.get(name) for row in rows]
+                if categories is not None:
+                    values = [categories.index(v) if v in categories else None for v in values]
+                missing = missing_value(dtype)
+                self._columns[name][positions] = np.array(
+                    [missing if v is None else v for v in values], dtype=dtype
+                )
+            self._commit()
+        return indexes
+
+    # --- Queries ---
+
+    def _column(self, name: str, rows: int) -> np.ndarray:
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown column '{name}'")
+        return self._columns[name][:rows]
+
+    def _encode(self, name: str, value: Any) -> Any:
+        categories = COLUMNS[name][1]
+        if categories is not None and isinstance(value, str):
+            if value not in categories:
+                raise ValueError(f"Unknown {name} '{value}' (expected one of {categories})")
+            return categories.index(value)
+        if name == "track_key":
+            return str(value).encode()
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise ValueError(f"Filter value for '{name}' must be a number, got {value!r}")
+        return value
+
+    def _mask(self, filters: Sequence[Dict[str, Any]], rows: int) -> np.ndarray:
+        """
+        AND of filters like {"column": "bpm", "op": "between", "value": [120, 130]}.
+        Ops: eq ne lt le gt ge between in isnull notnull.
+        """
+        mask = np.ones(rows, dtype=bool)
+        for spec in filters:
+            name, op, value = spec.get("column"), spec.get("op", "eq"), spec.get("value")
+            column = self._column(name, rows)
+            dtype = COLUMNS[name][0]
+            if op in ("isnull", "notnull"):
+                if dtype.startswith("float"):
+                    missing = np.isnan(column)
+                else:
+                    missing = column == missing_value(dtype)
+                mask &= missing if op == "isnull" else ~missing
+            elif op == "between":
+                if not isinstance(value, (list, tuple)) or len(value) != 2:
+                    raise ValueError(f"'between' on '{name}' needs a [low, high] value")
+                low, high = (self._encode(name, v) for v in value)
+                mask &= (column >= low) & (column <= high)
+            elif op == "in":
+                if not isinstance(value, (list, tuple)):
+                    raise ValueError(f"'in' on '{name}' needs a list value")
+                mask &= np.isin(column, [self._encode(name, v) for v in value])
+            elif op in COMPARISONS:
+                mask &= COMPARISONS[op](column, self._encode(name, value))
+            else:
+                raise ValueError(f"Unknown filter op '{op}'")
+        return mask
+
+    def _decode(self, name: str, values: np.ndarray) -> List[Any]:
+        dtype, categories = COLUMNS[name]
+        missing = missing_value(dtype)
+        if categories is not None:
+            return [categories[v] if v != missing else None for v in values.tolist()]
+        if name == "track_key":
+            return [v.decode() for v in values.tolist()]
+        if dtype.startswith("float"):
+            return [None if v != v else round(v, 4) for v in values.tolist()]
+        return [None if v == missing else v for v in values.tolist()]
+
+    def query(
+        self,
+        filters: Sequence[Dict[str, Any]] = (),
+        columns: Optional[Sequence[str]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Matching rows (selected columns), plus the total match count."""
+        with self._lock:
+            self._refresh()
+            rows = self._rows
+            mask = self._mask(filters, rows)
+            selected = np.flatnonzero(mask)
+            if order_by:
+                values = self._column(order_by, rows)[selected]
+                order = np.argsort(values, kind="stable")
+                if descending:
+                    order = order[::-1]
+                selected = selected[order]
+            page = selected[offset : offset + limit]
+            columns = list(columns or COLUMNS)
+            data = {name: self._decode(name, self._column(name, rows)[page]) for name in columns}
+        return {
+            "total": int(len(selected)),
+            "rows": [dict(zip(columns, values)) for values in zip(*data.values())],
+        }
+
+    def _group_codes(self, spec: str, rows: int) -> Tuple[np.ndarray, Any]:
+        """Group codes for `column` or `column:width` (numeric bins)."""
+        name, _, width = spec.partition(":")
+        column = self._column(name, rows)
+        if width:
+            binned = np.floor(column / float(width)) * float(width)
+            # One group for missing values (NaN never compares equal)
+            binned = np.where(np.isnan(binned), np.inf, binned)
+            return binned, lambda v: None if np.isinf(v) else round(float(v), 4)
+        decoded = self._decode
+        return column, lambda v: decoded(name, np.array([v], dtype=column.dtype))[0]
+
+    def aggregate(
+        self,
+        filters: Sequence[Dict[str, Any]] = (),
+        group_by: Sequence[str] = (),
+        metrics: Sequence[str] = ("count",),
+    ) -> Dict[str, Any]:
+        """
+        Grouped aggregates. `group_by` entries are columns, or `column:width`
+        to bin a numeric column (e.g. "bpm:10"). Metrics are "count" or
+        "<fn>:<column>" with fn in mean sum min max p10 p50 p90 (NaN-aware).
+        """
+        with self._lock:
+            self._refresh()
+            rows = self._rows
+            selected = np.flatnonzero(self._mask(filters, rows))
+            parsed = []
+            for metric in metrics:
+                fn, _, name = metric.partition(":")
+                if metric != "count" and (fn not in METRICS or not name):
+                    raise ValueError(f"Unknown metric '{metric}'")
+                values = None if metric == "count" else self._column(name, rows)[selected]
+                parsed.append((metric, fn, values))
+
+            # Mixed-radix group ids over per-column codes keep grouping in integers
+            inverse = np.zeros(len(selected), dtype=np.int64)
+            labels = []
+            for spec in group_by:
+                codes, decode = self._group_codes(spec, rows)
+                values, codes = np.unique(codes[selected], return_inverse=True)
+                inverse = inverse * len(values) + codes.reshape(-1)
+                labels.append((spec, values, decode))
+            if group_by:
+                group_ids, inverse = np.unique(inverse, return_inverse=True)
+                inverse = inverse.reshape(-1)
+            else:
+                group_ids = np.zeros(1, dtype=np.int64)
+            n_groups = len(group_ids)
+
+            columns: Dict[str, List[Any]] = {}
+            order = bounds = None
+            for metric, fn, values in parsed:
+                if values is None:
+                    columns[metric] = np.bincount(inverse, minlength=n_groups).tolist()
+                    continue
+                values = values.astype(np.float64)
+                valid = ~np.isnan(values)
+                counts = np.bincount(inverse[valid], minlength=n_groups)
+                if fn in ("mean", "sum"):
+                    sums = np.bincount(inverse[valid], weights=values[valid], minlength=n_groups)
+                    totals = sums / np.maximum(counts, 1) if fn == "mean" else sums
+                    columns[metric] = [
+                        round(float(t), 4) if c else None for t, c in zip(totals, counts)
+                    ]
+                    continue
+                if order is None:
+                    order = np.argsort(inverse, kind="stable")
+                    bounds = np.searchsorted(inverse[order], np.arange(n_groups + 1))
+                results = []
+                for g in range(n_groups):
+                    subset = values[order[bounds[g] : bounds[g + 1]]]
+                    subset = subset[~np.isnan(subset)]
+                    results.append(round(float(METRICS[fn](subset)), 4) if subset.size else None)
+                columns[metric] = results
+
+            shape = [len(values) for _, values, _ in labels]
+            groups = []
+            for g, group_id in enumerate(group_ids.tolist()):
+                position = np.unravel_index(group_id, shape) if shape else ()
+                entry = {
+                    spec: decode(values[i])
+                    for (spec, values, decode), i in zip(labels, position)
+                }
+                entry.update({metric: column[g] for metric, column in columns.items()})
+                groups.append(entry)
+        return {"matched": int(len(selected)), "groups": groups}
+
+    def histogram(
+        self,
+        column: str,
+        bins: int = 20,
+        value_range: Optional[Tuple[float, float]] = None,
+        filters: Sequence[Dict[str, Any]] = (),
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            rows = self._rows
+            values = self._column(column, rows)[self._mask(filters, rows)].astype(np.float64)
+        values = values[~np.isnan(values)]
+        counts, edges = np.histogram(values, bins=bins, range=value_range)
+        return {
+            "column": column,
+            "count": int(len(values)),
+            "edges": [round(float(e), 4) for e in edges],
+            "counts": counts.tolist(),
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Catalog overview: BPM distribution, key histogram and loudness compliance."""
+        start = time.perf_counter()
+        measured = [{"column": "lufs", "op": "notnull"}]
+        loudness = self.aggregate(
+            measured, metrics=["count", "mean:lufs", "p50:lufs", "p90:true_peak_db"]
+        )["groups"][0]
+
+        def share(*filters):
+            count = self.query(measured + list(filters), columns=[], limit=0)["total"]
+            return round(count / loudness["count"], 4) if loudness["count"] else None
+
+        report = {
+            "tracks": self.stats()["rows"],
+            "bpm": {
+                **self.aggregate(metrics=["mean:bpm", "p50:bpm"])["groups"][0],
+                "histogram": self.histogram("bpm", bins=18, value_range=(40, 220)),
+            },
+            "keys": sorted(
+                self.aggregate(
+                    [{"column": "key", "op": "notnull"}], group_by=["key", "mode"]
+                )["groups"],
+                key=lambda g: -g["count"],
+            ),
+            "loudness": {
+                "measured": loudness["count"],
+                "mean_lufs": loudness["mean:lufs"],
+                "median_lufs": loudness["p50:lufs"],
+                "p90_true_peak_db": loudness["p90:true_peak_db"],
+                # Same rule as analyze_loudness: within 1 LU of the -14 LUFS target
+                "compliant_share": share(
+                    {"column": "gain_needed_db", "op": "between", "value": [-1, 1]}
+                ),
+                "too_loud_share": share({"column": "gain_needed_db", "op": "lt", "value": -1}),
+                "too_quiet_share": share({"column": "gain_needed_db", "op": "gt", "value": 1}),
+                "true_peak_over_share": share(
+                    {"column": "true_peak_db", "op": "gt", "value": -1}
+                ),
+            },
+        }
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {"rows": self._rows, "capacity": self._capacity, "columns": list(COLUMNS)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._columns = {}
+            self._capacity = 0
+            self._meta_mtime = None
+
+
+# Shared instance appended to by full_analysis and read by the /features routes
+feature_store = FeatureStore(settings.FEATURE_STORE_DIR)
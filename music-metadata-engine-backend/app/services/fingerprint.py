@@ -0,0 +1,529 @@
+"""
+Audio Fingerprint Index
+Local landmark fingerprints (spectral peak pairs, as in Shazam/dejavu) kept
+in an SQLite inverted index, for exact and near-duplicate detection across
+the catalog without calling AudD.
+
+A fingerprint is the set of hashes (f1, f2, dt) of nearby spectrogram peak
+pairs, each with the frame of its anchor peak. A query matches a track when
+many of its hashes hit that track at one consistent time offset, so a
+re-encode, a gain change or an excerpt of a known track still scores high.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+N_FFT = 1024
+HOP_LENGTH = 256
+PEAK_NEIGHBORHOOD = (15, 11)  # (frequency bins, frames) a peak must dominate
+PEAK_FLOOR_DB = -60.0  # relative to the loudest bin
+PEAK_PROMINENCE_DB = 15.0  # above the frame's median, so noise-floor maxima are skipped
+PEAKS_PER_SECOND = 30
+MAX_PAIR_FRAMES = 200  # how far ahead an anchor looks for partners (~4.6 s)
+
+AudioInput = Union[bytes, str]
+
+
+# === LAZY IMPORTS ===
+def get_librosa():
+    import librosa
+
+    return librosa
+
+
+def get_ndimage():
+    from scipy import ndimage
+
+    return ndimage
+
+
+def content_hash(audio: AudioInput) -> str:
+    """SHA-256 of the file bytes, for byte-identical duplicates."""
+    digest = hashlib.sha256()
+    if isinstance(audio, (bytes, bytearray)):
+        digest.update(audio)
+    else:
+        with open(audio, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def load_audio(audio: AudioInput, sample_rate: int, max_seconds: float = 0) -> np.ndarray:
+    source = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+    signal, _ = get_librosa().load(
+        source, sr=sample_rate, mono=True, duration=max_seconds or None
+    )
+    return signal
+
+
+def find_peaks(signal: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Spectrogram peaks as (frames, frequency bins), sorted by time."""
+    librosa = get_librosa()
+    magnitude = np.abs(librosa.stft(signal, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    if not magnitude.size or not magnitude.max():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    spectrogram = librosa.amplitude_to_db(magnitude, ref=np.max)
+
+    neighborhood_max = get_ndimage().maximum_filter(spectrogram, size=PEAK_NEIGHBORHOOD)
+    local_max = neighborhood_max == spectrogram
+    floor = np.maximum(np.median(spectrogram, axis=0) + PEAK_PROMINENCE_DB, PEAK_FLOOR_DB)
+    freqs, frames = np.nonzero(local_max & (spectrogram > floor))
+    strength = spectrogram[freqs, frames]
+
+    # Keep the strongest peaks so density (and index size) is bounded per second
+    budget = max(1, int(len(signal) / sample_rate * PEAKS_PER_SECOND))
+    if len(frames) > budget:
+        keep = np.argpartition(-strength, budget)[:budget]
+        freqs, frames = freqs[keep], frames[keep]
+    order = np.lexsort((freqs, frames))
+    return frames[order].astype(np.int64), freqs[order].astype(np.int64)
+
+
+def peak_pair_hashes(
+    frames: np.ndarray, freqs: np.ndarray, fan_out: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs every anchor peak with the next `fan_out` peaks and packs each pair
+    as f1 (10 bits) | f2 (10 bits) | dt (8 bits). Returns (hashes, anchor frames).
+    """
+    hashes, offsets = [], []
+    for k in range(1, fan_out + 1):
+        dt = frames[k:] - frames[:-k]
+        valid = (dt > 0) & (dt <= MAX_PAIR_FRAMES)
+        anchors = np.flatnonzero(valid)
+        hashes.append(
+            (freqs[anchors] << 18) | (freqs[anchors + k] << 8) | np.minimum(dt[anchors], 255)
+        )
+        offsets.append(frames[anchors])
+    if not hashes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(hashes), np.concatenate(offsets)
+
+
+def fingerprint(audio: AudioInput) -> Dict[str, Any]:
+    """Hashes, anchor offsets (frames) and duration of one recording."""
+    sample_rate = settings.FINGERPRINT_SAMPLE_RATE
+    signal = load_audio(audio, sample_rate, settings.FINGERPRINT_MAX_SECONDS)
+    frames, freqs = find_peaks(signal, sample_rate)
+    hashes, offsets = peak_pair_hashes(frames, freqs, settings.FINGERPRINT_FAN_OUT)
+    return {
+        "hashes": hashes,
+        "offsets": offsets,
+        "duration": round(len(signal) / sample_rate, 3),
+    }
+
+
+def frames_to_seconds(frames: float) -> float:
+    return round(float(frames) * HOP_LENGTH / settings.FINGERPRINT_SAMPLE_RATE, 3)
+
+
+class FingerprintIndex:
+    """
+    Inverted index hash -> (track, offset) in SQLite. The hash table is a
+    WITHOUT ROWID table clustered on the hash, so a lookup is one B-tree
+    range scan per query hash.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS fp_tracks (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    content_hash TEXT NOT NULL,
+                    duration REAL NOT NULL,
+                    hashes INTEGER NOT NULL,
+                    metadata TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_fp_tracks_content ON fp_tracks (content_hash);
+                CREATE TABLE IF NOT EXISTS fp_hashes (
+                    hash INTEGER NOT NULL,
+                    track_id INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    PRIMARY KEY (hash, track_id, offset)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ix_fp_hashes_track ON fp_hashes (track_id);
+                CREATE TABLE IF NOT EXISTS fp_duplicates (
+                    track_id INTEGER NOT NULL,
+                    duplicate_id INTEGER NOT NULL,
+                    confidence REAL NOT NULL,
+                    PRIMARY KEY (track_id, duplicate_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ix_fp_duplicates_duplicate
+                    ON fp_duplicates (duplicate_id);
+                CREATE TEMP TABLE IF NOT EXISTS fp_query (
+                    hash INTEGER NOT NULL,
+                    offset INTEGER NOT NULL
+                );
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    # --- Ingestion ---
+
+    def add(
+        self,
+        audio: AudioInput,
+        name: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return self.add_many([(audio, name, metadata)])[0]
+
+    def add_many(
+        self,
+        items: Sequence[Tuple[AudioInput, Optional[str], Optional[Dict[str, Any]]]],
+        workers: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fingerprints recordings in parallel and indexes them in one transaction.
+        Byte-identical files already in the index are not indexed again. Each
+        new track is then matched against the catalog; its duplicates are
+        returned and stored, so duplicate groups never need a full rescan.
+        """
+
+        def compute(item):
+            audio, name, metadata = item
+            digest = content_hash(audio)
+            existing = self._by_content(digest)
+            if existing is not None:
+                return {"track_id": existing, "name": name, "exact_duplicate": True}
+            try:
+                return {
+                    "name": name,
+                    "metadata": metadata,
+                    "content_hash": digest,
+                    **fingerprint(audio),
+                }
+            except Exception as e:
+                logger.warning(f"Fingerprinting {name} failed: {e}")
+                return {"name": name, "error": str(e)}
+
+        workers = workers or settings.FINGERPRINT_WORKERS or min(len(items), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            computed = list(pool.map(compute, items))
+
+        results = []
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for item in computed:
+                    if "hashes" not in item:
+                        results.append(item)
+                        continue
+                    # Same bytes earlier in this batch (or from a concurrent ingest)
+                    row = conn.execute(
+                        "SELECT id FROM fp_tracks WHERE content_hash = ? LIMIT 1",
+                        (item["content_hash"],),
+                    ).fetchone()
+                    if row is not None:
+                        results.append(
+                            {"track_id": row[0], "name": item["name"], "exact_duplicate": True}
+                        )
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO fp_tracks "
+                        "(name, content_hash, duration, hashes, metadata, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            item["name"],
+                            item["content_hash"],
+                            item["duration"],
+                            len(item["hashes"]),
+                            json.dumps(item["metadata"]) if item["metadata"] is not None else None,
+                            time.time(),
+                        ),
+                    )
+                    track_id = cursor.lastrowid
+                    hashes = item["hashes"].tolist()
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO fp_hashes (hash, track_id, offset) VALUES (?, ?, ?)",
+                        zip(hashes, [track_id] * len(hashes), item["offsets"].tolist()),
+                    )
+                    results.append(
+                        {
+                            "track_id": track_id,
+                            "name": item["name"],
+                            "duration": item["duration"],
+                            "hashes": len(item["hashes"]),
+                            "exact_duplicate": False,
+                        }
+                    )
+        for result in results:
+            if result.get("exact_duplicate") is False:
+                result["duplicates"] = self._record_duplicates(result["track_id"])
+        return results
+
+    def _record_duplicates(self, track_id: int) -> List[Dict[str, Any]]:
+        """Stores the track's duplicate pairs (lower id first) and returns its matches."""
+        matches = self.duplicates_of(track_id)
+        pairs = [
+            (min(track_id, m["track_id"]), max(track_id, m["track_id"]), m["confidence"])
+            for m in matches
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO fp_duplicates (track_id, duplicate_id, confidence) "
+                    "VALUES (?, ?, ?) ON CONFLICT (track_id, duplicate_id) DO UPDATE "
+                    "SET confidence = MAX(confidence, excluded.confidence)",
+                    pairs,
+                )
+        return matches
+
+    def rebuild_duplicates(self) -> int:
+        """
+        Recomputes every stored duplicate pair with one lookup per track.
+        Only needed for indexes built before pairs were stored at ingest.
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM fp_duplicates")
+        for track_id in self.track_ids():
+            self._record_duplicates(track_id)
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM fp_duplicates").fetchone()[0]
+
+    def _by_content(self, digest: str) -> Optional[int]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id FROM fp_tracks WHERE content_hash = ? LIMIT 1", (digest,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def remove(self, track_id: int) -> bool:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM fp_hashes WHERE track_id = ?", (track_id,))
+                conn.execute(
+                    "DELETE FROM fp_duplicates WHERE track_id = ? OR duplicate_id = ?",
+                    (track_id, track_id),
+                )
+                deleted = conn.execute("DELETE FROM fp_tracks WHERE id = ?", (track_id,)).rowcount
+        return bool(deleted)
+
+    # --- Lookup ---
+
+    def match_hashes(
+        self,
+        hashes: np.ndarray,
+        offsets: np.ndarray,
+        limit: int = 5,
+        exclude: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Tracks sharing many hashes at one consistent time offset, best first.
+        `score` is the number of aligned hashes; `confidence` is the fraction of
+        the query's hashes that align.
+        """
+        if not len(hashes):
+            return []
+        with self._lock:
+            conn = self._connect()
+            # Committed at once: an open transaction would pin this connection
+            # to an old snapshot and block other workers' writes and checkpoints
+            with conn:
+                conn.execute("DELETE FROM fp_query")
+                conn.executemany(
+                    "INSERT INTO fp_query (hash, offset) VALUES (?, ?)",
+                    zip(hashes.tolist(), offsets.tolist()),
+                )
+                rows = conn.execute(
+                    "SELECT h.track_id, h.offset - q.offset FROM fp_query q "
+                    "JOIN fp_hashes h ON h.hash = q.hash"
+                ).fetchall()
+        if not rows:
+            return []
+
+        hits = np.asarray(rows, dtype=np.int64)
+        if exclude is not None:
+            hits = hits[hits[:, 0] != exclude]
+        if not len(hits):
+            return []
+        # Histogram of (track, offset difference): a real match piles up in one
+        # bin. Neighbouring bins are added in, since a query that does not start
+        # on a frame boundary shifts some peaks by one frame.
+        keys = (hits[:, 0] << 32) + hits[:, 1] + (1 << 31)
+        unique, counts = np.unique(keys, return_counts=True)
+        smoothed = counts.copy()
+        for shift in (-1, 1):
+            neighbour = np.searchsorted(unique, unique + shift)
+            found = neighbour < len(unique)
+            found[found] &= unique[neighbour[found]] == unique[found] + shift
+            smoothed[found] += counts[neighbour[found]]
+        order = np.argsort(-smoothed, kind="stable")
+        best: Dict[int, Tuple[int, int]] = {}
+        for i in order:
+            track_id = int(unique[i] >> 32)
+            if track_id not in best:
+                delta = int((unique[i] & 0xFFFFFFFF) - (1 << 31))
+                best[track_id] = (int(smoothed[i]), delta)
+                if len(best) >= limit * 4:
+                    break
+
+        ranked = sorted(best.items(), key=lambda item: -item[1][0])
+        ranked = [item for item in ranked if item[1][0] >= settings.FINGERPRINT_MIN_SCORE][:limit]
+        tracks = self._tracks([track_id for track_id, _ in ranked])
+        return [
+            {
+                **tracks.get(track_id, {"track_id": track_id}),
+                "score": score,
+                "confidence": round(min(1.0, score / len(hashes)), 4),
+                "offset_seconds": frames_to_seconds(delta),
+            }
+            for track_id, (score, delta) in ranked
+        ]
+
+    def match(self, audio: AudioInput, limit: int = 5) -> Dict[str, Any]:
+        start = time.perf_counter()
+        exact = self._by_content(content_hash(audio))
+        query = fingerprint(audio)
+        matches = self.match_hashes(query["hashes"], query["offsets"], limit)
+        return {
+            "known": bool(matches) or exact is not None,
+            "exact_duplicate_of": exact,
+            "matches": matches,
+            "query_hashes": len(query["hashes"]),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def _track_hashes(self, track_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT hash, offset FROM fp_hashes WHERE track_id = ?", (track_id,)
+            ).fetchall()
+        data = np.asarray(rows, dtype=np.int64).reshape(-1, 2)
+        return data[:, 0], data[:, 1]
+
+    def duplicates_of(
+        self, track_id: int, min_confidence: Optional[float] = None, limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Other catalog tracks that are the same recording (or contain it)."""
+        if min_confidence is None:
+            min_confidence = settings.FINGERPRINT_DUPLICATE_CONFIDENCE
+        hashes, offsets = self._track_hashes(track_id)
+        matches = self.match_hashes(hashes, offsets, limit, exclude=track_id)
+        return [m for m in matches if m["confidence"] >= min_confidence]
+
+    def duplicate_groups(
+        self, min_confidence: Optional[float] = None, limit: int = 100, offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Groups of catalog tracks that are duplicates of each other, built
+        (union-find) from the pairs stored at ingest, ordered by lowest track
+        id. Pairs are stored at FINGERPRINT_DUPLICATE_CONFIDENCE, so a lower
+        `min_confidence` than that finds nothing more.
+        """
+        if min_confidence is None:
+            min_confidence = settings.FINGERPRINT_DUPLICATE_CONFIDENCE
+        with self._lock:
+            pairs = self._connect().execute(
+                "SELECT track_id, duplicate_id FROM fp_duplicates WHERE confidence >= ?",
+                (min_confidence,),
+            ).fetchall()
+
+        parent: Dict[int, int] = {}
+
+        def find(x: int) -> int:
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in pairs:
+            parent[find(b)] = find(a)
+
+        groups: Dict[int, List[int]] = {}
+        for track_id in list(parent):
+            groups.setdefault(find(track_id), []).append(track_id)
+        ordered = sorted(groups.values(), key=min)
+        page = ordered[offset : offset + limit]
+        tracks = self._tracks([t for members in page for t in members])
+        return {
+            "groups": [
+                {"tracks": [tracks[t] for t in sorted(members) if t in tracks]}
+                for members in page
+            ],
+            "total": len(ordered),
+        }
+
+    # --- Catalog ---
+
+    def _tracks(self, track_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        if not track_ids:
+            return {}
+        placeholders = ",".join("?" * len(track_ids))
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, name, duration, hashes, metadata FROM fp_tracks "
+                f"WHERE id IN ({placeholders})",
+                list(track_ids),
+            ).fetchall()
+        return {
+            row[0]: {
+                "track_id": row[0],
+                "name": row[1],
+                "duration": row[2],
+                "hashes": row[3],
+                "metadata": json.loads(row[4]) if row[4] else None,
+            }
+            for row in rows
+        }
+
+    def track(self, track_id: int) -> Optional[Dict[str, Any]]:
+        return self._tracks([track_id]).get(track_id)
+
+    def track_ids(self) -> List[int]:
+        with self._lock:
+            rows = self._connect().execute("SELECT id FROM fp_tracks ORDER BY id").fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            tracks, seconds = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(duration), 0) FROM fp_tracks"
+            ).fetchone()
+            hashes = conn.execute("SELECT COUNT(*) FROM fp_hashes").fetchone()[0]
+        return {"tracks": tracks, "hashes": hashes, "audio_seconds": round(seconds, 1)}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared instance used by the fingerprint routes
+fingerprint_index = FingerprintIndex(settings.FINGERPRINT_DB_PATH)
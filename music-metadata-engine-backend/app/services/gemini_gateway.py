@@ -0,0 +1,217 @@
+"""
+Gemini Gateway
+Single entry point for Gemini calls: reuses configured model instances,
+deduplicates identical in-flight prompts, caches results by content hash,
+streams text responses and caps concurrent calls per user.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from app.config import settings
+from app.metrics import LLM_CACHE_LOOKUPS, MODEL_LOAD_SECONDS, track_llm
+from app.services.llm_cache import llm_cache, make_cache_key
+from app.types import user_key  # noqa: F401  (re-exported for the routes)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+DEFAULT_API_URL = "https://generativelanguage.googleapis.com"
+
+# Analysis fields that are large and add nothing to a text-generation prompt
+BULKY_CONTEXT_KEYS = {"mfcc", "technical", "loudness", "trace", "error", "_note"}
+
+
+# === LAZY IMPORTS ===
+_genai = None
+
+
+def uses_rest() -> bool:
+    """Custom endpoints (e.g. the load-test mock upstreams) are reached over REST."""
+    return settings.GEMINI_API_URL.rstrip("/") != DEFAULT_API_URL
+
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        if not uses_rest():
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+        else:
+            genai.configure(
+                api_key=settings.GEMINI_API_KEY,
+                transport="rest",
+                client_options={"api_endpoint": settings.GEMINI_API_URL},
+            )
+        _genai = genai
+    return _genai
+
+
+def compact_context(metadata: Dict[str, Any]) -> str:
+    """
+    Serializes metadata for a prompt: drops empty values and bulky analysis
+    fields, and uses compact, key-sorted JSON so equal metadata always
+    produces an identical prompt (and therefore a cache hit).
+    """
+    cleaned = {
+        key: value
+        for key, value in (metadata or {}).items()
+        if key not in BULKY_CONTEXT_KEYS and value not in (None, "", [], {})
+    }
+    return json.dumps(cleaned, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class ConcurrencyLimitExceeded(RuntimeError):
+    pass
+
+
+class GeminiGateway:
+    """
+    Shared Gemini client. One instance is created per process.
+    """
+
+    def __init__(self, max_concurrent_per_user: int):
+        self.max_concurrent_per_user = max_concurrent_per_user
+        self._models: Dict[Tuple[str, bool], Any] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._active: Dict[str, int] = defaultdict(int)
+
+    def get_model(self, model_name: str = DEFAULT_MODEL, json_mode: bool = True):
+        """Returns a configured GenerativeModel, building it only once."""
+        key = (model_name, json_mode)
+        if key not in self._models:
+            with MODEL_LOAD_SECONDS.time(model="gemini-client"):
+                genai = get_genai()
+            generation_config = (
+                {"response_mime_type": "application/json"} if json_mode else None
+            )
+            self._models[key] = genai.GenerativeModel(
+                model_name=model_name, generation_config=generation_config
+            )
+        return self._models[key]
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    @property
+    def active_calls(self) -> int:
+        return sum(self._active.values())
+
+    # --- Per-user concurrency ---
+
+    def acquire(self, user_id: str) -> None:
+        if self.max_concurrent_per_user > 0 and (
+            self._active[user_id] >= self.max_concurrent_per_user
+        ):
+            raise ConcurrencyLimitExceeded(
+                f"Too many concurrent AI requests (limit: {self.max_concurrent_per_user})."
+            )
+        self._active[user_id] += 1
+
+    def release(self, user_id: str) -> None:
+        self._active[user_id] -= 1
+        if self._active[user_id] <= 0:
+            del self._active[user_id]
+
+    @asynccontextmanager
+    async def user_slot(self, user_id: str):
+        self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release(user_id)
+
+    # --- Generation ---
+
+    async def generate(
+        self,
+        prompt: Any,
+        model_name: str = DEFAULT_MODEL,
+        json_mode: bool = True,
+        use_cache: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Returns the parsed JSON response (json_mode) or {"content": text}.
+        Identical concurrent prompts share one upstream call.
+        """
+        key = make_cache_key(model_name, prompt=prompt, json_mode=json_mode)
+        if use_cache and settings.LLM_CACHE_ENABLED:
+            cached = llm_cache.get(key)
+            LLM_CACHE_LOOKUPS.inc(
+                provider="gemini", result="miss" if cached is None else "hit"
+            )
+            if cached is not None:
+                return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._generate_and_store(key, prompt, model_name, json_mode)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _generate_and_store(
+        self, key: str, prompt: Any, model_name: str, json_mode: bool
+    ) -> Dict[str, Any]:
+        model = self.get_model(model_name, json_mode)
+        with track_llm("gemini"):
+            if uses_rest():
+                # The SDK's async client only speaks gRPC; REST calls run in a thread
+                response = await asyncio.to_thread(model.generate_content, prompt)
+            else:
+                response = await model.generate_content_async(prompt)
+        result = json.loads(response.text) if json_mode else {"content": response.text}
+        if settings.LLM_CACHE_ENABLED:
+            llm_cache.set(key, model_name, result)
+        return result
+
+    async def stream(
+        self, prompt: str, model_name: str = DEFAULT_MODEL, use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Yields text chunks as Gemini produces them. A cached response is
+        replayed as a single chunk; a completed stream is written to the cache.
+        """
+        key = make_cache_key(model_name, prompt=prompt, json_mode=False)
+        if use_cache and settings.LLM_CACHE_ENABLED:
+            cached = llm_cache.get(key)
+            if cached is not None:
+                yield cached["content"]
+                return
+
+        model = self.get_model(model_name, json_mode=False)
+        parts = []
+        with track_llm("gemini_stream"):
+            async for chunk in self._stream_chunks(model, prompt):
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield text
+
+        if settings.LLM_CACHE_ENABLED:
+            llm_cache.set(key, model_name, {"content": "".join(parts)})
+
+    @staticmethod
+    async def _stream_chunks(model: Any, prompt: str) -> AsyncIterator[Any]:
+        if not uses_rest():
+            async for chunk in await model.generate_content_async(prompt, stream=True):
+                yield chunk
+            return
+        response = await asyncio.to_thread(model.generate_content, prompt, stream=True)
+        chunks = iter(response)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+
+
+# Shared instance used by the generative routes
+gemini_gateway = GeminiGateway(
+    max_concurrent_per_user=settings.GEMINI_MAX_CONCURRENT_PER_USER
+)
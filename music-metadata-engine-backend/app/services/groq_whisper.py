@@ -7,6 +7,13 @@ import json
 import logging
 from typing import Dict, Any, Optional
 from app.config import settings
+from app.metrics import (
+    ANALYSIS_STAGE_SECONDS,
+    LLM_CACHE_LOOKUPS,
+    MODEL_LOAD_SECONDS,
+    track_llm,
+)
+from app.services.llm_cache import llm_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +22,7 @@ logger = logging.getLogger(__name__)
 def get_groq_client():
     from groq import Groq
 
-    return Groq(api_key=settings.GROQ_API_KEY)
+    return Groq(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL)
 
 
 def get_whisper():
@@ -24,6 +31,17 @@ def get_whisper():
     return whisper
 
 
+_whisper_models: Dict[str, Any] = {}
+
+
+def get_whisper_model(model_size: str = "base"):
+    """Loads a Whisper model once per process and reuses it."""
+    if model_size not in _whisper_models:
+        with MODEL_LOAD_SECONDS.time(model=f"whisper-{model_size}"):
+            _whisper_models[model_size] = get_whisper().load_model(model_size)
+    return _whisper_models[model_size]
+
+
 class GroqWhisperService:
     """
     AI service combining:
@@ -37,6 +55,10 @@ class GroqWhisperService:
 
     VOCAB_INSTRUMENTS = "Vocals, Acoustic Guitar, Electric Guitar, Bass Guitar, Piano, Synthesizer, Drums, Percussion, Strings, Brass, Woodwinds, Organ, Harmonica, Saxophone, Trumpet, Violin, Cello, Harp"
 
+    GROQ_MODEL = "llama-3.3-70b-versatile"  # Updated to latest Llama 3.3
+    SYSTEM_PROMPT = "You are a professional music metadata analyst. Always respond with valid JSON only."
+    TEMPERATURE = 0.3
+
     @staticmethod
     def is_available() -> bool:
         return settings.GROQ_API_KEY is not None and len(settings.GROQ_API_KEY) > 0
@@ -52,13 +74,12 @@ class GroqWhisperService:
         Smaller = faster, larger = more accurate
         """
         try:
-            whisper = get_whisper()
-
             # Load model (cached after first load)
-            model = whisper.load_model(model_size)
+            model = get_whisper_model(model_size)
 
             # Transcribe
-            result = model.transcribe(file_path)
+            with ANALYSIS_STAGE_SECONDS.time(stage="transcribe"):
+                result = model.transcribe(file_path)
 
             return {
                 "text": result["text"],
@@ -77,16 +98,20 @@ class GroqWhisperService:
         audio_analysis: Dict[str, Any],
         transcription: Optional[str] = None,
         existing_metadata: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Generate rich metadata using Groq LLM based on audio analysis results.
+
+        Responses are cached on a hash of the prompt and model name, so an
+        unchanged analysis never triggers a second LLM call. Pass
+        use_cache=False to force regeneration (the fresh result still
+        replaces the cached one).
         """
         if not GroqWhisperService.is_available():
             raise RuntimeError("GROQ_API_KEY not configured")
 
         try:
-            client = get_groq_client()
-
             logger.info("DEBUG: Starting context build")
 
             # Build context from analysis
@@ -181,39 +206,25 @@ Return ONLY valid JSON matching this structure:
             # But we must be careful if we verify it.
             prompt_safe = prompt 
 
-            logger.info("DEBUG: Sending prompt to Groq (length: %d)", len(prompt_safe))
-
-            # Call Groq API
-            logger.info("DEBUG: Calling Groq API")
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",  # Updated to latest Llama 3.3
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a professional music metadata analyst. Always respond with valid JSON only.",
-                    },
-                    {"role": "user", "content": prompt_safe},
-                ],
-                temperature=0.3,
-                max_tokens=2000,
-                response_format={"type": "json_object"},
+            cache_key = make_cache_key(
+                GroqWhisperService.GROQ_MODEL,
+                system=GroqWhisperService.SYSTEM_PROMPT,
+                prompt=prompt_safe,
+                temperature=GroqWhisperService.TEMPERATURE,
             )
-
-            logger.info("DEBUG: Got response from Groq")
-            result_text = response.choices[0].message.content
-
-            # Parse JSON
-            try:
-                metadata = json.loads(result_text)
-            except json.JSONDecodeError:
-                # Try to extract JSON from response
-                import re
-
-                json_match = re.search(r"\{.*\}", result_text, re.DOTALL)
-                if json_match:
-                    metadata = json.loads(json_match.group())
-                else:
-                    raise ValueError("Could not parse AI response as JSON")
+            metadata = None
+            if use_cache and settings.LLM_CACHE_ENABLED:
+                metadata = llm_cache.get(cache_key)
+                LLM_CACHE_LOOKUPS.inc(
+                    provider="groq", result="miss" if metadata is None else "hit"
+                )
+                if metadata is not None:
+                    logger.info("LLM cache hit, skipping Groq call")
+
+            if metadata is None:
+                metadata = GroqWhisperService._call_groq(prompt_safe)
+                if settings.LLM_CACHE_ENABLED:
+                    llm_cache.set(cache_key, GroqWhisperService.GROQ_MODEL, metadata)
 
             # Ensure BPM and Key from local analysis take priority
             if audio_analysis and "core" in audio_analysis:
@@ -229,13 +240,58 @@ Return ONLY valid JSON matching this structure:
             raise
 
     @staticmethod
-    async def full_pipeline(file_path: str, transcribe: bool = True) -> Dict[str, Any]:
+    def _call_groq(prompt: str) -> Dict[str, Any]:
+        """Sends the prompt to Groq and parses the JSON completion."""
+        client = get_groq_client()
+
+        logger.info("DEBUG: Sending prompt to Groq (length: %d)", len(prompt))
+
+        # Call Groq API
+        with track_llm("groq"):
+            response = client.chat.completions.create(
+                model=GroqWhisperService.GROQ_MODEL,
+                messages=[
+                    {"role": "system", "content": GroqWhisperService.SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=GroqWhisperService.TEMPERATURE,
+                max_tokens=2000,
+                response_format={"type": "json_object"},
+            )
+
+        result_text = response.choices[0].message.content
+
+        # Parse JSON
+        try:
+            return json.loads(result_text)
+        except json.JSONDecodeError:
+            # Try to extract JSON from response
+            import re
+
+            json_match = re.search(r"\{.*\}", result_text, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+            raise ValueError("Could not parse AI response as JSON")
+
+    @staticmethod
+    async def full_pipeline(
+        file_path: str, transcribe: bool = True, use_cache: bool = True
+    ) -> Dict[str, Any]:
         """
         Run full analysis + AI pipeline:
         1. Local audio analysis (librosa, pyloudnorm)
         2. Local transcription (Whisper) - optional
-        3. AI metadata generation (Groq)
+        3. AI metadata generation (Groq), served from the LLM cache when possible
         """
+        with ANALYSIS_STAGE_SECONDS.time(stage="full_pipeline"):
+            return await GroqWhisperService._run_pipeline(
+                file_path, transcribe, use_cache
+            )
+
+    @staticmethod
+    async def _run_pipeline(
+        file_path: str, transcribe: bool, use_cache: bool
+    ) -> Dict[str, Any]:
         from app.services.audio_analyzer import AdvancedAudioAnalyzer
 
         # Step 1: Local Analysis
@@ -256,6 +312,7 @@ Return ONLY valid JSON matching this structure:
                 audio_analysis=audio_analysis,
                 transcription=transcription,
                 existing_metadata=audio_analysis.get("existing_metadata"),
+                use_cache=use_cache,
             )
         except Exception as e:
             import traceback
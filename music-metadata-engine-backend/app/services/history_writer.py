@@ -0,0 +1,128 @@
+"""
+History Write-Behind Buffer
+Queues history inserts and commits them in batches (one transaction per
+batch) on a background task, so concurrent analyses share commits instead of
+each paying for its own. Result blobs are written content-addressed: a blob
+already stored (by this batch or earlier) is not written again.
+"""
+
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.db import (
+    AnalysisHistory,
+    AnalysisResult,
+    AsyncSessionLocal,
+    insert_results_ignore_existing,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryWriteBuffer:
+    """
+    Batches AnalysisHistory inserts: a batch is flushed when it reaches
+    `batch_size` rows or `flush_interval` seconds after its first row.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = AsyncSessionLocal
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def add(
+        self,
+        entry: AnalysisHistory,
+        result: Optional[AnalysisResult] = None,
+        wait: bool = True,
+    ) -> AnalysisHistory:
+        """
+        Queues an entry (and the result blob it references). With wait=True,
+        returns once its batch is committed (the entry then has its id);
+        otherwise returns immediately.
+        """
+        self._ensure_running()
+        future = self._loop.create_future() if wait else None
+        await self._queue.put((entry, result, future))
+        if future is not None:
+            return await future
+        return entry
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(
+        self,
+        batch: List[
+            Tuple[AnalysisHistory, Optional[AnalysisResult], Optional[asyncio.Future]]
+        ],
+    ) -> None:
+        try:
+            blobs = {}
+            for _, result, _ in batch:
+                if result is not None:
+                    blobs.setdefault(result.hash, result)
+            async with self.session_factory() as session:
+                if blobs:
+                    dialect = session.get_bind().dialect.name
+                    await session.execute(
+                        insert_results_ignore_existing(dialect, blobs.values())
+                    )
+                session.add_all([entry for entry, _, _ in batch])
+                await session.commit()
+            for entry, _, future in batch:
+                if future is not None and not future.done():
+                    future.set_result(entry)
+        except Exception as e:
+            logger.error(f"History batch insert failed ({len(batch)} rows): {e}")
+            for _, _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def stop(self) -> None:
+        """Flushes everything still queued, then stops the background task."""
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+history_writer = HistoryWriteBuffer(
+    batch_size=settings.HISTORY_WRITE_BATCH_SIZE,
+    flush_interval=settings.HISTORY_WRITE_FLUSH_MS / 1000,
+)
@@ -0,0 +1,142 @@
+"""
+Key Detection
+Correlates a chroma vector against the 24 major/minor key profiles in one
+matrix product (Krumhansl-Schmuckler). Profiles and chroma are centred and
+unit-normalized, so each score is a Pearson correlation. Works on the chroma
+the caller already computed; windowed estimation reuses it too (window
+means from a cumulative sum, all windows scored in the same product).
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEYS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+
+# Profile weights for C major / C minor, other keys are rotations
+PROFILES = {
+    # Krumhansl & Kessler (1982) probe-tone ratings
+    "krumhansl": (
+        [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88],
+        [6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17],
+    ),
+    # Temperley (1999), revised from the Kostka-Payne corpus
+    "temperley": (
+        [5.0, 2.0, 3.5, 2.0, 4.5, 4.0, 2.0, 4.5, 2.0, 3.5, 1.5, 4.0],
+        [5.0, 2.0, 3.5, 4.5, 2.0, 4.0, 2.0, 4.5, 3.5, 2.0, 1.5, 4.0],
+    ),
+}
+
+_MATRICES: Dict[str, np.ndarray] = {}
+
+
+def _normalize(x: np.ndarray, axis: int) -> np.ndarray:
+    centred = x - x.mean(axis=axis, keepdims=True)
+    norm = np.linalg.norm(centred, axis=axis, keepdims=True)
+    return centred / np.where(norm > 0, norm, 1.0)
+
+
+def profile_matrix(profile: str = "krumhansl") -> np.ndarray:
+    """(24, 12) normalized profiles: rows 0-11 major C..B, rows 12-23 minor C..B."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown key profile '{profile}' (use {', '.join(PROFILES)})")
+    if profile not in _MATRICES:
+        major, minor = (np.asarray(p, dtype=np.float64) for p in PROFILES[profile])
+        rows = [np.roll(major, i) for i in range(12)] + [np.roll(minor, i) for i in range(12)]
+        _MATRICES[profile] = _normalize(np.array(rows), axis=1)
+    return _MATRICES[profile]
+
+
+def key_scores(chroma: np.ndarray, profile: str = "krumhansl") -> np.ndarray:
+    """
+    Correlations of a (12,) chroma vector with the 24 keys, or (24, n) for a
+    (12, n) matrix of chroma vectors.
+    """
+    chroma = np.asarray(chroma, dtype=np.float64)
+    return profile_matrix(profile) @ _normalize(chroma, axis=0)
+
+
+def _key_name(index: int) -> Dict[str, str]:
+    key, mode = KEYS[index % 12], "Major" if index < 12 else "Minor"
+    return {"key": key, "mode": mode, "full_key": f"{key} {mode}"}
+
+
+def estimate_key(
+    chroma: np.ndarray,
+    profile: Optional[str] = None,
+    frame_seconds: Optional[float] = None,
+    window_seconds: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Key of a chroma matrix (12, frames) or mean chroma vector (12,).
+
+    `confidence` is how far the best correlation is ahead of the runner-up,
+    as a share of the headroom above the runner-up: 0 is a tie, 1 a perfect
+    fit. With `window_seconds` and `frame_seconds` set, "changes" lists key
+    segments estimated over windows of that length.
+    """
+    profile = profile or settings.KEY_PROFILE
+    chroma = np.asarray(chroma, dtype=np.float64)
+    mean = chroma.mean(axis=1) if chroma.ndim == 2 else chroma
+    scores = key_scores(mean, profile)
+    second, best = np.argsort(scores)[-2:]
+    r1, r2 = float(scores[best]), float(scores[second])
+
+    result = {
+        **_key_name(int(best)),
+        "correlation": round(r1, 4),
+        "confidence": round(float(np.clip((r1 - r2) / max(1.0 - r2, 1e-9), 0.0, 1.0)), 4),
+        "runner_up": {**_key_name(int(second)), "correlation": round(r2, 4)},
+        "profile": profile,
+    }
+    if window_seconds and frame_seconds and chroma.ndim == 2:
+        result["changes"] = key_changes(chroma, frame_seconds, window_seconds, profile)
+    return result
+
+
+def key_changes(
+    chroma: np.ndarray,
+    frame_seconds: float,
+    window_seconds: float,
+    profile: str = "krumhansl",
+) -> List[Dict[str, Any]]:
+    """
+    Key segments over non-overlapping windows. A key that holds for a single
+    window between two windows of the same key is treated as noise and merged.
+    """
+    frames = chroma.shape[1]
+    size = max(1, int(round(window_seconds / frame_seconds)))
+    starts = np.arange(0, frames, size)
+    ends = np.minimum(starts + size, frames)
+    cumulative = np.concatenate([np.zeros((12, 1)), np.cumsum(chroma, axis=1)], axis=1)
+    means = (cumulative[:, ends] - cumulative[:, starts]) / (ends - starts)
+    scores = key_scores(means, profile)
+    best = scores.argmax(axis=0)
+    for i in range(1, len(best) - 1):
+        if best[i - 1] == best[i + 1] != best[i]:
+            best[i] = best[i - 1]
+
+    segments: List[Dict[str, Any]] = []
+    for i, index in enumerate(best.tolist()):
+        if segments and segments[-1]["_index"] == index:
+            segments[-1]["end"] = round(float(ends[i] * frame_seconds), 2)
+            segments[-1]["_scores"].append(scores[index, i])
+            continue
+        segments.append(
+            {
+                **_key_name(index),
+                "start": round(float(starts[i] * frame_seconds), 2),
+                "end": round(float(ends[i] * frame_seconds), 2),
+                "_index": index,
+                "_scores": [scores[index, i]],
+            }
+        )
+    for segment in segments:
+        del segment["_index"]
+        segment["correlation"] = round(float(np.mean(segment.pop("_scores"))), 4)
+    return segments
@@ -0,0 +1,161 @@
+"""
+LLM Response Cache
+Deterministic SQLite cache for LLM completions, keyed on a normalized hash of
+the prompt inputs and the model name.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Collapse whitespace so cosmetic prompt formatting does not change the key."""
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def make_cache_key(model: str, **parts: Any) -> str:
+    """
+    Builds a stable SHA-256 key from the model name and any prompt inputs.
+    String inputs are whitespace-normalized; everything is serialized with
+    sorted keys so dict ordering never affects the result.
+    """
+    normalized = {
+        name: normalize_prompt(value) if isinstance(value, str) else value
+        for name, value in parts.items()
+    }
+    payload = json.dumps(
+        {"model": model, "inputs": normalized},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Small SQLite-backed key/value store for LLM responses.
+    Entries expire after `ttl_seconds`; once more than `max_entries` are stored
+    the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed ON llm_cache (accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached value, or None if missing or expired."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute(
+                    "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                conn.commit()
+            return json.loads(value)
+        except Exception as e:
+            # A broken cache must never break metadata generation
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def set(self, key: str, model: str, value: Dict[str, Any]) -> None:
+        """Stores a value and enforces the TTL and size limits."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, json.dumps(value, ensure_ascii=False), now, now),
+                )
+                self._evict(conn, now)
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        if self.max_entries > 0:
+            (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connect().execute(
+                "SELECT COUNT(*) FROM llm_cache"
+            ).fetchone()
+        return count
+
+
+# Shared instance used by the AI services
+llm_cache = LLMResponseCache(
+    path=settings.LLM_CACHE_PATH,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+)
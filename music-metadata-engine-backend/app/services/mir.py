@@ -1,21 +1,20 @@
 import os
-try:
-    import numpy as np
-except ImportError:
-    np = None
+import importlib.util
 import logging
 
-try:
+
+# === LAZY IMPORTS (librosa pulls in numba/scipy/sklearn; keep it off startup) ===
+def get_librosa():
     import librosa
+
+    return librosa
+
+
+def get_numpy():
     import numpy as np
-except ImportError:
-    # Local analysis disabled
-    librosa = None
-    # numpy might be missing too if librosa is missing, handled by earlier lazy loading logic usually
-    # but here we imported it at top level. Wait, top level import is at line 2.
-    # If numpy is missing, line 2 crashes.
-    # But I removed numpy from requirements. So line 2 WILL crash.
-    pass
+
+    return np
+
 
 try:
     from mutagen.easyid3 import EasyID3
@@ -49,7 +48,7 @@ logger = logging.getLogger(__name__)
 class MIRService:
     @staticmethod
     def is_available():
-        return librosa is not None
+        return importlib.util.find_spec("librosa") is not None
 
     @staticmethod
     async def analyze_audio(file_path: str):
@@ -60,41 +59,41 @@ class MIRService:
         if not MIRService.is_available():
             raise RuntimeError("Librosa/Mutagen libraries not installed on backend.")
 
+        librosa = get_librosa()
+        np = get_numpy()
+
         try:
             # Load audio (only first 60 seconds for performance, unless deep analysis requested)
             # Duration analysis requires full load or stream info.
             y, sr = librosa.load(file_path, duration=120)
 
-            # 1. BPM & Beat Tracking
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            bpm = float(tempo)
+            # 1. BPM, Beats & Danceability (one onset envelope)
+            from app.services.tempo import analyze_rhythm
+
+            rhythm = analyze_rhythm(y, sr)
+            bpm = rhythm["bpm"]
 
             # 2. Spectral Features (Timbre/Brightness)
             spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
             spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))
 
-            # 3. Key / Tonality (Simple estimate)
-            # Chromecast -> shift to major/minor
-            chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-            key_idx = np.argmax(np.mean(chroma, axis=1))
-            keys = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
-            path_key = keys[key_idx]
+            # 3. Key / Tonality (chroma vs. the 24 key profiles)
+            from app.services.key_detection import estimate_key
 
-            # 4. Danceability (Rough estimate based on rhythm stability)
-            onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-            pulse = librosa.beat.plp(onset_envelope=onset_env, sr=sr)
-            danceability = float(
-                np.mean(pulse)
-            )  # Normalize logic would be needed for 0-1
+            chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+            key_estimate = estimate_key(chroma)
 
             return {
                 "bpm": round(bpm, 1),
-                "key": path_key,
+                "key": key_estimate["key"],
+                "mode": key_estimate["mode"],
+                "key_confidence": key_estimate["confidence"],
                 "duration": librosa.get_duration(y=y, sr=sr),
                 "technical": {
                     "spectral_centroid": float(spectral_centroid),
                     "spectral_rolloff": float(spectral_rolloff),
-                    "danceability_score": round(danceability, 2),
+                    "danceability_score": round(rhythm["danceability"], 2),
+                    "tempo_confidence": round(rhythm["confidence"], 3),
                 },
             }
         except Exception as e:
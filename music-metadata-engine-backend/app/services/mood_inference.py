@@ -0,0 +1,149 @@
+"""
+Mood Inference Batcher
+Micro-batching front end for the mood model. Audio is decoded and turned
+into spectrograms on a worker pool; the spectrograms of concurrent requests
+are queued and run through the model together, one predict call per batch
+of up to `max_batch_size` items or `max_wait` seconds after the first one.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MoodInferenceBatcher:
+    """Queues spectrograms and runs them through the model in batches."""
+
+    def __init__(
+        self,
+        handler: Any,
+        max_batch_size: int,
+        max_wait: float,
+        preprocess_workers: Optional[int],
+    ):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.preprocess_workers = preprocess_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.preprocess_workers, thread_name_prefix="mood-preprocess"
+            )
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def predict(
+        self, audio: Union[bytes, str], top_n: int = 5
+    ) -> List[Dict[str, Any]]:
+        """Mood predictions for one track (bytes or file path); [] if unavailable."""
+        if self.handler.model is None:
+            return []
+        self._ensure_running()
+        spectrogram = await self._loop.run_in_executor(
+            self._executor, self.handler._preprocess_audio, audio
+        )
+        if spectrogram is None:
+            return []
+        future = self._loop.create_future()
+        await self._queue.put((spectrogram[0], future))
+        try:
+            scores = await future
+        except Exception as e:
+            logger.error(f"Mood prediction failed: {e}")
+            return []
+        return self.handler.format_predictions(scores, top_n)
+
+    async def predict_many(
+        self, items: Sequence[Union[bytes, str]], top_n: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        return list(await asyncio.gather(*[self.predict(item, top_n) for item in items]))
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._infer(batch)
+
+    async def _infer(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        import numpy as np
+
+        try:
+            stacked = np.stack([spectrogram for spectrogram, _ in batch])
+            scores = await asyncio.to_thread(self.handler.predict_scores, stacked)
+            for (_, future), row in zip(batch, scores):
+                if not future.done():
+                    future.set_result(row)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def stop(self) -> None:
+        """Finishes queued predictions, then stops the batching task and workers."""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_mood_batcher: Optional[MoodInferenceBatcher] = None
+
+
+def get_mood_batcher() -> MoodInferenceBatcher:
+    """Shared batcher around the shared mood model handler (imported on first use)."""
+    global _mood_batcher
+    if _mood_batcher is None:
+        from app.utils.audio_model_handler import mood_model_handler
+
+        _mood_batcher = MoodInferenceBatcher(
+            handler=mood_model_handler,
+            max_batch_size=settings.MOOD_BATCH_SIZE,
+            max_wait=settings.MOOD_BATCH_WAIT_MS / 1000,
+            preprocess_workers=settings.MOOD_PREPROCESS_WORKERS or None,
+        )
+    return _mood_batcher
+
+
+async def stop_mood_batcher() -> None:
+    if _mood_batcher is not None:
+        await _mood_batcher.stop()
+
+
+def pending_mood_inferences() -> int:
+    return _mood_batcher.pending if _mood_batcher is not None else 0
@@ -0,0 +1,156 @@
+"""
+Mood Rules Engine
+Heuristic mood tags driven by a rules table instead of hard-coded if
+statements. Rules are evaluated column-wise over a (tracks x features)
+matrix, so a whole catalog is re-tagged in one pass from stored features,
+and every tag comes with the rules that produced it.
+
+Rule format (JSON file at MOOD_RULES_PATH, or DEFAULT_MOOD_RULES):
+    {"id": "energetic", "mood": "Energetic",
+     "when": {"energy_mean": {">": 0.1}, "bpm": {">": 120}}}
+All conditions of a rule must hold for it to fire.
+"""
+
+import json
+import logging
+import operator
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ["energy_mean", "bpm", "is_major", "danceability", "spectral_centroid"]
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Same thresholds as the original analyze_core heuristics
+DEFAULT_MOOD_RULES: List[Dict[str, Any]] = [
+    {"id": "energetic", "mood": "Energetic", "when": {"energy_mean": {">": 0.1}, "bpm": {">": 120}}},
+    {"id": "calm", "mood": "Calm", "when": {"energy_mean": {"<": 0.05}, "bpm": {"<": 100}}},
+    {"id": "happy", "mood": "Happy", "when": {"is_major": {"==": 1}, "bpm": {">": 110}}},
+    {"id": "melancholic", "mood": "Melancholic", "when": {"is_major": {"==": 0}, "bpm": {"<": 110}}},
+    {"id": "danceable", "mood": "Danceable", "when": {"danceability": {">": 1.2}}},
+    {"id": "dark", "mood": "Dark", "when": {"spectral_centroid": {"<": 1500}}},
+    {"id": "bright", "mood": "Bright", "when": {"spectral_centroid": {">": 3500}}},
+]
+
+
+def features_from_analysis(analysis: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    Rule features from an analyze_core result (nested) or a flat feature dict.
+    Missing values become None and never satisfy a condition.
+    """
+    def pick(*paths):
+        for path in paths:
+            value: Any = analysis
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is not None:
+                return value
+        return None
+
+    mode = pick(("is_major",), ("mode",))
+    if isinstance(mode, str):
+        mode = 1.0 if mode.lower() == "major" else 0.0
+    return {
+        "energy_mean": pick(("energy_mean",), ("energy", "mean")),
+        "bpm": pick(("bpm",)),
+        "is_major": mode,
+        "danceability": pick(("danceability",), ("rhythm", "danceability")),
+        "spectral_centroid": pick(
+            ("spectral_centroid",), ("spectral", "centroid"), ("technical", "centroid")
+        ),
+    }
+
+
+def feature_matrix(rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    (tracks, FEATURES) float matrix; missing values are NaN. A value that is
+    not a number raises ValueError naming the track index and feature.
+    """
+    matrix = np.full((len(rows), len(FEATURES)), np.nan)
+    for i, row in enumerate(rows):
+        features = features_from_analysis(row)
+        for j, name in enumerate(FEATURES):
+            value = features[name]
+            if value is None:
+                continue
+            try:
+                matrix[i, j] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Track {i}: feature '{name}' is not a number ({value!r})")
+    return matrix
+
+
+class MoodRuleEngine:
+    """Evaluates a rules table over a feature matrix."""
+
+    def __init__(self, rules: Sequence[Dict[str, Any]]):
+        self.rules = list(rules)
+        self.conditions = []  # (rule index, feature column, op, threshold)
+        for index, rule in enumerate(self.rules):
+            for feature, checks in rule["when"].items():
+                if feature not in FEATURES:
+                    raise ValueError(f"Rule '{rule['id']}' uses unknown feature '{feature}'")
+                for symbol, threshold in checks.items():
+                    if symbol not in OPERATORS:
+                        raise ValueError(f"Rule '{rule['id']}' uses unknown operator '{symbol}'")
+                    self.conditions.append(
+                        (index, FEATURES.index(feature), OPERATORS[symbol], float(threshold))
+                    )
+
+    @classmethod
+    def from_file(cls, path: str) -> "MoodRuleEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def evaluate(self, matrix: np.ndarray) -> np.ndarray:
+        """Boolean (tracks, rules) matrix of which rules fire for which track."""
+        fired = np.ones((matrix.shape[0], len(self.rules)), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for index, column, op, threshold in self.conditions:
+                # NaN compares False, so missing features never fire a rule
+                fired[:, index] &= op(matrix[:, column], threshold)
+        return fired
+
+    def tag(self, matrix: np.ndarray) -> List[Dict[str, List[str]]]:
+        """Moods (in rule order, deduplicated) and firing rule ids per track."""
+        fired = self.evaluate(matrix)
+        results = []
+        for row in fired:
+            indices = np.flatnonzero(row)
+            results.append(
+                {
+                    "moods": list(dict.fromkeys(self.rules[i]["mood"] for i in indices)),
+                    "rules": [self.rules[i]["id"] for i in indices],
+                }
+            )
+        return results
+
+    def tag_one(self, features: Dict[str, Any]) -> Dict[str, List[str]]:
+        return self.tag(feature_matrix([features]))[0]
+
+
+_engine: Optional[MoodRuleEngine] = None
+
+
+def get_mood_rule_engine() -> MoodRuleEngine:
+    """Shared engine: rules from MOOD_RULES_PATH if set, otherwise the defaults."""
+    global _engine
+    if _engine is None:
+        if settings.MOOD_RULES_PATH:
+            _engine = MoodRuleEngine.from_file(settings.MOOD_RULES_PATH)
+            logger.info(f"Loaded {len(_engine.rules)} mood rules from {settings.MOOD_RULES_PATH}")
+        else:
+            _engine = MoodRuleEngine(DEFAULT_MOOD_RULES)
+    return _engine
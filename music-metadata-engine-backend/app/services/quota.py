@@ -0,0 +1,303 @@
+"""
+Quota Service
+Local, atomic usage counters for the analysis quota plus a sliding-window
+request rate limit. Counters live in a WAL-mode SQLite file shared by every
+worker on the host, so check-and-increment is one short transaction instead
+of a read-modify-write round trip to Supabase. Counts are seeded from the
+user's Supabase metadata the first time a user is seen and written back to
+Supabase in batches by a background task.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised when a user has used up their analysis quota."""
+
+    def __init__(self, count: int, limit: int):
+        super().__init__(f"Quota exceeded. Limit: {limit}, Used: {count}")
+        self.count = count
+        self.limit = limit
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a user sends requests faster than the sliding window allows."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many requests. Retry in {retry_after}s.")
+        self.retry_after = retry_after
+
+
+class QuotaService:
+    """
+    Atomic per-user quota counters and sliding-window rate limiting.
+
+    The rate limit uses the sliding-window-counter approximation: the count of
+    the previous fixed window is weighted by how much of it still overlaps the
+    sliding window, so each user needs at most two rows.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        default_limit: int,
+        rate_limit: int,
+        rate_window_seconds: int,
+    ):
+        self.path = path
+        self.default_limit = default_limit
+        self.rate_limit = rate_limit
+        self.rate_window_seconds = rate_window_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS quota_usage (
+                    user_id TEXT PRIMARY KEY,
+                    analysis_count INTEGER NOT NULL,
+                    analysis_limit INTEGER NOT NULL,
+                    synced_count INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS quota_rate_windows (
+                    user_id TEXT NOT NULL,
+                    window_start INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, window_start)
+                )
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """BEGIN IMMEDIATE takes the write lock up front, so concurrent workers serialize."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _seed(
+        self, conn: sqlite3.Connection, user_id: str, metadata: Dict[str, Any], now: float
+    ) -> None:
+        """Creates the user's row from Supabase metadata; keeps the local count if present."""
+        count = int(metadata.get("analysis_count", 0) or 0)
+        limit = int(metadata.get("analysis_limit", self.default_limit) or 0)
+        conn.execute(
+            "INSERT OR IGNORE INTO quota_usage "
+            "(user_id, analysis_count, analysis_limit, synced_count, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user_id, count, limit, count, now),
+        )
+        # The limit is owned by Supabase (plan changes), so always take the latest
+        if "analysis_limit" in metadata:
+            conn.execute(
+                "UPDATE quota_usage SET analysis_limit = ? "
+                "WHERE user_id = ? AND analysis_limit != ?",
+                (limit, user_id, limit),
+            )
+
+    def _hit_rate_window(self, conn: sqlite3.Connection, user_id: str, now: float) -> None:
+        window = self.rate_window_seconds
+        current = int(now // window) * window
+        previous = current - window
+        counts = dict(
+            conn.execute(
+                "SELECT window_start, count FROM quota_rate_windows "
+                "WHERE user_id = ? AND window_start IN (?, ?)",
+                (user_id, previous, current),
+            ).fetchall()
+        )
+        overlap = 1.0 - (now - current) / window
+        estimate = counts.get(previous, 0) * overlap + counts.get(current, 0)
+        if estimate + 1 > self.rate_limit:
+            raise RateLimitExceeded(retry_after=max(1, int(current + window - now)))
+        conn.execute(
+            "INSERT INTO quota_rate_windows (user_id, window_start, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (user_id, window_start) DO UPDATE SET count = count + 1",
+            (user_id, current),
+        )
+        conn.execute(
+            "DELETE FROM quota_rate_windows WHERE user_id = ? AND window_start < ?",
+            (user_id, previous),
+        )
+
+    def consume(
+        self, user_id: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, int]:
+        """
+        Atomically checks and uses one unit of the user's quota.
+        Raises RateLimitExceeded or QuotaExceeded (nothing is counted then).
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._seed(conn, user_id, metadata or {}, now)
+            if self.rate_limit > 0:
+                self._hit_rate_window(conn, user_id, now)
+            row = conn.execute(
+                "UPDATE quota_usage SET analysis_count = analysis_count + 1, updated_at = ? "
+                "WHERE user_id = ? AND analysis_count < analysis_limit "
+                "RETURNING analysis_count, analysis_limit",
+                (now, user_id),
+            ).fetchone()
+            if row is None:
+                count, limit = conn.execute(
+                    "SELECT analysis_count, analysis_limit FROM quota_usage WHERE user_id = ?",
+                    (user_id,),
+                ).fetchone()
+                raise QuotaExceeded(count=count, limit=limit)
+        return {"analysis_count": row[0], "analysis_limit": row[1]}
+
+    def release(self, user_id: str, amount: int = 1) -> None:
+        """Gives back units taken by consume() for a request that produced nothing."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE quota_usage SET analysis_count = MAX(analysis_count - ?, 0), "
+                "updated_at = ? WHERE user_id = ?",
+                (amount, time.time(), user_id),
+            )
+
+    def increment(
+        self, user_id: str, metadata: Optional[Dict[str, Any]] = None, amount: int = 1
+    ) -> int:
+        """Adds to the user's count without checking the limit; returns the new count."""
+        now = time.time()
+        with self._transaction() as conn:
+            self._seed(conn, user_id, metadata or {}, now)
+            (count,) = conn.execute(
+                "UPDATE quota_usage SET analysis_count = analysis_count + ?, updated_at = ? "
+                "WHERE user_id = ? RETURNING analysis_count",
+                (amount, now, user_id),
+            ).fetchone()
+        return count
+
+    def status(
+        self, user_id: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, int]:
+        """Current count and limit; falls back to Supabase metadata for unseen users."""
+        metadata = metadata or {}
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT analysis_count, analysis_limit FROM quota_usage WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        if row is None:
+            return {
+                "analysis_count": int(metadata.get("analysis_count", 0) or 0),
+                "analysis_limit": int(
+                    metadata.get("analysis_limit", self.default_limit) or 0
+                ),
+            }
+        return {
+            "analysis_count": row[0],
+            "analysis_limit": int(metadata.get("analysis_limit", row[1])),
+        }
+
+    def unsynced(self, limit: int) -> List[Tuple[str, int]]:
+        """Users whose local count has not been written back to Supabase yet."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT user_id, analysis_count FROM quota_usage "
+                "WHERE analysis_count != synced_count ORDER BY updated_at LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def mark_synced(self, user_id: str, count: int) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE quota_usage SET synced_count = ? WHERE user_id = ?",
+                (count, user_id),
+            )
+
+    def sync_to_supabase(self, batch_size: int) -> int:
+        """
+        Writes changed counts back to Supabase user_metadata (GoTrue merges
+        metadata keys, so no read is needed). Returns the number of users synced;
+        failures are logged and retried on the next run.
+        """
+        rows = self.unsynced(batch_size)
+        if not rows:
+            return 0
+        from app.supabase_client import get_supabase
+
+        synced = 0
+        for user_id, count in rows:
+            try:
+                get_supabase().auth.admin.update_user_by_id(
+                    user_id, {"user_metadata": {"analysis_count": count}}
+                )
+                self.mark_synced(user_id, count)
+                synced += 1
+            except Exception as e:
+                logger.warning(f"Quota sync failed for user {user_id}: {e}")
+        return synced
+
+    async def _sync_loop(self, interval: float, batch_size: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.sync_to_supabase, batch_size)
+            except Exception as e:
+                logger.error(f"Quota sync run failed: {e}")
+
+    def start_sync(self, interval: float, batch_size: int) -> None:
+        """Starts the periodic Supabase write-back on the running event loop."""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.get_running_loop().create_task(
+                self._sync_loop(interval, batch_size)
+            )
+
+    async def stop_sync(self, batch_size: int) -> None:
+        """Stops the periodic write-back and pushes whatever is still pending."""
+        if self._sync_task is None:
+            return
+        self._sync_task.cancel()
+        try:
+            await self._sync_task
+        except asyncio.CancelledError:
+            pass
+        self._sync_task = None
+        await asyncio.to_thread(self.sync_to_supabase, batch_size)
+
+
+# Shared instance used by the quota dependencies
+quota_service = QuotaService(
+    path=settings.QUOTA_DB_PATH,
+    default_limit=settings.QUOTA_DEFAULT_LIMIT,
+    rate_limit=settings.QUOTA_RATE_LIMIT,
+    rate_window_seconds=settings.QUOTA_RATE_WINDOW_SECONDS,
+)
@@ -1,6 +1,7 @@
 import os
 import logging
 import asyncio
+from app.metrics import ANALYSIS_STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -48,11 +49,11 @@ class SeparationService:
         logger.info(f"Starting Demucs Separation: {' '.join(cmd)}")
 
         # Run in threadpool to not block asyncio loop
-        process = await asyncio.create_subprocess_exec(
-            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-
-        stdout, stderr = await process.communicate()
+        with ANALYSIS_STAGE_SECONDS.time(stage="separation"):
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
 
         if process.returncode != 0:
             error_msg = stderr.decode()
@@ -0,0 +1,508 @@
+"""
+Track Similarity Index
+Fixed-length timbre/harmony/rhythm embeddings from analyze_core, stored in a
+memory-mapped float32 matrix with an IVF (inverted file) index on top, for
+"find similar tracks" lookups over large catalogs.
+
+Raw feature vectors are kept, so the index can be retrained (normalization
+and coarse centroids) at any time without re-analyzing audio. A search ranks
+only the members of the `nprobe` clusters nearest to the query; until the
+catalog reaches SIMILARITY_IVF_MIN_ROWS every track is scanned exactly.
+
+Writers (inserts and retrains) hold a file lock, so several workers can
+share one directory. Automatic retraining runs k-means in a background
+thread without the lock and only takes it to install the new clusters.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MFCC_COEFFICIENTS = 13
+CHROMA_BINS = 12
+SPECTRAL_FEATURES = (
+    "centroid",
+    "rolloff",
+    "bandwidth",
+    "zero_crossing_rate",
+    "energy_mean",
+    "energy_std",
+    "bpm",
+    "danceability",
+)
+LOG_FEATURES = {"centroid", "rolloff", "bandwidth", "bpm"}
+EMBEDDING_DIM = 2 * MFCC_COEFFICIENTS + CHROMA_BINS + len(SPECTRAL_FEATURES)
+
+# Timbre, harmony and spectral/rhythm weigh the same in a distance
+GROUP_WEIGHTS = np.concatenate(
+    [
+        np.full(2 * MFCC_COEFFICIENTS, 1 / np.sqrt(2 * MFCC_COEFFICIENTS)),
+        np.full(CHROMA_BINS, 1 / np.sqrt(CHROMA_BINS)),
+        np.full(len(SPECTRAL_FEATURES), 1 / np.sqrt(len(SPECTRAL_FEATURES))),
+    ]
+).astype(np.float32)
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+CHUNK_ROWS = 8192
+
+
+def track_embedding(
+    mfcc: np.ndarray, chroma: np.ndarray, spectral: Dict[str, float]
+) -> np.ndarray:
+    """MFCC mean/std, normalized mean chroma and (log-scaled) spectral/rhythm scalars."""
+    chroma_mean = chroma.mean(axis=1)
+    chroma_mean = chroma_mean / (chroma_mean.sum() + 1e-9)
+    scalars = [
+        np.log1p(max(float(spectral[name]), 0.0)) if name in LOG_FEATURES else float(spectral[name])
+        for name in SPECTRAL_FEATURES
+    ]
+    vector = np.concatenate([mfcc.mean(axis=1), mfcc.std(axis=1), chroma_mean, scalars])
+    return np.nan_to_num(vector.astype(np.float32), nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def nearest_centroids(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid for each point, in chunks to bound memory."""
+    norms = (centroids**2).sum(axis=1)
+    labels = np.empty(len(points), dtype=np.int32)
+    for start in range(0, len(points), CHUNK_ROWS):
+        block = points[start : start + CHUNK_ROWS]
+        labels[start : start + len(block)] = (norms - 2 * block @ centroids.T).argmin(axis=1)
+    return labels
+
+
+class SimilarityIndex:
+    """
+    Embeddings live in `vectors.f32` (row = track id - 1), track keys and
+    cluster assignments in SQLite, and the trained normalization and
+    centroids in `ivf.npz`. Other processes' inserts and retrains are picked
+    up on the next call.
+    """
+
+    def __init__(self, directory: str, dim: int = EMBEDDING_DIM):
+        self.directory = directory
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[np.memmap] = None
+        self._rows = 0  # highest track id loaded
+        self._assign = np.full(0, -1, dtype=np.int32)  # track id - 1 -> list
+        self._lists: List[np.ndarray] = []  # list -> track ids (at last rebuild)
+        self._appended: Dict[int, List[int]] = {}  # list -> ids added since
+        self._ivf: Optional[Dict[str, np.ndarray]] = None
+        self._ivf_mtime: Optional[float] = None
+        self._flat_stats: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+        self._training: Optional[threading.Thread] = None
+
+    # --- Storage ---
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _write_lock(self):
+        """Serializes writers across threads and (where supported) processes."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self._path("tracks.db"), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sim_tracks (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT NOT NULL UNIQUE,
+                    name TEXT,
+                    metadata TEXT,
+                    list INTEGER NOT NULL DEFAULT -1,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def _map(self, rows: int) -> np.memmap:
+        """Maps the vector file, growing it (by doubling) to hold `rows` rows."""
+        path = self._path("vectors.f32")
+        row_bytes = self.dim * 4
+        if not os.path.exists(path):
+            open(path, "ab").close()
+        size = os.path.getsize(path)
+        if size < rows * row_bytes:
+            size = max(1024, 1 << (rows - 1).bit_length()) * row_bytes
+            os.truncate(path, size)
+        if self._vectors is None or self._vectors.shape[0] * row_bytes != size:
+            self._vectors = np.memmap(
+                path, dtype=np.float32, mode="r+", shape=(size // row_bytes, self.dim)
+            )
+        return self._vectors
+
+    def _refresh(self) -> None:
+        """Loads the trained index and any tracks added since the last call."""
+        conn = self._connect()
+        ivf_path = self._path("ivf.npz")
+        mtime = os.path.getmtime(ivf_path) if os.path.exists(ivf_path) else None
+        if mtime != self._ivf_mtime:
+            self._ivf = None
+            if mtime is not None:
+                with np.load(ivf_path) as data:
+                    self._ivf = {name: data[name] for name in data.files}
+            self._ivf_mtime = mtime
+            self._rows = 0  # assignments changed: reload them all
+
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sim_tracks").fetchone()[0]
+        if max_id <= self._rows:
+            return
+        rows = conn.execute(
+            "SELECT id, list FROM sim_tracks WHERE id > ?", (self._rows,)
+        ).fetchall()
+        self._map(max_id)
+        if len(self._assign) < max_id:
+            grown = np.full(max(max_id, 2 * len(self._assign)), -1, dtype=np.int32)
+            grown[: len(self._assign)] = self._assign
+            self._assign = grown
+        data = np.asarray(rows, dtype=np.int64).reshape(-1, 2)
+        self._assign[data[:, 0] - 1] = data[:, 1]
+        if self._rows == 0 or len(data) > 1024:
+            self._rows = max_id
+            self._build_lists()
+        else:
+            for track_id, list_id in data.tolist():
+                self._appended.setdefault(list_id, []).append(track_id)
+            self._rows = max_id
+
+    def _build_lists(self) -> None:
+        nlist = len(self._ivf["centroids"]) if self._ivf is not None else 0
+        assign = self._assign[: self._rows]
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self._lists = [order[bounds[i] : bounds[i + 1]] + 1 for i in range(nlist)]
+        self._appended = {}
+
+    # --- Normalization ---
+
+    def _stats(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._ivf is not None:
+            return self._ivf["mean"], self._ivf["std"]
+        if self._flat_stats is None or self._flat_stats[0] != self._rows:
+            data = np.asarray(self._vectors[: self._rows])
+            self._flat_stats = (self._rows, data.mean(axis=0), data.std(axis=0) + 1e-6)
+        return self._flat_stats[1], self._flat_stats[2]
+
+    def _whiten(
+        self, vectors: np.ndarray, stats: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> np.ndarray:
+        mean, std = stats or self._stats()
+        return ((vectors - mean) / std * GROUP_WEIGHTS).astype(np.float32)
+
+    # --- Ingestion ---
+
+    def add(
+        self,
+        key: str,
+        vector: Sequence[float],
+        name: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return self.add_many([(key, vector, name, metadata)])[0]
+
+    def add_many(
+        self,
+        items: Sequence[Tuple[str, Sequence[float], Optional[str], Optional[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Inserts tracks (or replaces the embedding of an existing key) and puts
+        them straight into their nearest cluster, so they are searchable at once.
+        Once the catalog has doubled since the last training, a retrain is
+        started in the background.
+        """
+        vectors = np.asarray([item[1] for item in items], dtype=np.float32).reshape(-1, self.dim)
+        results = []
+        with self._write_lock():
+            self._refresh()
+            if self._ivf is not None:
+                lists = nearest_centroids(self._whiten(vectors), self._ivf["centroids"])
+            else:
+                lists = np.full(len(items), -1, dtype=np.int32)
+            conn = self._connect()
+            updated = []
+            with conn:
+                for (key, _, name, metadata), vector, list_id in zip(items, vectors, lists):
+                    list_id = int(list_id)
+                    encoded = json.dumps(metadata) if metadata is not None else None
+                    row = conn.execute("SELECT id FROM sim_tracks WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        track_id = row[0]
+                        conn.execute(
+                            "UPDATE sim_tracks SET name = ?, metadata = ?, list = ? WHERE id = ?",
+                            (name, encoded, list_id, track_id),
+                        )
+                        updated.append((track_id, list_id))
+                    else:
+                        track_id = conn.execute(
+                            "INSERT INTO sim_tracks (key, name, metadata, list, created_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (key, name, encoded, list_id, time.time()),
+                        ).lastrowid
+                    self._map(track_id)[track_id - 1] = vector
+                    results.append({"key": key, "track_id": track_id, "updated": row is not None})
+                self._vectors.flush()
+
+            for track_id, list_id in updated:
+                if track_id <= self._rows:
+                    self._assign[track_id - 1] = list_id
+                    self._appended.setdefault(list_id, []).append(track_id)
+            self._refresh()
+            self._flat_stats = None
+            stale = self._needs_training()
+        if stale:
+            self._train_in_background()
+        return results
+
+    def _needs_training(self) -> bool:
+        trained_rows = int(self._ivf["rows"]) if self._ivf is not None else 0
+        return self._rows >= settings.SIMILARITY_IVF_MIN_ROWS and self._rows >= 2 * trained_rows
+
+    def _train_in_background(self) -> None:
+        with self._lock:
+            if self._training is not None and self._training.is_alive():
+                return
+            self._training = threading.Thread(
+                target=self._auto_train, name="similarity-train", daemon=True
+            )
+            self._training.start()
+
+    def _auto_train(self) -> None:
+        try:
+            self.train(force=False)
+        except Exception:
+            logger.exception("Similarity index retraining failed")
+
+    def wait_for_training(self, timeout: Optional[float] = None) -> None:
+        """Blocks until a background retrain (if any) has finished."""
+        training = self._training
+        if training is not None:
+            training.join(timeout)
+
+    def train(self, nlist: int = 0, force: bool = True) -> Dict[str, Any]:
+        """
+        Recomputes normalization and centroids and reassigns every track.
+        k-means runs on a snapshot of the catalog without the write lock;
+        tracks inserted meanwhile are assigned when the result is installed.
+        Without `force`, nothing happens unless the index is still stale.
+        """
+        with self._lock:
+            self._refresh()
+            n, vectors = self._rows, self._vectors
+            if not n or not (force or self._needs_training()):
+                return self._stats_unlocked()
+        model = self._fit(vectors, n, nlist)
+        with self._write_lock():
+            self._refresh()
+            # Another worker may have trained on at least as many tracks meanwhile
+            if force or self._needs_training():
+                self._install(model)
+            return self._stats_unlocked()
+
+    def _fit(self, vectors: np.memmap, n: int, nlist: int = 0) -> Dict[str, np.ndarray]:
+        """Normalization and k-means centroids of the first `n` embeddings."""
+        start = time.perf_counter()
+        data = vectors[:n]
+        nlist = nlist or settings.SIMILARITY_NLIST or int(np.clip(np.sqrt(n), 16, 4096))
+        nlist = min(nlist, n)
+
+        mean = np.zeros(self.dim, dtype=np.float64)
+        squares = np.zeros(self.dim, dtype=np.float64)
+        for i in range(0, n, CHUNK_ROWS):
+            block = np.asarray(data[i : i + CHUNK_ROWS], dtype=np.float64)
+            mean += block.sum(axis=0)
+            squares += (block**2).sum(axis=0)
+        mean /= n
+        std = np.sqrt(np.maximum(squares / n - mean**2, 0)) + 1e-6
+        stats = (mean.astype(np.float32), std.astype(np.float32))
+
+        # k-means on a sample; empty clusters are reseeded from random points
+        rng = np.random.default_rng(0)
+        sample_size = min(n, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = self._whiten(
+            np.asarray(data[np.sort(rng.choice(n, sample_size, replace=False))]), stats
+        )
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = nearest_centroids(sample, centroids)
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            reseed = sample[rng.choice(len(sample), nlist)]
+            centroids = np.where(
+                counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], reseed
+            ).astype(np.float32)
+        logger.info(
+            f"Similarity index trained: {n} tracks, {nlist} lists "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        return {"mean": stats[0], "std": stats[1], "centroids": centroids, "rows": np.int64(n)}
+
+    def _install(self, model: Dict[str, np.ndarray]) -> None:
+        """Assigns every track to the new centroids and publishes them (write lock held)."""
+        n = self._rows
+        stats = (model["mean"], model["std"])
+        lists = np.concatenate(
+            [
+                nearest_centroids(
+                    self._whiten(np.asarray(self._vectors[i : min(i + CHUNK_ROWS, n)]), stats),
+                    model["centroids"],
+                )
+                for i in range(0, n, CHUNK_ROWS)
+            ]
+        )
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "UPDATE sim_tracks SET list = ? WHERE id = ?",
+                zip(lists.tolist(), range(1, n + 1)),
+            )
+
+        # Per-process temp name: another worker may be publishing at the same time
+        temp_path = self._path(f"ivf.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+        np.savez(temp_path, **model)
+        os.replace(temp_path, self._path("ivf.npz"))
+        self._ivf = dict(model)
+        self._ivf_mtime = os.path.getmtime(self._path("ivf.npz"))
+        self._assign[:n] = lists
+        self._build_lists()
+
+    # --- Lookup ---
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int = 10,
+        nprobe: int = 0,
+        exclude: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """The k nearest tracks (Euclidean distance on normalized embeddings)."""
+        with self._lock:
+            self._refresh()
+            if not self._rows:
+                return []
+            query = self._whiten(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))[0]
+            if self._ivf is None:
+                candidates = np.arange(1, self._rows + 1)
+            else:
+                centroids = self._ivf["centroids"]
+                nprobe = min(nprobe or settings.SIMILARITY_NPROBE, len(centroids))
+                distances = ((centroids - query) ** 2).sum(axis=1)
+                probes = np.argpartition(distances, nprobe - 1)[:nprobe]
+                parts = [self._lists[p] for p in probes]
+                parts += [
+                    np.asarray(self._appended.get(int(p), []), dtype=np.int64) for p in probes
+                ]
+                candidates = np.unique(np.concatenate(parts))
+                # Tracks re-embedded since the lists were built may have moved cluster
+                candidates = candidates[np.isin(self._assign[candidates - 1], probes)]
+            if exclude is not None:
+                candidates = candidates[candidates != exclude]
+            if not len(candidates):
+                return []
+            points = self._whiten(np.asarray(self._vectors[candidates - 1]))
+            distances = ((points - query) ** 2).sum(axis=1)
+            k = min(k, len(candidates))
+            top = np.argpartition(distances, k - 1)[:k]
+            top = top[np.argsort(distances[top], kind="stable")]
+            ids = candidates[top].tolist()
+            tracks = self._tracks(ids)
+        return [
+            {**tracks[track_id], "distance": round(float(np.sqrt(distance)), 4)}
+            for track_id, distance in zip(ids, distances[top].tolist())
+            if track_id in tracks
+        ]
+
+    def similar(self, key: str, k: int = 10, nprobe: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """Nearest neighbours of an indexed track, or None if the key is unknown."""
+        with self._lock:
+            self._refresh()
+            row = self._connect().execute(
+                "SELECT id FROM sim_tracks WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            vector = np.array(self._vectors[row[0] - 1])
+        return self.search(vector, k, nprobe, exclude=row[0])
+
+    # --- Catalog ---
+
+    def _tracks(self, track_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        if not track_ids:
+            return {}
+        placeholders = ",".join("?" * len(track_ids))
+        rows = self._connect().execute(
+            f"SELECT id, key, name, metadata FROM sim_tracks WHERE id IN ({placeholders})",
+            list(track_ids),
+        ).fetchall()
+        return {
+            row[0]: {
+                "key": row[1],
+                "name": row[2],
+                "metadata": json.loads(row[3]) if row[3] else None,
+            }
+            for row in rows
+        }
+
+    def _stats_unlocked(self) -> Dict[str, Any]:
+        tracks = self._connect().execute("SELECT COUNT(*) FROM sim_tracks").fetchone()[0]
+        return {
+            "tracks": tracks,
+            "dim": self.dim,
+            "mode": "ivf" if self._ivf is not None else "flat",
+            "lists": len(self._ivf["centroids"]) if self._ivf is not None else 0,
+            "trained_rows": int(self._ivf["rows"]) if self._ivf is not None else 0,
+            "nprobe": settings.SIMILARITY_NPROBE,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return self._stats_unlocked()
+
+    def close(self) -> None:
+        self.wait_for_training()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._vectors = None
+
+
+# Shared instance fed by full_analysis and used by the /similar routes
+similarity_index = SimilarityIndex(settings.SIMILARITY_DIR)
@@ -0,0 +1,142 @@
+"""
+Tempo Engine
+One onset envelope per track feeds everything rhythmic: tempo, beats,
+PLP danceability and a tempo confidence.
+
+Tempo comes from the global autocorrelation tempogram of the envelope
+(FFT-based, so a batch of envelopes is one padded matrix operation),
+weighted by a log-normal prior around 120 BPM and refined by parabolic
+interpolation. Half/double-time errors are corrected when the estimate
+falls outside TEMPO_MIN_BPM..TEMPO_MAX_BPM and the autocorrelation at the
+doubled/halved period is nearly as strong. Beats are then tracked at that
+tempo with librosa's dynamic programming, without re-estimating it.
+"""
+
+import logging
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+HOP_LENGTH = 512  # librosa default, shared with chroma/rms/centroid frames
+PRIOR_BPM = 120.0
+PRIOR_STD_OCTAVES = 1.0
+BPM_RANGE = (30.0, 300.0)
+OCTAVE_RATIO = 0.5  # the other octave must reach this share of the peak strength
+
+
+def get_librosa():
+    import librosa
+
+    return librosa
+
+
+def onset_envelope(y: np.ndarray, sr: int, hop_length: int = HOP_LENGTH) -> np.ndarray:
+    return get_librosa().onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+
+
+def autocorrelation(envelopes: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Normalized autocorrelation (lag 0 = 1) of each envelope, as one
+    (n_envelopes, max_len) matrix; shorter envelopes are zero-padded.
+    """
+    length = max(len(e) for e in envelopes)
+    matrix = np.zeros((len(envelopes), length))
+    for i, envelope in enumerate(envelopes):
+        matrix[i, : len(envelope)] = envelope - np.mean(envelope)
+    spectrum = np.fft.rfft(matrix, n=2 * length, axis=1)
+    ac = np.fft.irfft(np.abs(spectrum) ** 2, axis=1)[:, :length]
+    return ac / np.where(ac[:, :1] > 0, ac[:, :1], 1.0)
+
+
+def _strength(ac: np.ndarray, lags: np.ndarray) -> np.ndarray:
+    """Autocorrelation of each row at a (fractional) lag, linearly interpolated."""
+    lags = np.clip(lags, 1, ac.shape[1] - 2)
+    low = np.floor(lags).astype(int)
+    frac = lags - low
+    rows = np.arange(len(ac))
+    return ac[rows, low] * (1 - frac) + ac[rows, low + 1] * frac
+
+
+def estimate_tempo_batch(
+    envelopes: Sequence[np.ndarray], sr: int, hop_length: int = HOP_LENGTH
+) -> List[Dict[str, float]]:
+    """
+    Tempo of each onset envelope: {"bpm", "confidence", "octave"}, where
+    confidence is the autocorrelation at the beat period (0-1) and octave is
+    the half/double-time factor applied (1 if none).
+    """
+    if not envelopes:
+        return []
+    frame_rate = sr / hop_length
+    ac = autocorrelation(envelopes)
+    max_lag = min(ac.shape[1] - 2, int(frame_rate * 60 / BPM_RANGE[0]))
+    lags = np.arange(max(1, int(frame_rate * 60 / BPM_RANGE[1])), max_lag + 1)
+    no_tempo = {"bpm": 0.0, "confidence": 0.0, "octave": 1.0}
+    if len(lags) < 3:
+        return [dict(no_tempo) for _ in envelopes]
+
+    bpms = 60 * frame_rate / lags
+    prior = np.exp(-0.5 * (np.log2(bpms / PRIOR_BPM) / PRIOR_STD_OCTAVES) ** 2)
+    weighted = np.maximum(ac[:, lags], 0) * prior
+    peak = weighted.argmax(axis=1)
+
+    # Parabolic interpolation around the peak lag
+    inner = np.clip(peak, 1, len(lags) - 2)
+    left, centre, right = (weighted[np.arange(len(ac)), inner + d] for d in (-1, 0, 1))
+    denominator = left - 2 * centre + right
+    curved = (peak == inner) & (denominator < 0)
+    offset = np.where(curved, 0.5 * (left - right) / np.where(curved, denominator, -1.0), 0.0)
+    lag = lags[inner] + np.clip(offset, -0.5, 0.5)
+
+    strength = _strength(ac, lag)
+    octave = np.ones(len(ac))
+    tempo = 60 * frame_rate / lag
+    too_slow = (tempo < settings.TEMPO_MIN_BPM) & (
+        _strength(ac, lag / 2) >= OCTAVE_RATIO * strength
+    )
+    too_fast = (tempo > settings.TEMPO_MAX_BPM) & (
+        _strength(ac, lag * 2) >= OCTAVE_RATIO * strength
+    )
+    octave[too_slow], octave[too_fast] = 2.0, 0.5
+    final_strength = _strength(ac, lag / octave)
+
+    periodic = weighted.max(axis=1) > 0  # silence or constant envelopes have no tempo
+    return [
+        {
+            "bpm": float(tempo[i] * octave[i]),
+            "confidence": float(np.clip(final_strength[i], 0.0, 1.0)),
+            "octave": float(octave[i]),
+        }
+        if periodic[i]
+        else dict(no_tempo)
+        for i in range(len(ac))
+    ]
+
+
+def analyze_rhythm(
+    y: np.ndarray, sr: int, hop_length: int = HOP_LENGTH
+) -> Dict[str, Any]:
+    """
+    Tempo, beats and danceability from a single onset envelope. The arrays
+    (onset_env, beat_frames) are returned for callers that keep frame data.
+    """
+    librosa = get_librosa()
+    onset_env = onset_envelope(y, sr, hop_length)
+    tempo = estimate_tempo_batch([onset_env], sr, hop_length)[0]
+    if tempo["bpm"] > 0:
+        _, beat_frames = librosa.beat.beat_track(
+            onset_envelope=onset_env, sr=sr, hop_length=hop_length, bpm=tempo["bpm"]
+        )
+    else:
+        beat_frames = np.array([], dtype=int)
+    pulse = librosa.beat.plp(onset_envelope=onset_env, sr=sr, hop_length=hop_length)
+    return {
+        **tempo,
+        "danceability": float(np.mean(pulse)),
+        "onset_env": onset_env,
+        "beat_frames": beat_frames,
+    }
@@ -0,0 +1,164 @@
+"""
+Feature Timelines
+Per-frame RMS, spectral centroid and onset strength curves (plus beat
+times) kept as float16 mip-map pyramids: level 0 is one value per analysis
+frame and each level above halves the resolution. A range query reads only
+the slice of the coarsest level that still has the requested number of
+points, so long tracks render without sending full-resolution data.
+
+Each track is `<key>.f16` (all levels of all curves, memory-mapped on read)
+plus `<key>.json` (sample rate, hop, level offsets, beat times).
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# curve -> how a level is reduced to the next (max keeps peaks visible)
+CURVES = {"rms": np.maximum, "centroid": None, "onset": np.maximum}
+MIN_LEVEL_FRAMES = 64
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def build_pyramid(curve: np.ndarray, reduce=None) -> List[np.ndarray]:
+    """Levels of `curve`, halving (pairwise max, or mean if `reduce` is None) each time."""
+    levels = [np.asarray(curve, dtype=np.float32)]
+    while len(levels[-1]) > MIN_LEVEL_FRAMES:
+        current = levels[-1]
+        if len(current) % 2:
+            current = np.append(current, current[-1])
+        pairs = current.reshape(-1, 2)
+        levels.append(reduce(pairs[:, 0], pairs[:, 1]) if reduce else pairs.mean(axis=1))
+    return levels
+
+
+class TimelineStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str, extension: str) -> str:
+        if not KEY_PATTERN.match(key):
+            raise KeyError(key)
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def save(
+        self,
+        key: str,
+        sample_rate: int,
+        hop_length: int,
+        curves: Dict[str, np.ndarray],
+        beat_times: Sequence[float],
+    ) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        frames = min(len(values) for values in curves.values())
+        offsets: Dict[str, List[List[int]]] = {}
+        parts, position = [], 0
+        for name, values in curves.items():
+            offsets[name] = []
+            for level in build_pyramid(values[:frames], CURVES.get(name)):
+                offsets[name].append([position, len(level)])
+                parts.append(level.astype(np.float16))
+                position += len(level)
+
+        meta = {
+            "sample_rate": sample_rate,
+            "hop_length": hop_length,
+            "frames": frames,
+            "duration": round(frames * hop_length / sample_rate, 3),
+            "levels": len(next(iter(offsets.values()))),
+            "offsets": offsets,
+            "beats": [round(float(t), 3) for t in beat_times],
+        }
+        data_path, meta_path = self._path(key, "f16"), self._path(key, "json")
+        np.concatenate(parts).tofile(data_path + ".tmp")
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        return self.summary(key, meta)
+
+    def summary(self, key: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "key": key,
+            "frames": meta["frames"],
+            "levels": meta["levels"],
+            "frame_seconds": round(meta["hop_length"] / meta["sample_rate"], 6),
+            "curves": list(meta["offsets"]),
+            "beats": len(meta["beats"]),
+        }
+
+    def _meta(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key, "json")) as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def query(
+        self,
+        key: str,
+        start: float = 0.0,
+        end: Optional[float] = None,
+        points: int = 1000,
+        curves: Optional[Sequence[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Curves between `start` and `end` seconds at the finest level with at
+        most `points` values in the range (the coarsest level if none has).
+        """
+        meta = self._meta(key)
+        if meta is None:
+            return None
+        curves = list(curves or meta["offsets"])
+        unknown = set(curves) - set(meta["offsets"])
+        if unknown:
+            raise ValueError(f"Unknown curves: {', '.join(sorted(unknown))}")
+
+        frame_seconds = meta["hop_length"] / meta["sample_rate"]
+        end = meta["duration"] if end is None else min(end, meta["duration"])
+        start = max(0.0, min(start, end))
+        first = int(start / frame_seconds)
+        last = max(first + 1, int(np.ceil(end / frame_seconds)))
+        level = 0
+        while level < meta["levels"] - 1 and (last - first) / 2**level > max(points, 1):
+            level += 1
+
+        scale = 2**level
+        data = np.memmap(self._path(key, "f16"), dtype=np.float16, mode="r")
+        result = {
+            "key": key,
+            "start": start,
+            "end": end,
+            "level": level,
+            "frame_seconds": round(frame_seconds * scale, 6),
+            "first_frame_time": round(first // scale * frame_seconds * scale, 6),
+        }
+        for name in curves:
+            offset, length = meta["offsets"][name][level]
+            lo, hi = min(first // scale, length), min(-(-last // scale), length)
+            segment = data[offset + lo : offset + hi]
+            result[name] = [round(v, 4) for v in segment.astype(np.float32).tolist()]
+        result["beats"] = [t for t in meta["beats"] if start <= t <= end]
+        return result
+
+    def delete(self, key: str) -> bool:
+        deleted = False
+        for extension in ("f16", "json"):
+            try:
+                os.remove(self._path(key, extension))
+                deleted = True
+            except (KeyError, FileNotFoundError):
+                pass
+        return deleted
+
+
+# Shared instance written by full_analysis and read by the /timeline routes
+timeline_store = TimelineStore(settings.TIMELINE_DIR)
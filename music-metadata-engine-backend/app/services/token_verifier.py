@@ -0,0 +1,202 @@
+"""
+Token Verifier
+Verifies Supabase access tokens locally instead of calling the auth server on
+every request. HS256 tokens are checked against the project's JWT secret;
+asymmetric tokens (RS256/ES256) against the project's JWKS, which is fetched
+once and cached. Validated tokens are kept in a short-TTL LRU so repeat
+requests skip signature checks too. Tokens that cannot be checked locally
+(no secret configured, JWKS unreachable) fall back to the Supabase API.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_AUDIENCE = "authenticated"
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+
+class InvalidToken(ValueError):
+    """Raised when a token is malformed, expired or fails signature checks."""
+
+
+# === LAZY IMPORTS ===
+def get_jwt():
+    import jwt
+
+    return jwt
+
+
+@dataclass
+class TokenUser:
+    """The authenticated user as described by the token's claims."""
+
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+    user_metadata: Dict[str, Any] = field(default_factory=dict)
+    app_metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "TokenUser":
+        return cls(
+            id=claims["sub"],
+            email=claims.get("email"),
+            role=claims.get("role"),
+            user_metadata=claims.get("user_metadata") or {},
+            app_metadata=claims.get("app_metadata") or {},
+        )
+
+
+class TokenVerifier:
+    """
+    Local JWT verification with a cache of validated tokens.
+    Cached entries never outlive the token's own `exp`.
+    """
+
+    def __init__(
+        self,
+        jwt_secret: Optional[str],
+        jwks_url: Optional[str],
+        cache_ttl_seconds: float,
+        cache_max_entries: int,
+        jwks_ttl_seconds: int,
+    ):
+        self.jwt_secret = jwt_secret
+        self.jwks_url = jwks_url
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = cache_max_entries
+        self.jwks_ttl_seconds = jwks_ttl_seconds
+        self._cache: "OrderedDict[str, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._jwks_client = None
+
+    @staticmethod
+    def _cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if time.time() >= expires_at:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return user
+
+    def _cache_set(self, key: str, user: Any, token_exp: Optional[float]) -> None:
+        if self.cache_ttl_seconds <= 0 or self.cache_max_entries <= 0:
+            return
+        expires_at = time.time() + self.cache_ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._cache[key] = (user, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _get_jwks_client(self):
+        if self._jwks_client is None:
+            self._jwks_client = get_jwt().PyJWKClient(
+                self.jwks_url, cache_jwk_set=True, lifespan=self.jwks_ttl_seconds
+            )
+        return self._jwks_client
+
+    def _signing_key(self, token: str, algorithm: str) -> Optional[Any]:
+        """Key to verify with, or None when this token cannot be checked locally."""
+        if algorithm == "HS256":
+            return self.jwt_secret or None
+        if algorithm in ASYMMETRIC_ALGORITHMS and self.jwks_url:
+            try:
+                return self._get_jwks_client().get_signing_key_from_jwt(token).key
+            except Exception as e:
+                # JWKS unreachable or key rotated away: let the auth server decide
+                logger.warning(f"JWKS lookup failed, falling back to Supabase: {e}")
+        return None
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the verified claims, or None if the token can only be verified
+        remotely. Raises InvalidToken for bad or expired tokens.
+        """
+        jwt = get_jwt()
+        try:
+            algorithm = jwt.get_unverified_header(token).get("alg")
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e))
+        key = self._signing_key(token, algorithm)
+        if key is None:
+            return None
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=SUPABASE_AUDIENCE,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e))
+
+    @staticmethod
+    def _fetch_remote(token: str) -> Any:
+        from app.supabase_client import get_supabase
+
+        response = get_supabase().auth.get_user(token)
+        return response.user if getattr(response, "user", None) is not None else response
+
+    def verify(self, token: str) -> Any:
+        """Returns the user for a token: from cache, local verification or Supabase."""
+        key = self._cache_key(token)
+        user = self._cache_get(key)
+        if user is not None:
+            return user
+
+        claims = self.decode(token)
+        if claims is not None:
+            user = TokenUser.from_claims(claims)
+            self._cache_set(key, user, claims.get("exp"))
+            return user
+
+        user = self._fetch_remote(token)
+        exp = None
+        try:
+            exp = get_jwt().decode(token, options={"verify_signature": False}).get("exp")
+        except Exception:
+            pass
+        self._cache_set(key, user, exp)
+        return user
+
+
+def jwks_url() -> Optional[str]:
+    if settings.SUPABASE_JWKS_URL:
+        return settings.SUPABASE_JWKS_URL
+    if settings.SUPABASE_URL:
+        return settings.SUPABASE_URL.rstrip("/") + "/auth/v1/.well-known/jwks.json"
+    return None
+
+
+# Shared instance used by get_current_user
+token_verifier = TokenVerifier(
+    jwt_secret=settings.SUPABASE_JWT_SECRET,
+    jwks_url=jwks_url(),
+    cache_ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    cache_max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    jwks_ttl_seconds=settings.SUPABASE_JWKS_TTL_SECONDS,
+)
@@ -0,0 +1,222 @@
+"""
+Waveform Peaks
+Min/max pairs per pixel bucket in the audiowaveform data format, so the web
+player draws waveforms without downloading and decoding the audio.
+
+Peaks are computed in one streaming pass over the PCM at the file's native
+sample rate (channels mixed to mono, as audiowaveform does by default) and
+stored as `<key>.dat` (binary format, version 1). JSON is derived from the
+.dat on request, and coarser zoom levels are reduced from the stored peaks.
+"""
+
+import logging
+import os
+import re
+import struct
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+DAT_VERSION = 1
+DAT_HEADER = struct.Struct("<iIiiI")  # version, flags, sample rate, samples per pixel, length
+FLAG_8_BIT = 0x1
+BLOCK_PIXELS = 4096  # pixels decoded per soundfile block
+
+
+def get_soundfile():
+    import soundfile as sf
+
+    return sf
+
+
+def get_librosa():
+    import librosa
+
+    return librosa
+
+
+class Peaks:
+    """Interleaved min/max pairs (int8 or int16) with their header fields."""
+
+    def __init__(self, data: np.ndarray, sample_rate: int, samples_per_pixel: int, bits: int):
+        self.data = data
+        self.sample_rate = sample_rate
+        self.samples_per_pixel = samples_per_pixel
+        self.bits = bits
+
+    @property
+    def length(self) -> int:
+        return len(self.data) // 2
+
+    def to_dat(self) -> bytes:
+        flags = FLAG_8_BIT if self.bits == 8 else 0
+        header = DAT_HEADER.pack(
+            DAT_VERSION, flags, self.sample_rate, self.samples_per_pixel, self.length
+        )
+        dtype = "<i1" if self.bits == 8 else "<i2"
+        return header + self.data.astype(dtype).tobytes()
+
+    @classmethod
+    def from_dat(cls, blob: bytes) -> "Peaks":
+        version, flags, sample_rate, samples_per_pixel, length = DAT_HEADER.unpack_from(blob)
+        if version != DAT_VERSION:
+            raise ValueError(f"Unsupported waveform data version {version}")
+        bits = 8 if flags & FLAG_8_BIT else 16
+        dtype = "<i1" if bits == 8 else "<i2"
+        data = np.frombuffer(blob, dtype=dtype, count=length * 2, offset=DAT_HEADER.size)
+        return cls(data, sample_rate, samples_per_pixel, bits)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": 2,
+            "channels": 1,
+            "sample_rate": self.sample_rate,
+            "samples_per_pixel": self.samples_per_pixel,
+            "bits": self.bits,
+            "length": self.length,
+            "data": self.data.tolist(),
+        }
+
+    def resample(self, samples_per_pixel: int) -> "Peaks":
+        """Coarser peaks; `samples_per_pixel` must be a multiple of the stored value."""
+        if samples_per_pixel == self.samples_per_pixel:
+            return self
+        factor, remainder = divmod(samples_per_pixel, self.samples_per_pixel)
+        if remainder or factor < 1:
+            raise ValueError(
+                f"samples_per_pixel must be a multiple of {self.samples_per_pixel}"
+            )
+        pairs = self.data.reshape(-1, 2)
+        starts = np.arange(0, len(pairs), factor)
+        data = np.empty((len(starts), 2), dtype=self.data.dtype)
+        if len(starts):
+            data[:, 0] = np.minimum.reduceat(pairs[:, 0], starts)
+            data[:, 1] = np.maximum.reduceat(pairs[:, 1], starts)
+        return Peaks(data.ravel(), self.sample_rate, samples_per_pixel, self.bits)
+
+
+class PeaksBuilder:
+    """Accumulates min/max per `samples_per_pixel` bucket over streamed PCM blocks."""
+
+    def __init__(self, sample_rate: int, samples_per_pixel: int, bits: int = 8):
+        if bits not in (8, 16):
+            raise ValueError("bits must be 8 or 16")
+        self.sample_rate = sample_rate
+        self.samples_per_pixel = samples_per_pixel
+        self.bits = bits
+        self._carry = np.empty(0, dtype=np.float32)
+        self._chunks = []
+
+    def feed(self, block: np.ndarray) -> None:
+        """Adds float samples in [-1, 1]; 2-D blocks (frames, channels) are mixed to mono."""
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 2:
+            block = block.mean(axis=1)
+        if len(self._carry):
+            block = np.concatenate([self._carry, block])
+        whole = len(block) - len(block) % self.samples_per_pixel
+        self._carry = block[whole:].copy()
+        if whole:
+            self._append(block[:whole].reshape(-1, self.samples_per_pixel))
+
+    def _append(self, buckets: np.ndarray) -> None:
+        pairs = np.empty((len(buckets), 2), dtype=np.float32)
+        pairs[:, 0] = buckets.min(axis=1)
+        pairs[:, 1] = buckets.max(axis=1)
+        # Same quantization as audiowaveform: 16-bit PCM, >> 8 for 8-bit output
+        pcm = np.clip(np.round(pairs * 32767), -32768, 32767).astype(np.int16)
+        self._chunks.append(pcm >> 8 if self.bits == 8 else pcm)
+
+    def finish(self) -> Peaks:
+        if len(self._carry):
+            self._append(self._carry[None, :])
+            self._carry = np.empty(0, dtype=np.float32)
+        dtype = np.int8 if self.bits == 8 else np.int16
+        data = (
+            np.concatenate(self._chunks).astype(dtype).ravel()
+            if self._chunks
+            else np.empty(0, dtype=dtype)
+        )
+        return Peaks(data, self.sample_rate, self.samples_per_pixel, self.bits)
+
+
+def compute_peaks(
+    file_path: str,
+    samples_per_pixel: Optional[int] = None,
+    bits: Optional[int] = None,
+) -> Peaks:
+    """
+    Peaks of an audio file. Formats libsndfile reads are streamed in blocks;
+    anything else is decoded once by librosa at its native rate.
+    """
+    samples_per_pixel = samples_per_pixel or settings.WAVEFORM_SAMPLES_PER_PIXEL
+    bits = bits or settings.WAVEFORM_BITS
+    sf = get_soundfile()
+    try:
+        info = sf.info(file_path)
+    except Exception:
+        info = None
+
+    if info is not None:
+        builder = PeaksBuilder(info.samplerate, samples_per_pixel, bits)
+        blocks: Iterable[np.ndarray] = sf.blocks(
+            file_path, blocksize=samples_per_pixel * BLOCK_PIXELS, dtype="float32"
+        )
+    else:
+        y, sr = get_librosa().load(file_path, sr=None, mono=True)
+        builder = PeaksBuilder(int(sr), samples_per_pixel, bits)
+        step = samples_per_pixel * BLOCK_PIXELS
+        blocks = (y[i : i + step] for i in range(0, len(y), step))
+    for block in blocks:
+        builder.feed(block)
+    return builder.finish()
+
+
+class WaveformStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        if not KEY_PATTERN.match(key):
+            raise KeyError(key)
+        return os.path.join(self.directory, f"{key}.dat")
+
+    def save(self, key: str, peaks: Peaks) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        with open(path + ".tmp", "wb") as f:
+            f.write(peaks.to_dat())
+        os.replace(path + ".tmp", path)
+        return {
+            "key": key,
+            "sample_rate": peaks.sample_rate,
+            "samples_per_pixel": peaks.samples_per_pixel,
+            "bits": peaks.bits,
+            "length": peaks.length,
+        }
+
+    def generate(self, key: str, file_path: str) -> Dict[str, Any]:
+        return self.save(key, compute_peaks(file_path))
+
+    def load(self, key: str) -> Optional[Peaks]:
+        try:
+            with open(self.path(key), "rb") as f:
+                return Peaks.from_dat(f.read())
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+            return True
+        except (KeyError, FileNotFoundError):
+            return False
+
+
+# Shared instance written by full_analysis and read by the /waveform routes
+waveform_store = WaveformStore(settings.WAVEFORM_DIR)
@@ -0,0 +1,110 @@
+"""
+Startup Import Profiler
+Records how long each module takes to import while the app boots, so the
+cold-start import budget can be checked and regressions traced to a module.
+Only depends on the standard library so it can be installed before FastAPI
+and the routers are imported.
+"""
+
+import importlib.abc
+import sys
+import time
+from typing import Any, Dict, List
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """
+    Meta path hook that delegates to the real finders and wraps the
+    per-module loader's exec_module with a timer.
+    """
+
+    def __init__(self, profiler: "ImportProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                self._wrap_loader(spec)
+                return spec
+        return None
+
+    def _wrap_loader(self, spec) -> None:
+        loader = spec.loader
+        # Builtin/frozen importers are shared classes; they are cheap, skip them
+        if loader is None or isinstance(loader, type):
+            return
+        original = getattr(loader, "exec_module", None)
+        if original is None:
+            return
+        profiler = self.profiler
+        name = spec.name
+
+        def exec_module(module):
+            profiler._enter()
+            start = time.perf_counter()
+            try:
+                original(module)
+            finally:
+                profiler._exit(name, time.perf_counter() - start)
+                try:
+                    del loader.exec_module  # restore the class method
+                except AttributeError:
+                    pass
+
+        try:
+            loader.exec_module = exec_module
+        except (AttributeError, TypeError):
+            pass
+
+
+class ImportProfiler:
+    """
+    Collects inclusive and self import time per module between start() and stop().
+    """
+
+    def __init__(self):
+        self.modules: Dict[str, Dict[str, float]] = {}
+        self.total_seconds = 0.0
+        self._finder = _TimingFinder(self)
+        self._child_time: List[float] = []
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        self._started_at = time.perf_counter()
+        if self._finder not in sys.meta_path:
+            sys.meta_path.insert(0, self._finder)
+
+    def stop(self) -> None:
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self.total_seconds += time.perf_counter() - self._started_at
+
+    def _enter(self) -> None:
+        self._child_time.append(0.0)
+
+    def _exit(self, name: str, elapsed: float) -> None:
+        children = self._child_time.pop()
+        if self._child_time:
+            self._child_time[-1] += elapsed
+        self.modules[name] = {
+            "inclusive_ms": round(elapsed * 1000, 2),
+            "self_ms": round(max(elapsed - children, 0.0) * 1000, 2),
+        }
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        """Total import time plus the slowest modules by self time."""
+        slowest = sorted(
+            self.modules.items(), key=lambda item: item[1]["self_ms"], reverse=True
+        )[:top]
+        return {
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "module_count": len(self.modules),
+            "slowest": [{"module": name, **timing} for name, timing in slowest],
+        }
+
+
+# Installed by app.main before any router is imported
+import_profiler = ImportProfiler()
@@ -1,6 +1,9 @@
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Optional
 from app.config import settings
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 supabase_url = settings.SUPABASE_URL
 supabase_key = settings.SUPABASE_KEY
 
@@ -8,9 +11,23 @@ if not supabase_url or not supabase_key:
     # raise ValueError("Supabase URL and Key must be set in the environment variables.")
     print("WARNING: Supabase URL/Key missing. Auth/DB features will not work.")
 
+_client = None
+_initialized = False
+
+
+def get_supabase() -> Optional["Client"]:
+    """
+    Returns the shared Supabase client, creating it on first use.
+    The supabase package is heavy to import, so it is kept off the startup path.
+    """
+    global _client, _initialized
+    if not _initialized:
+        _initialized = True
+        try:
+            from supabase import create_client
 
-try:
-    supabase: Client = create_client(supabase_url, supabase_key)
-except Exception as e:
-    print(f"Failed to create Supabase client: {e}")
-    supabase = None
+            _client = create_client(supabase_url, supabase_key)
+        except Exception as e:
+            print(f"Failed to create Supabase client: {e}")
+            _client = None
+    return _client
@@ -1,6 +1,26 @@
 # Type aliases for backward compatibility with deprecated gotrue
 # The User type is now part of the supabase client
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 # Simple type alias for User - represents authenticated user data
 User = Dict[str, Any]
+
+
+def user_key(user: Any) -> Optional[str]:
+    """Extracts a stable id from a Supabase user or user response."""
+    if user is None:
+        return None
+    if isinstance(user, dict):
+        return user.get("id") or user_key(user.get("user"))
+    return getattr(user, "id", None) or user_key(getattr(user, "user", None))
+
+
+def user_metadata(user: Any) -> Dict[str, Any]:
+    """Extracts user_metadata from a Supabase user or user response."""
+    if user is None:
+        return {}
+    if isinstance(user, dict):
+        return user.get("user_metadata") or user_metadata(user.get("user"))
+    return getattr(user, "user_metadata", None) or user_metadata(
+        getattr(user, "user", None)
+    )
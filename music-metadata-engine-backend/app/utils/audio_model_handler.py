@@ -1,6 +1,6 @@
-import os
 import io
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Union
 
 # Lazy imports for optional ML dependencies
 try:
@@ -13,14 +13,13 @@ try:
 except ImportError:
     librosa = None
 
-try:
-    import tensorflow as tf
-except ImportError:
-    tf = None
+from app.config import settings
+from app.metrics import MODEL_LOAD_SECONDS
+from app.utils.mood_model_runtime import derived_path, load_backend, resolve_backend
 
 # --- Configuration ---
 # ... (constants unchanged) ...
-MODEL_PATH = os.getenv("MOOD_MODEL_PATH", "models/mood_model_v2_finetuned.h5")
+MODEL_PATH = settings.MOOD_MODEL_PATH
 AUDIO_PARAMS = {"sample_rate": 22050, "duration_secs": 30, "n_mels": 128}
 CLASS_LABELS = [
     "Angry", "Anxious", "Calm", "Celebratory", "Dark", "Dreamy", "Energetic",
@@ -37,98 +36,268 @@ class AudioModelHandler:
     """
 
     model: Any = None
+    backend: Optional[str] = None
 
     def load_model(self):
-        """Loads Keras model into memory."""
-        if tf is None:
-            print("Warning: TensorFlow not installed. Mood analysis disabled.")
-            return
-
-        if not os.path.exists(MODEL_PATH):
+        """
+        Loads the model with the configured runtime (MOOD_MODEL_BACKEND).
+        ONNX / TFLite exports avoid importing TensorFlow in the worker.
+        """
+        resolved = resolve_backend(
+            settings.MOOD_MODEL_BACKEND,
+            keras_path=MODEL_PATH,
+            onnx_path=settings.MOOD_MODEL_ONNX_PATH or derived_path(MODEL_PATH, "onnx"),
+            tflite_path=settings.MOOD_MODEL_TFLITE_PATH
+            or derived_path(MODEL_PATH, "tflite"),
+        )
+        if resolved is None:
             print(
-                f"Warning: Model file not found at '{MODEL_PATH}'. Mood analysis functionality will be disabled."
+                f"Warning: No usable mood model for backend '{settings.MOOD_MODEL_BACKEND}' "
+                f"(model file or runtime missing, base path '{MODEL_PATH}'). "
+                "Mood analysis functionality will be disabled."
             )
             self.model = None
             return
 
+        backend, path = resolved
         try:
-            print(f"Loading model from: {MODEL_PATH}")
-            self.model = tf.keras.models.load_model(MODEL_PATH)
+            print(f"Loading {backend} model from: {path}")
+            with MODEL_LOAD_SECONDS.time(model=f"mood-{backend}"):
+                self.model = load_backend(backend, path, settings.MOOD_MODEL_THREADS)
+            self.backend = backend
             print("Mood analysis model loaded successfully.")
         except Exception as e:
-            print(f"Error loading model from '{MODEL_PATH}': {e}")
+            print(f"Error loading model from '{path}': {e}")
             self.model = None
 
-    def _preprocess_audio(self, audio_bytes: bytes) -> Any:
-        """Processes raw audio bytes into Mel spectrogram, ready for prediction."""
-        if librosa is None or np is None:
-            print("Warning: librosa or numpy not installed. Audio preprocessing disabled.")
-            return None
-            
+    @staticmethod
+    def _source(audio: Union[bytes, str]) -> Any:
+        return io.BytesIO(audio) if isinstance(audio, (bytes, bytearray)) else audio
+
+    @classmethod
+    def _load_signal(cls, audio: Union[bytes, str], offset: float = 0.0) -> Any:
+        """Decodes one window from bytes or straight from a file path (no in-memory copy)."""
+        signal, _ = librosa.load(
+            cls._source(audio),
+            sr=AUDIO_PARAMS["sample_rate"],
+            offset=offset,
+            duration=AUDIO_PARAMS["duration_secs"],
+        )
+        return signal
+
+    @classmethod
+    def _seekable_duration(cls, audio: Union[bytes, str]) -> Optional[float]:
+        """
+        Track length from the header if libsndfile can read (and so seek) the
+        format, else None. Formats it cannot read (MP3 on builds without MPEG
+        support) go through audioread, which decodes from the start every time.
+        """
         try:
-            signal, sr = librosa.load(
-                io.BytesIO(audio_bytes),
-                sr=AUDIO_PARAMS["sample_rate"],
-                duration=AUDIO_PARAMS["duration_secs"],
-            )
+            import soundfile
 
-            # Align signal length
-            expected_length = (
-                AUDIO_PARAMS["sample_rate"] * AUDIO_PARAMS["duration_secs"]
-            )
-            if len(signal) < expected_length:
-                signal = np.pad(signal, (0, expected_length - len(signal)), "constant")
-            else:
-                signal = signal[:expected_length]
+            return float(soundfile.info(cls._source(audio)).duration)
+        except Exception:
+            return None
 
-            # Ekstrakcja cech (spektrogram Mel)
-            mel_spectrogram = librosa.feature.melspectrogram(
-                y=signal, sr=sr, n_mels=AUDIO_PARAMS["n_mels"]
-            )
-            log_mel_spectrogram = librosa.power_to_db(mel_spectrogram, ref=np.max)
+    @classmethod
+    def _decode_full(cls, audio: Union[bytes, str]) -> Any:
+        """Decodes the whole track once (audioread needs a path, so bytes are spooled)."""
+        if not isinstance(audio, (bytes, bytearray)):
+            signal, _ = librosa.load(audio, sr=AUDIO_PARAMS["sample_rate"])
+            return signal
+        import tempfile
 
-            # Normalizacja
-            min_val, max_val = np.min(log_mel_spectrogram), np.max(log_mel_spectrogram)
-            if max_val - min_val > 0:
-                normalized_spectrogram = (log_mel_spectrogram - min_val) / (
-                    max_val - min_val
-                )
-            else:
-                normalized_spectrogram = log_mel_spectrogram
+        with tempfile.NamedTemporaryFile(suffix=".audio") as spooled:
+            spooled.write(audio)
+            spooled.flush()
+            signal, _ = librosa.load(spooled.name, sr=AUDIO_PARAMS["sample_rate"])
+        return signal
 
-            # Add batch and channel dimensions
-            return normalized_spectrogram[np.newaxis, ..., np.newaxis]
+    @staticmethod
+    def _spectrograms(signals: Sequence[Any]) -> Any:
+        """
+        Normalized log-Mel spectrograms (windows, n_mels, frames) of fixed-length
+        windows, computed in one batched call. Each window is scaled on its own.
+        """
+        # Align signal length
+        expected_length = AUDIO_PARAMS["sample_rate"] * AUDIO_PARAMS["duration_secs"]
+        batch = np.zeros((len(signals), expected_length), dtype=np.float32)
+        for i, signal in enumerate(signals):
+            signal = signal[:expected_length]
+            batch[i, : len(signal)] = signal
+
+        # Ekstrakcja cech (spektrogram Mel)
+        mel_spectrogram = librosa.feature.melspectrogram(
+            y=batch, sr=AUDIO_PARAMS["sample_rate"], n_mels=AUDIO_PARAMS["n_mels"]
+        )
+        # power_to_db(ref=np.max, top_db=80) per window
+        log_mel = 10.0 * np.log10(np.maximum(mel_spectrogram, 1e-10))
+        log_mel -= np.max(log_mel, axis=(1, 2), keepdims=True)
+        log_mel = np.maximum(log_mel, -80.0)
 
+        # Normalizacja
+        min_val = np.min(log_mel, axis=(1, 2), keepdims=True)
+        max_val = np.max(log_mel, axis=(1, 2), keepdims=True)
+        spread = max_val - min_val
+        return np.where(
+            spread > 0, (log_mel - min_val) / np.where(spread > 0, spread, 1), log_mel
+        )
+
+    @classmethod
+    def _spectrogram(cls, signal: Any) -> Any:
+        """Normalized log-Mel spectrogram (n_mels, frames) of a fixed-length window."""
+        return cls._spectrograms([signal])[0]
+
+    def _preprocess_audio(self, audio: Union[bytes, str]) -> Any:
+        """Processes raw audio bytes (or a file path) into a Mel spectrogram, ready for prediction."""
+        if librosa is None or np is None:
+            print("Warning: librosa or numpy not installed. Audio preprocessing disabled.")
+            return None
+
+        try:
+            spectrogram = self._spectrogram(self._load_signal(audio))
+            # Add batch and channel dimensions
+            return spectrogram[np.newaxis, ..., np.newaxis]
         except Exception as e:
             print(f"Error during audio processing: {e}")
             return None
 
-    def predict_moods(self, audio_bytes: bytes, top_n: int = 5) -> List[Dict[str, Any]]:
+    def predict_scores(self, batch: Any) -> Any:
+        """Runs one model call over a (batch, n_mels, frames, 1) tensor."""
+        return np.asarray(self.model.predict(batch, batch_size=len(batch), verbose=0))
+
+    @staticmethod
+    def format_predictions(scores: Any, top_n: int = 5) -> List[Dict[str, Any]]:
+        # Associate predictions with labels and sort
+        results = [
+            {"mood": label, "score": float(score)}
+            for label, score in zip(CLASS_LABELS, scores)
+        ]
+        return sorted(results, key=lambda x: x["score"], reverse=True)[:top_n]
+
+    def predict_moods(
+        self, audio: Union[bytes, str], top_n: int = 5
+    ) -> List[Dict[str, Any]]:
         """
-        Makes mood predictions based on provided audio bytes.
+        Makes mood predictions based on provided audio bytes or file path.
         """
         if self.model is None:
             return []
 
-        spectrogram = self._preprocess_audio(audio_bytes)
+        spectrogram = self._preprocess_audio(audio)
         if spectrogram is None:
             return []
 
         try:
-            predictions = self.model.predict(spectrogram)[0]
-
-            # Associate predictions with labels and sort
-            results = [
-                {"mood": label, "score": float(score)}
-                for label, score in zip(CLASS_LABELS, predictions)
-            ]
-            sorted_results = sorted(results, key=lambda x: x["score"], reverse=True)
-
-            return sorted_results[:top_n]
+            return self.format_predictions(self.predict_scores(spectrogram)[0], top_n)
         except Exception as e:
             print(f"Error during model prediction: {e}")
             return []
 
+    @staticmethod
+    def window_starts(
+        duration: float, windows: int, hop: Optional[float] = None
+    ) -> List[float]:
+        """
+        Window offsets (seconds): `windows` evenly spread across the track, or,
+        with `hop`, sliding windows every `hop` seconds capped at `windows`.
+        """
+        window = AUDIO_PARAMS["duration_secs"]
+        last = max(0.0, duration - window)
+        if last == 0.0 or windows <= 1:
+            return [0.0]
+        if hop:
+            starts = np.arange(0.0, last + 1e-6, hop)[:windows]
+        else:
+            starts = np.linspace(0.0, last, windows)
+        return [round(float(start), 3) for start in starts]
+
+    def predict_moods_windowed(
+        self,
+        audio: Union[bytes, str],
+        windows: int = 5,
+        hop: Optional[float] = None,
+        top_n: int = 5,
+    ) -> Dict[str, Any]:
+        """
+        Mood predictions from several windows across the whole track instead
+        of only its first 30 seconds. Formats libsndfile can seek are decoded
+        window by window; others are decoded once and sliced. Spectrograms are
+        built and scored as one batch. Returns track-level moods (mean score
+        over windows), a per-window timeline and which decode path ran.
+        """
+        if self.model is None or librosa is None or np is None:
+            return {"moods": [], "timeline": []}
+
+        sr, window = AUDIO_PARAMS["sample_rate"], AUDIO_PARAMS["duration_secs"]
+        try:
+            duration = self._seekable_duration(audio)
+            if duration is not None:
+                decode = "seek"
+                starts = self.window_starts(duration, windows, hop)
+                signals = [self._load_signal(audio, offset=start) for start in starts]
+            else:
+                # Seeking would re-decode from the start for every window:
+                # decode once and slice the windows out of the signal instead
+                decode = "full"
+                signal = self._decode_full(audio)
+                duration = len(signal) / sr
+                starts = self.window_starts(duration, windows, hop)
+                offsets = [int(start * sr) for start in starts]
+                signals = [signal[offset : offset + sr * window] for offset in offsets]
+            batch = self._spectrograms(signals)[..., np.newaxis]
+            scores = self.predict_scores(batch)
+        except Exception as e:
+            print(f"Error during windowed mood prediction: {e}")
+            return {"moods": [], "timeline": [], "error": str(e)}
+
+        return {
+            "moods": self.format_predictions(scores.mean(axis=0), top_n),
+            # "full": the format could not be seeked, so the whole track was decoded
+            "decode": decode,
+            "timeline": [
+                {
+                    "start": start,
+                    "end": round(min(start + window, duration), 3),
+                    "moods": self.format_predictions(row, top_n),
+                }
+                for start, row in zip(starts, scores)
+            ],
+        }
+
+    def predict_moods_batch(
+        self,
+        items: Sequence[Union[bytes, str]],
+        top_n: int = 5,
+        batch_size: int = 32,
+        workers: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Mood predictions for many tracks (catalog runs): spectrograms are
+        computed in parallel threads, then run through the model `batch_size`
+        at a time. Items that fail to decode get an empty list.
+        """
+        if self.model is None or not items:
+            return [[] for _ in items]
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            spectrograms = list(pool.map(self._preprocess_audio, items))
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in items]
+        valid = [i for i, spec in enumerate(spectrograms) if spec is not None]
+        for start in range(0, len(valid), batch_size):
+            chunk = valid[start : start + batch_size]
+            try:
+                scores = self.predict_scores(
+                    np.concatenate([spectrograms[i] for i in chunk])
+                )
+            except Exception as e:
+                print(f"Error during model prediction: {e}")
+                continue
+            for i, row in zip(chunk, scores):
+                results[i] = self.format_predictions(row, top_n)
+        return results
+
 
 # Create a single instance that will be used throughout the application
 mood_model_handler = AudioModelHandler()
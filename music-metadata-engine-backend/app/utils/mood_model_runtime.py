@@ -0,0 +1,214 @@
+"""
+Mood Model Runtimes
+Lightweight inference backends for the mood model and the tools to produce
+them from the Keras .h5 file. ONNX Runtime and the TFLite interpreter load in
+a fraction of TensorFlow's import time and memory; every backend exposes the
+Keras-style `predict(batch)` used by AudioModelHandler.
+
+Export (needs TensorFlow, plus tf2onnx / onnxruntime for ONNX):
+    python -m app.utils.mood_model_runtime --format onnx --quantize
+    python -m app.utils.mood_model_runtime --format tflite --quantize
+"""
+
+import argparse
+import logging
+import os
+import threading
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("keras", "onnx", "tflite")
+
+
+# === LAZY IMPORTS (optional dependencies) ===
+def get_tensorflow():
+    import tensorflow as tf
+
+    return tf
+
+
+def get_onnxruntime():
+    import onnxruntime
+
+    return onnxruntime
+
+
+def get_tflite_interpreter():
+    """The standalone tflite-runtime if installed, otherwise TensorFlow's copy."""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+
+        return Interpreter
+    except ImportError:
+        return get_tensorflow().lite.Interpreter
+
+
+class OnnxMoodModel:
+    """Mood model served by ONNX Runtime on CPU."""
+
+    def __init__(self, path: str, threads: int = 0):
+        ort = get_onnxruntime()
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: Any, batch_size: Optional[int] = None, verbose: int = 0) -> Any:
+        import numpy as np
+
+        feed = {self.input_name: np.asarray(batch, dtype=np.float32)}
+        return self.session.run(None, feed)[0]
+
+
+class TFLiteMoodModel:
+    """
+    Mood model served by the TFLite interpreter (input resized per batch).
+    The interpreter is not thread-safe and the batcher, windowed and catalog
+    paths call it from worker threads, so each predict holds a lock.
+    """
+
+    def __init__(self, path: str, threads: int = 0):
+        self.interpreter = get_tflite_interpreter()(
+            model_path=path, num_threads=threads or None
+        )
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self._batch = int(self.input["shape"][0])
+        self._lock = threading.Lock()
+
+    def predict(self, batch: Any, batch_size: Optional[int] = None, verbose: int = 0) -> Any:
+        import numpy as np
+
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if len(batch) != self._batch:
+                self.interpreter.resize_tensor_input(self.input["index"], list(batch.shape))
+                self.interpreter.allocate_tensors()
+                self.input = self.interpreter.get_input_details()[0]
+                self.output = self.interpreter.get_output_details()[0]
+                self._batch = len(batch)
+            self.interpreter.set_tensor(self.input["index"], batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output["index"]).copy()
+
+
+def derived_path(keras_path: str, backend: str) -> str:
+    """models/x.h5 -> models/x.onnx / models/x.tflite"""
+    return os.path.splitext(keras_path)[0] + {"onnx": ".onnx", "tflite": ".tflite"}[backend]
+
+
+def resolve_backend(
+    backend: str, keras_path: str, onnx_path: str, tflite_path: str
+) -> Optional[Tuple[str, str]]:
+    """
+    Picks (backend, path). "auto" prefers ONNX, then TFLite, then Keras,
+    taking the first whose model file exists and whose runtime is installed.
+    """
+    paths = {"keras": keras_path, "onnx": onnx_path, "tflite": tflite_path}
+    if backend != "auto":
+        return (backend, paths[backend]) if os.path.exists(paths[backend]) else None
+
+    importers = {
+        "onnx": get_onnxruntime,
+        "tflite": get_tflite_interpreter,
+        "keras": get_tensorflow,
+    }
+    for name in ("onnx", "tflite", "keras"):
+        if not os.path.exists(paths[name]):
+            continue
+        try:
+            importers[name]()
+        except ImportError:
+            continue
+        return name, paths[name]
+    return None
+
+
+def load_backend(backend: str, path: str, threads: int = 0) -> Any:
+    if backend == "onnx":
+        return OnnxMoodModel(path, threads)
+    if backend == "tflite":
+        return TFLiteMoodModel(path, threads)
+    return get_tensorflow().keras.models.load_model(path)
+
+
+# === EXPORT ===
+def representative_batches(model: Any, count: int = 16):
+    """Calibration inputs for int8 quantization (random spectrogram-shaped data)."""
+    import numpy as np
+
+    shape = [1] + [int(d) for d in model.input_shape[1:]]
+    rng = np.random.default_rng(0)
+    for _ in range(count):
+        yield [rng.random(shape, dtype=np.float32)]
+
+
+def export_onnx(keras_path: str, output_path: str, quantize: bool = False) -> str:
+    tf = get_tensorflow()
+    import tf2onnx
+
+    model = tf.keras.models.load_model(keras_path)
+    signature = [
+        tf.TensorSpec([None] + list(model.input_shape[1:]), tf.float32, name="input")
+    ]
+    float_path = output_path if not quantize else output_path + ".fp32"
+    tf2onnx.convert.from_keras(
+        model, input_signature=signature, opset=13, output_path=float_path
+    )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+        os.remove(float_path)
+    return output_path
+
+
+def export_tflite(keras_path: str, output_path: str, quantize: bool = False) -> str:
+    tf = get_tensorflow()
+    model = tf.keras.models.load_model(keras_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: representative_batches(model)
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def parity(reference: Any, candidate: Any, batch: Any) -> float:
+    """Largest absolute score difference between two models on the same batch."""
+    import numpy as np
+
+    expected = np.asarray(reference.predict(batch, verbose=0))
+    actual = np.asarray(candidate.predict(batch, verbose=0))
+    return float(np.max(np.abs(expected - actual)))
+
+
+def main() -> None:
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Export the mood model for CPU runtimes")
+    parser.add_argument("--format", choices=["onnx", "tflite"], required=True)
+    parser.add_argument("--source", default=settings.MOOD_MODEL_PATH)
+    parser.add_argument("--output")
+    parser.add_argument("--quantize", action="store_true", help="int8 weights")
+    args = parser.parse_args()
+
+    output = args.output or derived_path(args.source, args.format)
+    exporter = export_onnx if args.format == "onnx" else export_tflite
+    exporter(args.source, output, quantize=args.quantize)
+
+    keras_model = load_backend("keras", args.source)
+    batch = next(representative_batches(keras_model, count=1))[0]
+    diff = parity(keras_model, load_backend(args.format, output), batch)
+    print(f"Wrote {output} (max score difference vs Keras: {diff:.5f})")
+
+
+if __name__ == "__main__":
+    main()
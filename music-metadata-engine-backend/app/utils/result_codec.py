@@ -0,0 +1,67 @@
+"""
+Codec for stored analysis results.
+Results are addressed by the SHA-256 of their canonical JSON, so identical
+results share one stored blob. Blobs are msgpack + zstd when both libraries
+are installed, otherwise JSON + zlib (standard library).
+"""
+
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Tuple
+
+CODEC_MSGPACK_ZSTD = "msgpack+zstd"
+CODEC_JSON_ZLIB = "json+zlib"
+ZSTD_LEVEL = 10
+
+
+# === LAZY IMPORTS (optional dependencies) ===
+def get_msgpack():
+    try:
+        import msgpack
+
+        return msgpack
+    except ImportError:
+        return None
+
+
+def get_zstd():
+    try:
+        import zstandard
+
+        return zstandard
+    except ImportError:
+        return None
+
+
+def canonical_json(result: Dict[str, Any]) -> bytes:
+    return json.dumps(
+        result, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
+
+
+def result_hash(result: Dict[str, Any]) -> str:
+    return hashlib.sha256(canonical_json(result)).hexdigest()
+
+
+def encode_result(result: Dict[str, Any]) -> Tuple[str, str, bytes, int]:
+    """Returns (hash, codec, blob, raw_size) for a result dict."""
+    canonical = canonical_json(result)
+    digest = hashlib.sha256(canonical).hexdigest()
+    msgpack, zstd = get_msgpack(), get_zstd()
+    if msgpack is not None and zstd is not None:
+        packed = msgpack.packb(result, use_bin_type=True, default=str)
+        blob = zstd.ZstdCompressor(level=ZSTD_LEVEL).compress(packed)
+        return digest, CODEC_MSGPACK_ZSTD, blob, len(canonical)
+    return digest, CODEC_JSON_ZLIB, zlib.compress(canonical, 6), len(canonical)
+
+
+def decode_result(codec: str, blob: bytes) -> Dict[str, Any]:
+    if codec == CODEC_MSGPACK_ZSTD:
+        msgpack, zstd = get_msgpack(), get_zstd()
+        if msgpack is None or zstd is None:
+            raise RuntimeError("msgpack/zstandard are required to read this result.")
+        return msgpack.unpackb(zstd.ZstdDecompressor().decompress(blob), raw=False)
+    if codec == CODEC_JSON_ZLIB:
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+    raise ValueError(f"Unknown result codec: {codec}")
@@ -0,0 +1,39 @@
+"""
+Upstream HTTP clients
+httpx clients for third-party APIs that record each call's latency and
+status in the upstream_request_duration_seconds histogram.
+"""
+
+import time
+
+import httpx
+
+from app.metrics import UPSTREAM_REQUEST_SECONDS
+
+
+class TimedTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport and times every request (until response headers)."""
+
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport = None):
+        self.service = service
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            UPSTREAM_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, service=self.service, status=status
+            )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def upstream_client(service: str, **kwargs) -> httpx.AsyncClient:
+    """An AsyncClient whose requests are timed under `service`."""
+    return httpx.AsyncClient(transport=TimedTransport(service), **kwargs)
@@ -0,0 +1,225 @@
+"""
+Background Warmup
+Heavy libraries are kept off the import path and loaded here, in a worker
+thread, right after the app starts. The analysis pipeline is then run once on
+a synthetic signal so numba JIT compilation, the CREPE/TensorFlow graph and
+the Whisper model are ready before the first real request.
+/health/ready reports 503 until every step has finished so a load balancer
+only routes to warm workers.
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupService:
+    """
+    Runs registered warmup steps once and tracks per-component state:
+    pending -> running -> warm | failed, or skipped when disabled/not selected.
+    """
+
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], Any]]] = []
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def step(self, name: str):
+        """Decorator registering a blocking warmup function."""
+
+        def decorator(fn: Callable[[], Any]):
+            self.steps.append((name, fn))
+            self.components[name] = {"status": "pending"}
+            return fn
+
+        return decorator
+
+    @property
+    def ready(self) -> bool:
+        # A failed step is an optional dependency that is missing or broken; the
+        # rest of the pipeline works without it, so the worker still takes traffic
+        return all(
+            c["status"] in ("warm", "failed", "skipped")
+            for c in self.components.values()
+        )
+
+    def start(self, only: Optional[Iterable[str]] = None) -> None:
+        """Schedules the warmup on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(only))
+
+    def skip(self, names: Optional[Iterable[str]] = None) -> None:
+        for name, component in self.components.items():
+            if names is None or name in names:
+                component["status"] = "skipped"
+
+    async def run(self, only: Optional[Iterable[str]] = None) -> None:
+        """Runs the steps in registration order (optionally a subset by name)."""
+        self.started_at = time.time()
+        selected = set(only) if only else None
+        for name, fn in self.steps:
+            component = self.components[name]
+            if selected is not None and name not in selected:
+                component["status"] = "skipped"
+                continue
+            component["status"] = "running"
+            start = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(fn):
+                    # Async analyzers do blocking work; give them their own loop
+                    detail = await asyncio.to_thread(asyncio.run, fn())
+                else:
+                    detail = await asyncio.to_thread(fn)
+                component["status"] = "warm"
+                if detail:
+                    component["detail"] = detail
+            except Exception as e:
+                # Optional dependencies may be missing; the worker still serves
+                logger.warning(f"Warmup step '{name}' failed: {e}")
+                component["status"] = "failed"
+                component["error"] = str(e)
+            component["seconds"] = round(time.perf_counter() - start, 3)
+        self.finished_at = time.time()
+        logger.info(f"Warmup finished in {self.finished_at - self.started_at:.2f}s")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "components": self.components,
+            "failed": [n for n, c in self.components.items() if c["status"] == "failed"],
+            "total_seconds": (
+                round(self.finished_at - self.started_at, 3)
+                if self.started_at and self.finished_at
+                else None
+            ),
+        }
+
+
+warmup = WarmupService()
+
+
+@warmup.step("numpy")
+def _warm_numpy():
+    import numpy  # noqa: F401
+
+
+@warmup.step("librosa")
+def _warm_librosa():
+    import librosa
+
+    # librosa loads submodules lazily; touching them pulls in numba/scipy/sklearn
+    _ = librosa.feature, librosa.beat, librosa.onset
+
+
+@warmup.step("gemini")
+def _warm_gemini():
+    from app.services.gemini_gateway import get_genai
+
+    get_genai()
+
+
+@warmup.step("supabase")
+def _warm_supabase():
+    from app.supabase_client import get_supabase
+
+    if get_supabase() is None:
+        return "client unavailable (check SUPABASE_URL/SUPABASE_KEY)"
+
+
+# --- Pipeline warmup on a synthetic signal ---
+
+SYNTHETIC_SR = 22050
+SYNTHETIC_SECONDS = 8
+
+
+def write_synthetic_track(path: str, seconds: int = SYNTHETIC_SECONDS) -> str:
+    """Writes a 120 BPM click track over an A minor triad to `path` (WAV)."""
+    import numpy as np
+    import soundfile as sf
+
+    t = np.arange(SYNTHETIC_SR * seconds) / SYNTHETIC_SR
+    tone = sum(np.sin(2 * np.pi * f * t) for f in (220.0, 261.63, 329.63)) / 6
+    clicks = np.zeros_like(t)
+    click = np.hanning(256)
+    for start in range(0, len(t) - 256, SYNTHETIC_SR // 2):
+        clicks[start : start + 256] += click
+    sf.write(path, (tone + 0.5 * clicks).astype("float32"), SYNTHETIC_SR)
+    return path
+
+
+async def _run_on_synthetic(analyze: Callable[[str], Any]) -> None:
+    fd, path = tempfile.mkstemp(suffix=".wav", prefix="warmup_")
+    os.close(fd)
+    try:
+        write_synthetic_track(path)
+        await analyze(path)
+    finally:
+        os.remove(path)
+
+
+@warmup.step("analysis")
+async def _warm_analysis():
+    """JIT-compiles the librosa/numba paths used by every analysis route."""
+    from app.services.audio_analyzer import AdvancedAudioAnalyzer
+    from app.services.mir import MIRService
+    from app.services.structure import StructureAnalyzer
+
+    async def analyze(path: str):
+        await AdvancedAudioAnalyzer.analyze_core(path)
+        await AdvancedAudioAnalyzer.analyze_loudness(path)
+        await MIRService.analyze_audio(path)
+        await StructureAnalyzer.analyze(path)
+
+    await _run_on_synthetic(analyze)
+
+
+@warmup.step("crepe")
+async def _warm_crepe():
+    """Builds the CREPE/TensorFlow graph (cached inside crepe afterwards)."""
+    from app.services.audio_analyzer import AdvancedAudioAnalyzer
+
+    errors = []
+
+    async def analyze(path: str):
+        result = await AdvancedAudioAnalyzer.analyze_pitch(path)
+        if "error" in result:
+            errors.append(result["error"])
+
+    await _run_on_synthetic(analyze)
+    if errors:
+        raise RuntimeError(errors[0])
+
+
+@warmup.step("whisper")
+def _warm_whisper():
+    from app.services.groq_whisper import get_whisper_model
+
+    get_whisper_model(settings.WARMUP_WHISPER_MODEL)
+    return f"model '{settings.WARMUP_WHISPER_MODEL}' loaded"
+
+
+@warmup.step("mood_model")
+def _warm_mood_model():
+    from app.utils.audio_model_handler import MODEL_PATH, mood_model_handler
+    from app.utils.mood_model_runtime import derived_path
+
+    candidates = [
+        MODEL_PATH,
+        settings.MOOD_MODEL_ONNX_PATH or derived_path(MODEL_PATH, "onnx"),
+        settings.MOOD_MODEL_TFLITE_PATH or derived_path(MODEL_PATH, "tflite"),
+    ]
+    if not any(os.path.exists(path) for path in candidates):
+        return f"model file not found at '{MODEL_PATH}'"
+    mood_model_handler.load_model()
+    if mood_model_handler.model is None:
+        raise RuntimeError("mood model failed to load")
+    return f"{mood_model_handler.backend} backend"
@@ -0,0 +1 @@
+# Benchmark suite for the analysis pipeline (see benchmarks/run.py)
@@ -0,0 +1,91 @@
+"""
+Synthetic Benchmark Corpus
+Deterministic test tracks with known ground truth: click tracks at known
+tempos and sustained triads in known keys, across several durations and
+sample rates. Files are generated once per spec and reused.
+"""
+
+import os
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import numpy as np
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+
+
+@dataclass(frozen=True)
+class CorpusTrack:
+    name: str
+    kind: str  # "clicks" or "triad"
+    duration: float
+    sample_rate: int
+    bpm: Optional[float] = None
+    key: Optional[str] = None
+    mode: Optional[str] = None
+    path: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def click_track(bpm: float, duration: float, sr: int) -> np.ndarray:
+    """Decaying 1 kHz clicks on every beat, accented on the downbeat."""
+    y = np.zeros(int(duration * sr), dtype=np.float32)
+    click_len = int(0.03 * sr)
+    t = np.arange(click_len) / sr
+    click = np.sin(2 * np.pi * 1000 * t) * np.exp(-t * 120)
+    period = 60.0 / bpm
+    for i, start in enumerate(np.arange(0, duration - 0.05, period)):
+        s = int(start * sr)
+        gain = 0.9 if i % 4 == 0 else 0.6
+        y[s : s + click_len] += gain * click[: len(y) - s]
+    return y
+
+
+def triad(key: str, mode: str, duration: float, sr: int) -> np.ndarray:
+    """Root-position triad with a few harmonics and light seeded noise."""
+    root = 48 + NOTE_NAMES.index(key)  # MIDI, octave 3
+    third = 3 if mode == "Minor" else 4
+    t = np.arange(int(duration * sr)) / sr
+    y = np.zeros_like(t)
+    for midi in (root, root + third, root + 7, root + 12):
+        freq = 440.0 * 2 ** ((midi - 69) / 12)
+        for harmonic, amp in ((1, 1.0), (2, 0.4), (3, 0.2)):
+            y += amp * np.sin(2 * np.pi * freq * harmonic * t)
+    y += np.random.default_rng(NOTE_NAMES.index(key)).normal(0, 0.01, len(t))
+    return (0.2 * y / np.max(np.abs(y))).astype(np.float32)
+
+
+def corpus_specs(quick: bool = False) -> List[CorpusTrack]:
+    durations = (10.0,) if quick else (10.0, 30.0, 60.0)
+    rates = (22050,) if quick else (22050, 44100, 48000)
+    specs = []
+    for duration in durations:
+        for sr in rates:
+            for bpm in (90.0, 120.0, 140.0):
+                specs.append(
+                    CorpusTrack(f"clicks_{int(bpm)}bpm_{int(duration)}s_{sr}", "clicks", duration, sr, bpm=bpm)
+                )
+            for key, mode in (("C", "Major"), ("A", "Minor"), ("F#", "Major")):
+                name = f"triad_{key.replace('#', 's')}{mode[:3].lower()}_{int(duration)}s_{sr}"
+                specs.append(CorpusTrack(name, "triad", duration, sr, key=key, mode=mode))
+    return specs
+
+
+def build_corpus(directory: str, quick: bool = False) -> List[CorpusTrack]:
+    """Writes any missing WAV files and returns the tracks with their paths."""
+    import soundfile as sf
+
+    os.makedirs(directory, exist_ok=True)
+    tracks = []
+    for spec in corpus_specs(quick):
+        path = os.path.join(directory, f"{spec.name}.wav")
+        if not os.path.exists(path):
+            if spec.kind == "clicks":
+                y = click_track(spec.bpm, spec.duration, spec.sample_rate)
+            else:
+                y = triad(spec.key, spec.mode, spec.duration, spec.sample_rate)
+            sf.write(path, y, spec.sample_rate, subtype="PCM_16")
+        tracks.append(CorpusTrack(**{**spec.to_dict(), "path": path}))
+    return tracks
@@ -0,0 +1,193 @@
+"""
+Benchmark Runner
+Times each benchmark over the synthetic corpus in its own process (so peak
+RSS and cold-start cost are per benchmark), then writes a JSON report keyed
+by git commit and optionally compares it with an earlier report.
+
+    python -m benchmarks.run                       # full corpus
+    python -m benchmarks.run --quick --only analyze_core mir_analyze_audio
+    python -m benchmarks.run --compare latest      # flag regressions vs last run
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS_DIR = os.path.join(HERE, "corpus_data")
+DEFAULT_RESULTS_DIR = os.path.join(HERE, "results")
+# Stores that full_analysis writes to; benchmarks point them at a scratch directory
+STORE_SETTINGS = ("SIMILARITY_DIR", "FEATURE_STORE_DIR", "WAVEFORM_DIR", "TIMELINE_DIR")
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_benchmark(name: str, tracks: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    """Runs one benchmark over the corpus. Meant to execute in a fresh process."""
+    from benchmarks.corpus import CorpusTrack
+    from benchmarks.suite import BENCHMARKS
+
+    spec = BENCHMARKS[name]
+    selected = [CorpusTrack(**t) for t in tracks]
+    selected = [t for t in selected if spec["applies"](t)]
+    if not selected:
+        return {"name": name, "tracks": 0}
+
+    cold_start = time.perf_counter()
+    try:
+        spec["fn"](selected[0])  # first call pays imports, JIT and model loads
+    except Exception as e:
+        return {"name": name, "error": f"{type(e).__name__}: {e}"}
+    cold = time.perf_counter() - cold_start
+
+    per_track, checks = [], {}
+    for track in selected:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = spec["fn"](track)
+            times.append(time.perf_counter() - start)
+        per_track.append({"track": track.name, "median_s": statistics.median(times), "min_s": min(times)})
+        for check, passed in (result or {}).items():
+            if passed is not None:
+                total, ok = checks.get(check, (0, 0))
+                checks[check] = (total + 1, ok + int(bool(passed)))
+
+    audio_seconds = sum(t.duration for t in selected)
+    wall = sum(t["median_s"] for t in per_track)
+    return {
+        "name": name,
+        "tracks": len(selected),
+        "repeat": repeat,
+        "cold_s": round(cold, 4),
+        "median_s_per_track": round(statistics.median(t["median_s"] for t in per_track), 4),
+        "total_s": round(wall, 4),
+        "audio_seconds": audio_seconds,
+        "throughput_x_realtime": round(audio_seconds / wall, 2) if wall else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "checks": {k: f"{ok}/{total}" for k, (total, ok) in checks.items()},
+        "per_track": per_track,
+    }
+
+
+def _scratch_stores(scratch: str) -> None:
+    """Worker initializer: runs before app settings are imported in the child."""
+    for setting in STORE_SETTINGS:
+        os.environ[setting] = os.path.join(scratch, setting.lower())
+
+
+def _isolated(name: str, tracks: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="benchmark-stores-") as scratch:
+        with ctx.Pool(1, initializer=_scratch_stores, initargs=(scratch,)) as pool:
+            return pool.apply(run_benchmark, (name, tracks, repeat))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Prints a comparison table; returns the names of regressed benchmarks."""
+    base = {b["name"]: b for b in baseline["benchmarks"]}
+    regressions = []
+    print(f"\nvs {baseline.get('commit') or '?'} ({baseline.get('created_at')})")
+    print(f"{'benchmark':32} {'baseline':>10} {'current':>10} {'change':>8}  rss MB")
+    for bench in current["benchmarks"]:
+        before = base.get(bench["name"])
+        if not before or "median_s_per_track" not in bench or "median_s_per_track" not in before:
+            continue
+        old, new = before["median_s_per_track"], bench["median_s_per_track"]
+        change = (new - old) / old if old else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        if flag:
+            regressions.append(bench["name"])
+        print(
+            f"{bench['name']:32} {old * 1000:9.1f}ms {new * 1000:9.1f}ms {change:+7.1%}  "
+            f"{before.get('peak_rss_mb')} -> {bench.get('peak_rss_mb')}{flag}"
+        )
+    return regressions
+
+
+def main() -> int:
+    from benchmarks.corpus import build_corpus
+    from benchmarks.suite import select
+
+    parser = argparse.ArgumentParser(description="Analysis pipeline benchmarks")
+    parser.add_argument("--only", nargs="*", help="benchmark names (default: all)")
+    parser.add_argument("--quick", action="store_true", help="small corpus (10 s @ 22.05 kHz)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--compare", help="baseline report path, or 'latest'")
+    parser.add_argument("--threshold", type=float, default=0.15, help="regression threshold")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    tracks = [t.to_dict() for t in build_corpus(args.corpus_dir, quick=args.quick)]
+    previous = sorted(glob.glob(os.path.join(args.results_dir, "*.json")))
+
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "quick": args.quick,
+        "benchmarks": [],
+    }
+    for name in select(args.only):
+        result = _isolated(name, tracks, args.repeat)
+        report["benchmarks"].append(result)
+        if "error" in result:
+            print(f"{name:32} ERROR {result['error']}")
+        elif result["tracks"]:
+            print(
+                f"{name:32} {result['median_s_per_track'] * 1000:9.1f}ms/track  "
+                f"{result['throughput_x_realtime']}x realtime  cold {result['cold_s']:.2f}s  "
+                f"peak {result['peak_rss_mb']} MB  {result['checks']}"
+            )
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    output = os.path.join(
+        args.results_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{report['commit'] or 'nogit'}.json"
+    )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        baseline_path = previous[-1] if args.compare == "latest" and previous else args.compare
+        if baseline_path == "latest":
+            print("No earlier report to compare with.")
+            return 0
+        with open(baseline_path) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Benchmark Definitions
+Each benchmark takes a corpus track, runs one pipeline step on it and
+returns a small result dict (used for ground-truth checks). Benchmarks are
+plain functions so the runner can execute them in isolated processes.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.corpus import CorpusTrack
+
+BENCHMARKS: Dict[str, Dict[str, Any]] = {}
+
+
+def benchmark(name: str, applies: Optional[Callable[[CorpusTrack], bool]] = None):
+    def decorator(fn):
+        BENCHMARKS[name] = {"fn": fn, "applies": applies or (lambda track: True)}
+        return fn
+
+    return decorator
+
+
+def run_async(coro):
+    return asyncio.run(coro)
+
+
+def bpm_matches(detected: Optional[float], expected: Optional[float]) -> Optional[bool]:
+    if detected is None or expected is None:
+        return None
+    return abs(detected - expected) / expected <= 0.03
+
+
+# === Service-level benchmarks ===
+@benchmark("analyze_core")
+def bench_analyze_core(track: CorpusTrack) -> Dict[str, Any]:
+    from app.services.audio_analyzer import AdvancedAudioAnalyzer
+
+    result = run_async(AdvancedAudioAnalyzer.analyze_core(track.path))
+    checks = {}
+    if track.bpm:
+        checks["bpm_ok"] = bpm_matches(result.get("bpm"), track.bpm)
+    if track.key:
+        checks["key_ok"] = result.get("key") == track.key
+        checks["mode_ok"] = result.get("mode") == track.mode
+    return checks
+
+
+@benchmark("analyze_loudness")
+def bench_analyze_loudness(track: CorpusTrack) -> Dict[str, Any]:
+    from app.services.audio_analyzer import AdvancedAudioAnalyzer
+
+    result = run_async(AdvancedAudioAnalyzer.analyze_loudness(track.path))
+    return {"ok": "error" not in result}
+
+
+# CREPE is slow; time it on the short tonal tracks only
+@benchmark("analyze_pitch", applies=lambda t: t.kind == "triad" and t.duration <= 10)
+def bench_analyze_pitch(track: CorpusTrack) -> Dict[str, Any]:
+    from app.services.audio_analyzer import AdvancedAudioAnalyzer
+
+    result = run_async(AdvancedAudioAnalyzer.analyze_pitch(track.path))
+    return {"ok": "error" not in result}
+
+
+@benchmark("mir_analyze_audio")
+def bench_mir_analyze(track: CorpusTrack) -> Dict[str, Any]:
+    from app.services.mir import MIRService
+
+    result = run_async(MIRService.analyze_audio(track.path))
+    checks = {}
+    if track.bpm:
+        checks["bpm_ok"] = bpm_matches(result.get("bpm"), track.bpm)
+    if track.key:
+        checks["key_ok"] = result.get("key") == track.key
+    return checks
+
+
+@benchmark("write_metadata")
+def bench_write_metadata(track: CorpusTrack) -> Dict[str, Any]:
+    from app.services.mir import MIRService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, os.path.basename(track.path))
+        shutil.copyfile(track.path, path)
+        ok = MIRService.write_metadata(
+            path, {"title": track.name, "artist": "Benchmark", "bpm": track.bpm or 0}
+        )
+    return {"ok": bool(ok)}
+
+
+# === Route round trips (in-process ASGI, no network) ===
+async def _post_file(url: str, track: CorpusTrack) -> int:
+    from httpx import ASGITransport, AsyncClient
+
+    from app.main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        with open(track.path, "rb") as f:
+            response = await client.post(
+                url, files={"file": (os.path.basename(track.path), f, "audio/wav")}
+            )
+    return response.status_code
+
+
+@benchmark("route_analysis_local_only", applies=lambda t: t.duration <= 30)
+def bench_route_local_only(track: CorpusTrack) -> Dict[str, Any]:
+    return {"ok": run_async(_post_file("/analysis/local-only", track)) == 200}
+
+
+@benchmark("route_mir_analyze", applies=lambda t: t.duration <= 30)
+def bench_route_mir_analyze(track: CorpusTrack) -> Dict[str, Any]:
+    return {"ok": run_async(_post_file("/mir/analyze", track)) == 200}
+
+
+def select(names: Optional[List[str]] = None) -> List[str]:
+    if not names:
+        return list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    return names
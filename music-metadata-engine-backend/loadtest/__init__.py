@@ -0,0 +1 @@
+# Load-test harness: mock upstream APIs and a scenario runner
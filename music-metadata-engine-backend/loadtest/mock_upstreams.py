@@ -0,0 +1,288 @@
+"""
+Mock Upstreams
+One local server standing in for every paid or rate-limited API the backend
+calls: Groq chat completions, Gemini (generate + stream), Supabase auth
+and admin, Spotify, Last.fm, Discogs and AudD. Each service has a latency and
+error profile that can be set on the command line or changed at runtime via
+PUT /_mock/profiles/{service}.
+
+    python -m loadtest.mock_upstreams --port 9100 --set groq.latency_ms=300
+
+Point the app at it with the base URLs from `app_env()`.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class UpstreamProfile:
+    latency_ms: float = 50.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+
+    def delay(self) -> float:
+        return max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+
+# Rough production latencies, so unconfigured runs are still realistic
+DEFAULT_PROFILES: Dict[str, UpstreamProfile] = {
+    "groq": UpstreamProfile(latency_ms=800, jitter_ms=200),
+    "gemini": UpstreamProfile(latency_ms=1200, jitter_ms=300),
+    "supabase": UpstreamProfile(latency_ms=40, jitter_ms=10),
+    "spotify": UpstreamProfile(latency_ms=120, jitter_ms=30),
+    "lastfm": UpstreamProfile(latency_ms=150, jitter_ms=40),
+    "discogs": UpstreamProfile(latency_ms=200, jitter_ms=50),
+    "audd": UpstreamProfile(latency_ms=600, jitter_ms=150),
+}
+
+MOCK_METADATA = {
+    "title": "Mock Title",
+    "artist": "Mock Artist",
+    "mainGenre": "Electronic",
+    "additionalGenres": ["House"],
+    "moods": ["Energetic"],
+    "instrumentation": ["Synth", "Drums"],
+    "keywords": ["load", "test"],
+    "description": "Generated by the mock upstream.",
+    "language": "English",
+}
+
+
+def app_env(base_url: str) -> Dict[str, str]:
+    """Environment variables that route every upstream call to the mock server."""
+    return {
+        "GROQ_API_KEY": "mock-groq-key",
+        "GROQ_BASE_URL": f"{base_url}/groq",
+        "GEMINI_API_KEY": "mock-gemini-key",
+        "GEMINI_API_URL": f"{base_url}/gemini",
+        "SUPABASE_URL": f"{base_url}/supabase",
+        "SUPABASE_KEY": "mock-supabase-key",
+        "SPOTIFY_CLIENT_ID": "mock",
+        "SPOTIFY_CLIENT_SECRET": "mock",
+        "SPOTIFY_ACCOUNTS_URL": f"{base_url}/spotify-accounts",
+        "SPOTIFY_API_URL": f"{base_url}/spotify",
+        "LASTFM_API_KEY": "mock",
+        "LASTFM_API_URL": f"{base_url}/lastfm",
+        "DISCOGS_CONSUMER_KEY": "mock",
+        "DISCOGS_CONSUMER_SECRET": "mock",
+        "DISCOGS_API_URL": f"{base_url}/discogs",
+        "AUDD_API_TOKEN": "mock",
+        "AUDD_API_URL": f"{base_url}/audd",
+    }
+
+
+def parse_overrides(values: List[str], profiles: Dict[str, UpstreamProfile]) -> None:
+    """Applies `service.field=value` overrides in place (service `all` = every service)."""
+    names = {f.name for f in fields(UpstreamProfile)}
+    for item in values:
+        target, _, value = item.partition("=")
+        service, _, field = target.partition(".")
+        if field not in names or (service != "all" and service not in profiles):
+            raise ValueError(f"Bad override '{item}' (expected service.field=value)")
+        cast = int if field == "error_status" else float
+        for name in profiles if service == "all" else [service]:
+            setattr(profiles[name], field, cast(value))
+
+
+def default_profiles() -> Dict[str, UpstreamProfile]:
+    return {name: UpstreamProfile(**asdict(p)) for name, p in DEFAULT_PROFILES.items()}
+
+
+def create_app(profiles: Optional[Dict[str, UpstreamProfile]] = None) -> FastAPI:
+    profiles = profiles or default_profiles()
+    calls: Counter = Counter()
+    errors: Counter = Counter()
+    app = FastAPI(title="Mock upstreams")
+
+    async def simulate(service: str) -> None:
+        profile = profiles[service]
+        calls[service] += 1
+        await asyncio.sleep(profile.delay())
+        if profile.error_rate and random.random() < profile.error_rate:
+            errors[service] += 1
+            raise HTTPException(
+                status_code=profile.error_status, detail=f"mock {service} error"
+            )
+
+    # --- Control ---
+
+    @app.get("/_mock/profiles")
+    async def get_profiles():
+        return {name: asdict(p) for name, p in profiles.items()}
+
+    @app.put("/_mock/profiles/{service}")
+    async def set_profile(service: str, request: Request):
+        if service not in profiles:
+            raise HTTPException(status_code=404, detail=f"Unknown service {service}")
+        updates = await request.json()
+        profiles[service] = UpstreamProfile(**{**asdict(profiles[service]), **updates})
+        return asdict(profiles[service])
+
+    @app.get("/_mock/stats")
+    async def stats():
+        return {"calls": dict(calls), "errors": dict(errors)}
+
+    # --- Groq (OpenAI-compatible chat completions) ---
+
+    @app.post("/groq/openai/v1/chat/completions")
+    async def groq_chat(request: Request):
+        body = await request.json()
+        await simulate("groq")
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(MOCK_METADATA)},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 500, "completion_tokens": 200, "total_tokens": 700},
+        }
+
+    # --- Gemini ---
+
+    def gemini_payload(text: str) -> Dict[str, Any]:
+        return {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }
+            ],
+            "usageMetadata": {"promptTokenCount": 300, "candidatesTokenCount": 150},
+        }
+
+    @app.post("/gemini/v1beta/models/{model_action}")
+    async def gemini(model_action: str, request: Request):
+        body = await request.json()
+        config = body.get("generationConfig") or body.get("generation_config") or {}
+        mime_type = config.get("responseMimeType") or config.get("response_mime_type")
+        if mime_type == "application/json":
+            text = json.dumps({"ideas": ["Mock idea"], **MOCK_METADATA})
+        else:
+            text = "Mock generated text."
+        if model_action.endswith(":streamGenerateContent"):
+            calls["gemini"] += 1
+            profile = profiles["gemini"]
+            words = "Mock streamed marketing copy for load testing.".split()
+            sse = request.query_params.get("alt") == "sse"
+
+            async def chunks():
+                # Latency is spread over the chunks, like tokens arriving. The REST
+                # API streams a JSON array unless ?alt=sse asks for server-sent events.
+                if not sse:
+                    yield "["
+                for i, word in enumerate(words):
+                    await asyncio.sleep(profile.delay() / len(words))
+                    payload = json.dumps(gemini_payload(f"{word} "))
+                    yield f"data: {payload}\r\n\r\n" if sse else ("," if i else "") + payload
+                if not sse:
+                    yield "]"
+
+            return StreamingResponse(
+                chunks(), media_type="text/event-stream" if sse else "application/json"
+            )
+        await simulate("gemini")
+        return gemini_payload(text)
+
+    # --- Supabase auth ---
+
+    def supabase_user(user_id: str) -> Dict[str, Any]:
+        return {
+            "id": user_id,
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": f"{user_id[:8]}@loadtest.local",
+            "app_metadata": {"provider": "email"},
+            "user_metadata": {},
+            "created_at": "2024-01-01T00:00:00Z",
+        }
+
+    @app.get("/supabase/auth/v1/user")
+    async def supabase_get_user(request: Request):
+        await simulate("supabase")
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        return supabase_user(str(uuid.uuid5(uuid.NAMESPACE_URL, token)))
+
+    @app.put("/supabase/auth/v1/admin/users/{user_id}")
+    async def supabase_update_user(user_id: str, request: Request):
+        body = await request.json()
+        await simulate("supabase")
+        return {**supabase_user(user_id), "user_metadata": body.get("user_metadata", {})}
+
+    # --- Music APIs ---
+
+    @app.post("/spotify-accounts/api/token")
+    async def spotify_token():
+        await simulate("spotify")
+        return {"access_token": "mock-spotify-token", "token_type": "Bearer", "expires_in": 3600}
+
+    @app.get("/spotify/v1/search")
+    async def spotify_search(q: str = ""):
+        await simulate("spotify")
+        track = {"id": "mocktrack", "name": q or "Mock", "artists": [{"name": "Mock Artist"}]}
+        return {"tracks": {"items": [track]}}
+
+    @app.get("/spotify/v1/audio-features/{track_id}")
+    async def spotify_features(track_id: str):
+        await simulate("spotify")
+        return {
+            "id": track_id, "tempo": 120.0, "key": 0, "mode": 1, "energy": 0.7, "danceability": 0.6
+        }
+
+    @app.get("/lastfm/2.0/")
+    async def lastfm(artist: str = ""):
+        await simulate("lastfm")
+        stats = {"listeners": "1000", "playcount": "5000"}
+        return {"artist": {"name": artist, "stats": stats, "tags": {"tag": []}}}
+
+    @app.get("/discogs/releases/{release_id}")
+    async def discogs(release_id: str):
+        await simulate("discogs")
+        return {"id": release_id, "title": "Mock Release", "year": 2020, "genres": ["Electronic"]}
+
+    @app.post("/audd/")
+    async def audd():
+        await simulate("audd")
+        return {"status": "success", "result": {"artist": "Mock Artist", "title": "Mock Title"}}
+
+    @app.exception_handler(HTTPException)
+    async def error_body(request: Request, exc: HTTPException):
+        return JSONResponse({"error": {"message": exc.detail}}, status_code=exc.status_code)
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock upstream APIs for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--set", action="append", default=[], help="service.field=value")
+    args = parser.parse_args()
+
+    profiles = default_profiles()
+    parse_overrides(args.set, profiles)
+    uvicorn.run(create_app(profiles), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
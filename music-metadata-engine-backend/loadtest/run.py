@@ -0,0 +1,331 @@
+"""
+Load-Test Runner
+Starts the mock upstreams and the app under uvicorn at each worker count,
+then drives it with closed-loop virtual users at increasing concurrency and
+reports throughput, latency percentiles, error rate and where throughput
+stops scaling (the saturation point).
+
+    python -m loadtest.run --workers 1 2 4 --users 1 4 16 64 --duration 20
+    python -m loadtest.run --suite generate --set gemini.latency_ms=2000 --p99-slo-ms 5000
+    python -m loadtest.run --target http://localhost:8000 --users 8   # an app you started yourself
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from loadtest.mock_upstreams import app_env
+from loadtest.scenarios import LOADTEST_JWT_SECRET, Scenario, VirtualUser, make_token, select
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(HERE)
+DEFAULT_RESULTS_DIR = os.path.join(HERE, "results")
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.4999)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    latencies = [s["latency"] for s in samples]
+    failures = sum(1 for s in samples if not s["ok"])
+
+    def stats(values):
+        return {
+            "p50_ms": round(percentile(values, 50) * 1000, 1) if values else None,
+            "p95_ms": round(percentile(values, 95) * 1000, 1) if values else None,
+            "p99_ms": round(percentile(values, 99) * 1000, 1) if values else None,
+        }
+
+    by_scenario = defaultdict(list)
+    for s in samples:
+        by_scenario[s["scenario"]].append(s)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(failures / len(samples), 4) if samples else 0.0,
+        **stats(latencies),
+        "scenarios": {
+            name: {
+                "requests": len(items),
+                "errors": sum(1 for s in items if not s["ok"]),
+                "statuses": dict(sorted(_count(str(s["status"]) for s in items).items())),
+                **stats([s["latency"] for s in items]),
+            }
+            for name, items in sorted(by_scenario.items())
+        },
+    }
+
+
+def _count(values) -> Dict[str, int]:
+    counts: Dict[str, int] = defaultdict(int)
+    for value in values:
+        counts[value] += 1
+    return counts
+
+
+def find_saturation(
+    levels: List[Dict[str, Any]], min_gain: float = 0.1, p99_slo_ms: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    The concurrency after which adding users no longer adds throughput
+    (less than `min_gain` relative improvement), and the first level whose
+    p99 breaks the SLO or whose error rate exceeds 1%.
+    """
+    saturation = None
+    for previous, current in zip(levels, levels[1:]):
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            saturation = {
+                "users": previous["users"],
+                "throughput_rps": previous["throughput_rps"],
+            }
+            break
+    breaking = None
+    for level in levels:
+        if level["error_rate"] > 0.01 or (
+            p99_slo_ms is not None and (level["p99_ms"] or 0) > p99_slo_ms
+        ):
+            breaking = {
+                "users": level["users"],
+                "p99_ms": level["p99_ms"],
+                "error_rate": level["error_rate"],
+            }
+            break
+    peak = max(levels, key=lambda level: level["throughput_rps"]) if levels else None
+    return {
+        "saturates_at": saturation,
+        "slo_broken_at": breaking,
+        "peak_throughput_rps": peak["throughput_rps"] if peak else None,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    scenarios: List[Scenario],
+    users: int,
+    duration: float,
+    warmup: float = 0.0,
+    think_ms: float = 0.0,
+    cache_hit_ratio: float = 0.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Runs `users` closed-loop virtual users for warmup + duration seconds."""
+    samples: List[Dict[str, Any]] = []
+    weights = [s.weight for s in scenarios]
+    start = time.perf_counter()
+    record_from = start + warmup
+    deadline = record_from + duration
+
+    async def virtual_user(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        user = VirtualUser(index, token="", rng=rng, cache_hit_ratio=cache_hit_ratio)
+        user.token = make_token(user.user_id, LOADTEST_JWT_SECRET)
+        while time.perf_counter() < deadline:
+            chosen = user.rng.choices(scenarios, weights=weights)[0]
+            began = time.perf_counter()
+            try:
+                response = await chosen.run(client, user)
+                status, ok = response.status_code, response.status_code < 400
+            except httpx.HTTPError as e:
+                status, ok = type(e).__name__, False
+            ended = time.perf_counter()
+            if began >= record_from and ended <= deadline:
+                samples.append(
+                    {"scenario": chosen.name, "status": status, "ok": ok, "latency": ended - began}
+                )
+            if think_ms:
+                await asyncio.sleep(user.rng.expovariate(1000 / think_ms))
+
+    await asyncio.gather(*(virtual_user(i) for i in range(users)))
+    return {"users": users, **summarize(samples, duration)}
+
+
+# --- Process management ---
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url: str, timeout: float, process: subprocess.Popen) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def start_mock(port: int, overrides: List[str]) -> subprocess.Popen:
+    command = [sys.executable, "-m", "loadtest.mock_upstreams", "--port", str(port)]
+    for item in overrides:
+        command += ["--set", item]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR)
+    wait_until_ready(f"http://127.0.0.1:{port}/_mock/profiles", 30, process)
+    return process
+
+
+def start_app(port: int, workers: int, mock_url: str, workdir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        **app_env(mock_url),
+        "SUPABASE_JWT_SECRET": LOADTEST_JWT_SECRET,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'history.db')}",
+        "QUOTA_DB_PATH": os.path.join(workdir, "quota.db"),
+        "QUOTA_DEFAULT_LIMIT": str(10**9),
+        "QUOTA_RATE_LIMIT": "0",
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.db"),
+        "SIMILARITY_DIR": os.path.join(workdir, "similarity"),
+        "FEATURE_STORE_DIR": os.path.join(workdir, "feature_store"),
+        "TIMELINE_DIR": os.path.join(workdir, "timelines"),
+        "WAVEFORM_DIR": os.path.join(workdir, "waveforms"),
+        # Whisper, CREPE and the mood model are not on the measured paths
+        "WARMUP_COMPONENTS": "numpy,librosa,analysis,gemini,supabase",
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    wait_until_ready(f"http://127.0.0.1:{port}/health/ready", 180, process)
+    return process
+
+
+def stop(process: Optional[subprocess.Popen]) -> None:
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def drive(base_url: str, scenarios: List[Scenario], args) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(args.users) * 2)
+    levels = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for users in args.users:
+            level = await run_level(
+                client, scenarios, users, args.duration,
+                warmup=args.warmup, think_ms=args.think_ms,
+                cache_hit_ratio=args.cache_hit_ratio, seed=args.seed,
+            )
+            levels.append(level)
+            print(
+                f"  {users:4d} users  {level['throughput_rps']:8.2f} rps  "
+                f"p50 {level['p50_ms']} ms  p99 {level['p99_ms']} ms  "
+                f"errors {level['error_rate']:.1%}"
+            )
+    return levels
+
+
+def mock_stats(mock_url: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not mock_url:
+        return None
+    try:
+        return httpx.get(f"{mock_url}/_mock/stats", timeout=5).json()
+    except httpx.HTTPError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the API against mock upstreams")
+    parser.add_argument("--suite", default="mixed", help="mixed | generate | analysis | proxies")
+    parser.add_argument("--scenarios", nargs="*", help="explicit scenario names")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--users", nargs="+", type=int, default=[1, 4, 16, 32])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unrecorded seconds per level")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean think time per user")
+    parser.add_argument("--cache-hit-ratio", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--p99-slo-ms", type=float)
+    parser.add_argument("--set", action="append", default=[], help="service.field=value")
+    parser.add_argument("--target", help="drive an already running app instead of starting one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    args = parser.parse_args()
+
+    scenarios = select(args.suite, args.scenarios)
+    print(f"Scenarios: {', '.join(f'{s.name}x{s.weight}' for s in scenarios)}")
+    report: Dict[str, Any] = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "suite": args.suite,
+        "scenarios": [s.name for s in scenarios],
+        "duration_s": args.duration,
+        "mock_overrides": args.set,
+        "cpus": os.cpu_count(),
+        "runs": [],
+    }
+
+    if args.target:
+        print(f"\n{args.target}")
+        levels = asyncio.run(drive(args.target, scenarios, args))
+        saturation = find_saturation(levels, p99_slo_ms=args.p99_slo_ms)
+        report["runs"].append({"target": args.target, "levels": levels, **saturation})
+    else:
+        mock_port = free_port()
+        mock_url = f"http://127.0.0.1:{mock_port}"
+        mock = start_mock(mock_port, args.set)
+        try:
+            for workers in args.workers:
+                with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+                    port = free_port()
+                    print(f"\n{workers} worker(s)")
+                    app = start_app(port, workers, mock_url, workdir)
+                    try:
+                        levels = asyncio.run(drive(f"http://127.0.0.1:{port}", scenarios, args))
+                    finally:
+                        stop(app)
+                saturation = find_saturation(levels, p99_slo_ms=args.p99_slo_ms)
+                report["runs"].append({"workers": workers, "levels": levels, **saturation})
+            report["upstream_calls"] = mock_stats(mock_url)
+        finally:
+            stop(mock)
+
+    print("\nSaturation")
+    for run in report["runs"]:
+        label = f"{run['workers']} worker(s)" if "workers" in run else run["target"]
+        line = f"  {label}: peak {run['peak_throughput_rps']} rps; "
+        if run["saturates_at"]:
+            line += f"throughput flattens after {run['saturates_at']['users']} users"
+        else:
+            line += "still scaling at the highest level"
+        if run["slo_broken_at"]:
+            line += f"; SLO/errors broken at {run['slo_broken_at']['users']} users"
+        print(line)
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    output = os.path.join(args.results_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{args.suite}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
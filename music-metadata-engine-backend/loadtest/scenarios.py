@@ -0,0 +1,180 @@
+"""
+Load-Test Scenarios
+Locust-style weighted tasks run by closed-loop virtual users. Each virtual
+user has its own Supabase-style JWT (signed with the test secret, so the app
+verifies it locally), and prompts carry a per-request nonce so the LLM cache
+only hits as often as `cache_hit_ratio` asks for.
+"""
+
+import io
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+LOADTEST_JWT_SECRET = "loadtest-jwt-secret-not-for-production"
+
+SUITES = ("mixed", "generate", "analysis", "proxies")
+
+
+@dataclass
+class VirtualUser:
+    index: int
+    token: str
+    rng: random.Random
+    cache_hit_ratio: float = 0.0
+    user_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def metadata(self) -> Dict[str, object]:
+        """Track metadata for prompts; a nonce defeats the LLM cache unless a hit is wanted."""
+        metadata = {"title": "Load Test", "artist": "Virtual User", "bpm": 120}
+        if self.rng.random() >= self.cache_hit_ratio:
+            metadata["comment"] = uuid.uuid4().hex
+        return metadata
+
+
+def make_token(user_id: str, secret: str = LOADTEST_JWT_SECRET) -> str:
+    from app.services.token_verifier import get_jwt
+
+    now = int(time.time())
+    claims = {
+        "sub": user_id,
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": f"{user_id[:8]}@loadtest.local",
+        "iat": now,
+        "exp": now + 24 * 3600,
+    }
+    return get_jwt().encode(claims, secret, algorithm="HS256")
+
+
+@dataclass
+class Scenario:
+    name: str
+    weight: int
+    suites: tuple
+    run: Callable[[httpx.AsyncClient, VirtualUser], Awaitable[httpx.Response]]
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str, weight: int, suites: tuple):
+    def decorator(fn):
+        SCENARIOS[name] = Scenario(name, weight, ("mixed",) + suites, fn)
+        return fn
+
+    return decorator
+
+
+_audio: Optional[bytes] = None
+
+
+def sample_wav() -> bytes:
+    """A 5 s click track, generated once per process."""
+    global _audio
+    if _audio is None:
+        import soundfile as sf
+
+        from benchmarks.corpus import click_track
+
+        buffer = io.BytesIO()
+        sf.write(buffer, click_track(120, 5.0, 22050), 22050, format="WAV", subtype="PCM_16")
+        _audio = buffer.getvalue()
+    return _audio
+
+
+# --- /generate/* (Gemini) ---
+
+
+@scenario("generate_marketing", weight=3, suites=("generate",))
+async def generate_marketing(client, user):
+    body = {"metadata": user.metadata(), "content_type": "social", "tone": "upbeat"}
+    return await client.post("/generate/marketing_content", json=body, headers=user.headers)
+
+
+@scenario("generate_marketing_stream", weight=2, suites=("generate",))
+async def generate_marketing_stream(client, user):
+    body = {"metadata": user.metadata(), "content_type": "press", "tone": "warm"}
+    async with client.stream(
+        "POST", "/generate/marketing_content/stream", json=body, headers=user.headers
+    ) as response:
+        await response.aread()  # time to last byte
+    return response
+
+
+@scenario("refine_field", weight=2, suites=("generate",))
+async def refine_field(client, user):
+    body = {
+        "current_metadata": user.metadata(),
+        "field_to_refine": "description",
+        "refinement_instruction": "Make it shorter.",
+    }
+    return await client.post("/generate/refine_field", json=body, headers=user.headers)
+
+
+@scenario("lyrical_ideas", weight=1, suites=("generate",))
+async def lyrical_ideas(client, user):
+    body = {"metadata": user.metadata()}
+    return await client.post("/generate/lyrical_ideas", json=body, headers=user.headers)
+
+
+# --- /analysis/generate (local analysis + Groq) ---
+
+
+@scenario("analysis_generate", weight=2, suites=("analysis",))
+async def analysis_generate(client, user):
+    force = user.rng.random() >= user.cache_hit_ratio
+    return await client.post(
+        "/analysis/generate",
+        files={"file": (f"vu{user.index}.wav", sample_wav(), "audio/wav")},
+        data={"force_regenerate": json.dumps(force)},
+        headers=user.headers,
+    )
+
+
+# --- Third-party proxies ---
+
+
+@scenario("spotify_search", weight=2, suites=("proxies",))
+async def spotify_search(client, user):
+    return await client.post("/spotify/search", json={"query": "load test"})
+
+
+@scenario("lastfm_artist", weight=1, suites=("proxies",))
+async def lastfm_artist(client, user):
+    return await client.get("/proxy/lastfm/artist", params={"artist": "Virtual User"})
+
+
+@scenario("discogs_release", weight=1, suites=("proxies",))
+async def discogs_release(client, user):
+    return await client.get("/proxy/discogs/release", params={"release_id": "1"})
+
+
+@scenario("audd_recognize", weight=1, suites=("proxies",))
+async def audd_recognize(client, user):
+    return await client.post("/proxy/audd", json={"url": "https://example.com/a.mp3"})
+
+
+@scenario("quota_status", weight=1, suites=())
+async def quota_status(client, user):
+    return await client.get("/quota/status", headers=user.headers)
+
+
+def select(suite: str = "mixed", names: Optional[List[str]] = None) -> List[Scenario]:
+    if names:
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        return [SCENARIOS[name] for name in names]
+    if suite not in SUITES:
+        raise SystemExit(f"Unknown suite {suite} (choose from {', '.join(SUITES)})")
+    return [s for s in SCENARIOS.values() if suite in s.suites]
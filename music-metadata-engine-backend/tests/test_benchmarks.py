@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from benchmarks import suite
+from benchmarks.corpus import build_corpus, corpus_specs
+from benchmarks.run import STORE_SETTINGS, compare, run_benchmark
+
+
+def test_quick_corpus_is_deterministic(tmp_path):
+    tracks = build_corpus(str(tmp_path), quick=True)
+    assert [t.name for t in tracks] == [t.name for t in corpus_specs(quick=True)]
+    assert {t.bpm for t in tracks if t.kind == "clicks"} == {90, 120, 140}
+
+    sf = pytest.importorskip("soundfile")
+    first = sf.read(tracks[0].path)[0]
+    again = build_corpus(str(tmp_path / "again"), quick=True)
+    assert np.array_equal(first, sf.read(again[0].path)[0])
+
+
+def test_runner_times_and_aggregates_checks(tmp_path, monkeypatch):
+    tracks = [t.to_dict() for t in build_corpus(str(tmp_path), quick=True)]
+    # In-process run: keep any store writes in tmp_path, restored after the test
+    for setting in STORE_SETTINGS:
+        monkeypatch.setenv(setting, str(tmp_path / setting.lower()))
+    monkeypatch.setitem(
+        suite.BENCHMARKS,
+        "trivial",
+        {"fn": lambda track: {"ok": track.kind == "clicks"}, "applies": lambda track: True},
+    )
+    result = run_benchmark("trivial", tracks, repeat=2)
+    assert result["tracks"] == len(tracks)
+    assert result["checks"] == {"ok": f"3/{len(tracks)}"}
+    assert result["median_s_per_track"] >= 0
+
+    baseline = {"benchmarks": [{**result, "median_s_per_track": 1.0}]}
+    current = {"benchmarks": [{**result, "median_s_per_track": 1.5}]}
+    assert compare(current, baseline, threshold=0.2) == ["trivial"]
+    assert compare(baseline, current, threshold=0.2) == []
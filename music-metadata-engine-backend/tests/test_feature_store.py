@@ -0,0 +1,120 @@
+import pytest
+
+from app.routes import features as feature_routes
+from app.services.feature_store import KEYS, FeatureStore, feature_row
+
+
+def analysis(bpm, key, mode, lufs, true_peak=-2.0):
+    return {
+        "core": {
+            "bpm": bpm,
+            "key": key,
+            "mode": mode,
+            "duration_seconds": 180.0,
+            "spectral": {"centroid": 2000.0},
+            "rhythm": {"danceability": 0.5, "beat_count": 300},
+        },
+        "loudness": {
+            "lufs": lufs,
+            "true_peak_db": true_peak,
+            "normalization": {"gain_needed_db": -14 - lufs},
+        },
+        "pitch": {"error": "crepe not installed"},
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = FeatureStore(str(tmp_path / "features"))
+    monkeypatch.setattr(feature_routes, "feature_store", store)
+    yield store
+    store.close()
+
+
+def test_append_upsert_and_reopen(store):
+    store.append_rows(
+        [feature_row(f"t{i}", analysis(100 + i, KEYS[i % 12], "Major", -14.0)) for i in range(1500)]
+    )
+    assert store.stats()["rows"] == 1500  # grown past the initial capacity
+
+    store.append("t3", analysis(150.0, "A", "Minor", -9.0))
+    reopened = FeatureStore(store.directory)
+    result = reopened.query([{"column": "track_key", "op": "eq", "value": "t3"}])
+    assert result["total"] == 1 and reopened.stats()["rows"] == 1500
+    row = result["rows"][0]
+    assert (row["bpm"], row["key"], row["mode"], row["lufs"]) == (150.0, "A", "Minor", -9.0)
+    assert row["vocal_presence"] is None  # failed stage -> missing
+
+
+def test_filters_and_aggregates(store):
+    store.append_rows(
+        [
+            feature_row("a", analysis(120.0, "A", "Minor", -14.2)),
+            feature_row("b", analysis(124.0, "A", "Minor", -8.0, true_peak=0.1)),
+            feature_row("c", analysis(90.0, "C", "Major", -20.0)),
+            feature_row("d", {"core": {"error": "decode failed"}}),
+        ]
+    )
+    filters = [
+        {"column": "bpm", "op": "between", "value": [100, 130]},
+        {"column": "key", "op": "eq", "value": "A"},
+    ]
+    result = store.query(
+        filters,
+        columns=["track_key", "bpm"],
+        order_by="bpm",
+        descending=True,
+    )
+    assert [r["track_key"] for r in result["rows"]] == ["b", "a"]
+
+    grouped = store.aggregate(
+        [{"column": "key", "op": "notnull"}],
+        group_by=["key", "mode"],
+        metrics=["count", "mean:bpm"],
+    )["groups"]
+    assert grouped == [
+        {"key": "C", "mode": "Major", "count": 1, "mean:bpm": 90.0},
+        {"key": "A", "mode": "Minor", "count": 2, "mean:bpm": 122.0},
+    ]
+    binned = store.aggregate(group_by=["bpm:50"], metrics=["count", "max:lufs"])["groups"]
+    assert binned == [
+        {"bpm:50": 50.0, "count": 1, "max:lufs": -20.0},
+        {"bpm:50": 100.0, "count": 2, "max:lufs": -8.0},
+        {"bpm:50": None, "count": 1, "max:lufs": None},
+    ]
+    with pytest.raises(ValueError):
+        store.query([{"column": "key", "op": "eq", "value": "H"}])
+
+
+@pytest.mark.asyncio
+async def test_feature_routes(client, store):
+    store.append_rows(
+        [
+            feature_row("a", analysis(120.0, "A", "Minor", -14.2)),
+            feature_row("b", analysis(124.0, "A", "Minor", -8.0, true_peak=0.1)),
+            feature_row("c", analysis(90.0, "C", "Major", -20.0)),
+        ]
+    )
+    report = (await client.get("/features/report")).json()
+    assert report["tracks"] == 3
+    assert report["keys"][0] == {"key": "A", "mode": "Minor", "count": 2}
+    assert report["loudness"]["compliant_share"] == pytest.approx(1 / 3, abs=1e-3)
+    assert report["loudness"]["true_peak_over_share"] == pytest.approx(1 / 3, abs=1e-3)
+    assert sum(report["bpm"]["histogram"]["counts"]) == 3
+
+    body = {"column": "lufs", "bins": 2, "range": [-20, -8]}
+    assert (await client.post("/features/histogram", json=body)).json()["counts"] == [2, 1]
+    response = await client.post("/features/aggregate", json={"metrics": ["median:bpm"]})
+    assert response.status_code == 400
+
+    for filters in (
+        [{"column": "bpm", "op": "between", "value": 5}],
+        [{"column": "bpm", "op": "gt", "value": "abc"}],
+        [{"column": "key", "op": "in", "value": "A"}],
+    ):
+        response = await client.post("/features/query", json={"filters": filters})
+        assert response.status_code == 400
+    for page in ({"limit": -1}, {"limit": 10001}, {"offset": -5}):
+        assert (await client.post("/features/query", json=page)).status_code == 422
+    response = await client.post("/features/query", json={"limit": 1, "offset": 1})
+    assert response.json()["total"] == 3 and len(response.json()["rows"]) == 1
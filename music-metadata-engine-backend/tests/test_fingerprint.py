@@ -0,0 +1,131 @@
+import io
+import json
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.routes import fingerprint as fingerprint_routes
+from app.services.fingerprint import FingerprintIndex
+
+SR = 22050
+
+
+def song(seed, seconds=12):
+    """Random three-note chords with a noise floor, a stand-in for a real track."""
+    rng = np.random.default_rng(seed)
+    parts, total = [], 0
+    while total < seconds * SR:
+        n = int(rng.uniform(0.15, 0.6) * SR)
+        t = np.arange(n) / SR
+        notes = 440 * 2 ** (rng.integers(-24, 24, size=3) / 12)
+        chord = sum(np.sin(2 * np.pi * f * t) * rng.uniform(0.3, 1) for f in notes)
+        parts.append(chord * np.hanning(n))
+        total += n
+    y = np.concatenate(parts)[: seconds * SR] + 0.05 * rng.standard_normal(seconds * SR)
+    return (y / np.abs(y).max() * 0.8).astype(np.float32)
+
+
+def wav(y):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, SR, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    idx = FingerprintIndex(str(tmp_path / "fp.db"))
+    monkeypatch.setattr(fingerprint_routes, "fingerprint_index", idx)
+    yield idx
+    idx.close()
+
+
+def test_excerpt_matches_and_unknown_does_not(index):
+    songs = [song(seed) for seed in range(4)]
+    index.add_many([(wav(y), f"song{i}", {"title": f"Song {i}"}) for i, y in enumerate(songs)])
+
+    # A quieter, noisier 5 s excerpt that does not start on a frame boundary
+    rng = np.random.default_rng(7)
+    excerpt = songs[2][int(3.3 * SR) : int(8.3 * SR)] * 0.5
+    excerpt = excerpt + 0.02 * rng.standard_normal(len(excerpt)).astype(np.float32)
+    result = index.match(wav(excerpt))
+    assert result["known"]
+    best = result["matches"][0]
+    assert best["name"] == "song2" and best["metadata"] == {"title": "Song 2"}
+    assert abs(best["offset_seconds"] - 3.3) < 0.1
+
+    assert not index.match(wav(song(99)))["known"]
+
+
+def test_lookups_do_not_pin_a_stale_snapshot(index):
+    """Two instances on one file stand in for two workers."""
+    first, second = wav(song(1, seconds=4)), wav(song(2, seconds=4))
+    index.add(first, "first")
+    assert index.match(first)["known"]
+
+    other = FingerprintIndex(index.path)
+    added = other.add(second, "second")
+    other.close()
+
+    assert index.match(second)["known"]
+    assert index.track(added["track_id"])["name"] == "second"
+    assert index.stats()["tracks"] == 2
+    assert "track_id" in index.add(wav(song(3, seconds=4)), "third")
+
+
+@pytest.mark.asyncio
+async def test_ingest_reports_duplicates(client, index):
+    original = song(1)
+    near_copy = np.concatenate([np.zeros(SR // 2, dtype=np.float32), original * 0.7])
+    files = [
+        ("files", ("a.wav", wav(original), "audio/wav")),
+        ("files", ("b.wav", wav(song(2)), "audio/wav")),
+        ("files", ("c.wav", wav(near_copy), "audio/wav")),
+        ("files", ("a-again.wav", wav(original), "audio/wav")),
+    ]
+    metadata = json.dumps([None, None, {"x": 1}, None])
+    response = await client.post("/fingerprint/ingest", files=files, data={"metadata": metadata})
+    assert response.status_code == 200
+    a, b, c, again = response.json()["results"]
+    assert [d["track_id"] for d in c["duplicates"]] == [a["track_id"]]
+    assert b["duplicates"] == []
+    assert again["exact_duplicate"] and again["track_id"] == a["track_id"]
+
+    body = (await client.get("/fingerprint/duplicates")).json()
+    assert [[t["name"] for t in g["tracks"]] for g in body["groups"]] == [["a.wav", "c.wav"]]
+    assert body["total"] == 1
+    assert (await client.get("/fingerprint/duplicates?offset=1")).json()["groups"] == []
+
+    # Groups come from the pairs stored at ingest; a rebuild recomputes the same pairs
+    assert (await client.post("/fingerprint/duplicates/rebuild")).json()["pairs"] == 1
+    assert (await client.get("/fingerprint/duplicates")).json()["total"] == 1
+
+    response = await client.get(f"/fingerprint/tracks/{a['track_id']}/duplicates")
+    assert [d["name"] for d in response.json()["duplicates"]] == ["c.wav"]
+
+    assert (await client.delete(f"/fingerprint/tracks/{c['track_id']}")).status_code == 200
+    assert (await client.get("/fingerprint/duplicates")).json()["groups"] == []
+    assert (await client.get("/fingerprint/stats")).json()["tracks"] == 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_rejects_mismatched_metadata(client, index):
+    files = [("files", ("a.wav", wav(song(1, seconds=2)), "audio/wav"))]
+    response = await client.post("/fingerprint/ingest", files=files, data={"metadata": "[1, 2]"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_identify_answers_exact_duplicates_locally(client, index, monkeypatch):
+    monkeypatch.setattr(fingerprint_routes.settings, "AUDD_API_TOKEN", "")
+    content = wav(song(5, seconds=4))
+    index.add(content, "known.wav", {"title": "Known"})
+    # Scoring is disabled, so only the content hash can identify the upload
+    monkeypatch.setattr(index, "match_hashes", lambda *args, **kwargs: [])
+
+    response = await client.post(
+        "/fingerprint/identify", files={"file": ("upload.wav", content, "audio/wav")}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["source"] == "local" and body["result"] == {"title": "Known"}
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.config import settings
+from app.services import gemini_gateway as gateway_module
+from app.services.gemini_gateway import (
+    ConcurrencyLimitExceeded,
+    GeminiGateway,
+    compact_context,
+)
+from app.services.llm_cache import LLMResponseCache
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return FakeResponse('{"visual_prompt": "neon skyline"}')
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), ttl_seconds=3600, max_entries=10)
+    monkeypatch.setattr(gateway_module, "llm_cache", cache)
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+    gw = GeminiGateway(max_concurrent_per_user=1)
+    model = FakeModel()
+    gw._models[("gemini-2.0-flash", True)] = model
+    return gw, model
+
+
+@pytest.mark.asyncio
+async def test_identical_prompts_share_one_call(gateway):
+    gw, model = gateway
+    results = await asyncio.gather(*[gw.generate("same prompt") for _ in range(5)])
+    assert all(r == {"visual_prompt": "neon skyline"} for r in results)
+    assert model.calls == 1
+
+    await gw.generate("same prompt")
+    assert model.calls == 1  # served from cache
+    await gw.generate("same prompt", use_cache=False)
+    assert model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_user_concurrency_limit(gateway):
+    gw, _ = gateway
+    async with gw.user_slot("user-1"):
+        with pytest.raises(ConcurrencyLimitExceeded):
+            gw.acquire("user-1")
+        gw.acquire("user-2")
+        gw.release("user-2")
+    gw.acquire("user-1")
+
+
+def test_compact_context_is_stable():
+    a = compact_context({"title": "X", "mfcc": [1, 2], "moods": [], "bpm": 120})
+    b = compact_context({"bpm": 120, "title": "X"})
+    assert a == b == '{"bpm":120,"title":"X"}'
@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import db as db_module
+from app.db import AnalysisHistory, AnalysisResult, Base, upgrade_schema
+from app.main import app
+from app.routes.auth import get_current_user
+from app.routes.history import get_db
+from app.services.history_writer import history_writer
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_db():
+        async with factory() as db:
+            yield db
+
+    monkeypatch.setattr(history_writer, "session_factory", factory)
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="user-1")
+    yield factory
+    await history_writer.stop()
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+async def seed(factory, count, user_id="user-1"):
+    base = datetime(2024, 1, 1)
+    async with factory() as db:
+        for i in range(count):
+            db.add(
+                AnalysisHistory(
+                    user_id=user_id,
+                    file_name=f"track_{i}.mp3",
+                    result={"title": f"Track {i}", "bpm": 100 + i, "mfcc": [0.0] * 13},
+                    summary={"title": f"Track {i}", "bpm": 100 + i},
+                    timestamp=base + timedelta(minutes=i // 2),  # duplicate timestamps
+                )
+            )
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_history_keyset_pagination(client, session_factory):
+    await seed(session_factory, 7)
+    await seed(session_factory, 3, user_id="someone-else")
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/history/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        for item in page["items"]:
+            assert "result" not in item
+            seen.append(item["file_name"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 7 and len(set(seen)) == 7
+    assert seen[0] == "track_6.mp3"
+
+
+@pytest.mark.asyncio
+async def test_history_item_loads_full_result(client, session_factory):
+    await seed(session_factory, 1)
+    listing = (await client.get("/history/")).json()
+    item_id = listing["items"][0]["id"]
+
+    response = await client.get(f"/history/{item_id}")
+    assert response.status_code == 200
+    assert response.json()["result"]["mfcc"] == [0.0] * 13
+
+    assert (await client.get("/history/999")).status_code == 404
+    assert (await client.get("/history/", params={"cursor": "bogus"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_history_inserts_are_batched(client, session_factory):
+    payloads = [
+        {"file_name": f"song_{i}.mp3", "result": {"title": f"Song {i}", "bpm": 90}}
+        for i in range(10)
+    ]
+    responses = await asyncio.gather(
+        *[client.post("/history/", json=p) for p in payloads]
+    )
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.json()["id"] for r in responses}) == 10
+
+    queued = await client.post("/history/?wait=false", json=payloads[0])
+    assert queued.status_code == 202
+    await history_writer.stop()
+
+    listing = (await client.get("/history/", params={"limit": 100})).json()
+    assert len(listing["items"]) == 11
+    assert listing["items"][0]["summary"] == {"title": "Song 0", "bpm": 90}
+
+
+def test_upgrade_schema_backfills_summary():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE analysis_history (id INTEGER PRIMARY KEY, user_id VARCHAR, "
+                "file_name VARCHAR, result JSON, timestamp DATETIME)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO analysis_history (user_id, file_name, result, timestamp) "
+                "VALUES ('u', 'a.mp3', '{\"title\": \"A\", \"bpm\": 90}', '2024-01-01 00:00:00')"
+            )
+        )
+
+    upgrade_schema(bind=engine)
+
+    db = sessionmaker(bind=engine)()
+    row = db.query(AnalysisHistory).one()
+    assert row.summary == {"title": "A", "bpm": 90}
+    # Inline result moved to the content-addressed store
+    assert row.result is None
+    assert db.get(AnalysisResult, row.result_hash).load() == {"title": "A", "bpm": 90}
+    db.close()
+
+
+def test_inline_result_migration_runs_once(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(bind=engine)
+
+    def rescan(*args, **kwargs):
+        raise AssertionError("inline results migrated again")
+
+    monkeypatch.setattr(db_module, "migrate_inline_results", rescan)
+    upgrade_schema(bind=engine)  # a restart only checks schema_migrations
+
+
+@pytest.mark.asyncio
+async def test_identical_results_are_stored_once(client, session_factory):
+    result = {"title": "Same", "bpm": 120, "mfcc": [1.5] * 13}
+    first = await client.post("/history/", json={"file_name": "a.mp3", "result": result})
+    second = await client.post("/history/", json={"file_name": "b.mp3", "result": result})
+    assert first.status_code == second.status_code == 200
+
+    async with session_factory() as db:
+        blobs = (await db.execute(select(func.count()).select_from(AnalysisResult))).scalar()
+        assert blobs == 1
+
+    item = (await client.get(f"/history/{second.json()['id']}")).json()
+    assert item["result"] == result
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from app.services.key_detection import KEYS, PROFILES, estimate_key, key_scores
+
+SR = 22050
+
+
+def chords(progression, seconds=1.0):
+    librosa = pytest.importorskip("librosa")
+    t = np.arange(int(SR * seconds)) / SR
+    return np.concatenate(
+        [
+            sum(np.sin(2 * np.pi * librosa.midi_to_hz(m) * t) for m in chord) / len(chord)
+            for chord in progression
+        ]
+    ).astype(np.float32)
+
+
+def test_profiles_match_their_own_key():
+    major, minor = (np.array(p) for p in PROFILES["temperley"])
+    scores = key_scores(np.stack([np.roll(major, 7), np.roll(minor, 9)], axis=1), "temperley")
+    assert scores.shape == (24, 2)
+    assert scores[:, 0].argmax() == 7 and scores[7, 0] == pytest.approx(1.0)  # G major
+    assert scores[:, 1].argmax() == 12 + 9  # A minor
+    with pytest.raises(ValueError):
+        key_scores(major, "shaath")
+
+
+def test_minor_key_and_key_change_from_chroma():
+    librosa = pytest.importorskip("librosa")
+    a_minor = [[57, 60, 64], [50, 57, 62, 65], [52, 56, 59, 64], [57, 60, 64]] * 3
+    e_major = [[52, 56, 59, 64], [57, 61, 64], [59, 63, 66], [52, 56, 59, 64]] * 3
+    chroma = librosa.feature.chroma_stft(y=chords(a_minor + e_major), sr=SR)
+    half = chroma.shape[1] // 2
+
+    first = estimate_key(chroma[:, :half], profile="krumhansl")
+    assert first["full_key"] == "A Minor" and 0 < first["confidence"] < 1
+    assert first["runner_up"]["correlation"] < first["correlation"]
+    assert estimate_key(chroma[:, half:])["full_key"] == "E Major"
+
+    changes = estimate_key(chroma, frame_seconds=512 / SR, window_seconds=4)["changes"]
+    assert [c["full_key"] for c in changes] == ["A Minor", "E Major"]
+    assert changes[1]["start"] == pytest.approx(12.0, abs=0.1)
+    assert KEYS.index(changes[1]["key"]) == 4
@@ -0,0 +1,56 @@
+import pytest
+from app.config import settings
+from app.services import groq_whisper
+from app.services.groq_whisper import GroqWhisperService
+from app.services.llm_cache import LLMResponseCache, make_cache_key
+
+ANALYSIS = {
+    "core": {"bpm": 120.0, "key": "A", "mode": "Minor", "full_key": "A Minor"},
+    "loudness": {"lufs": -9.5},
+}
+
+
+def test_cache_key_ignores_whitespace_and_order():
+    a = make_cache_key("model-a", prompt="BPM: 120\n  Key: A", temperature=0.3)
+    b = make_cache_key("model-a", temperature=0.3, prompt="BPM: 120 Key: A")
+    assert a == b
+    assert a != make_cache_key("model-b", prompt="BPM: 120 Key: A", temperature=0.3)
+
+
+def test_cache_ttl_and_size_eviction(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), ttl_seconds=3600, max_entries=2)
+    cache.set("k1", "m", {"v": 1})
+    cache.set("k2", "m", {"v": 2})
+    assert cache.get("k1") == {"v": 1}  # k1 is now most recently used
+    cache.set("k3", "m", {"v": 3})
+    assert len(cache) == 2
+    assert cache.get("k2") is None
+    assert cache.get("k3") == {"v": 3}
+
+    cache._connect().execute("UPDATE llm_cache SET created_at = 0 WHERE key = 'k3'")
+    assert cache.get("k3") is None
+
+
+@pytest.mark.asyncio
+async def test_generate_metadata_uses_cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), ttl_seconds=3600, max_entries=10)
+    monkeypatch.setattr(groq_whisper, "llm_cache", cache)
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+
+    calls = []
+
+    def fake_call(prompt):
+        calls.append(prompt)
+        return {"title": "Cached", "moods": ["Dark"]}
+
+    monkeypatch.setattr(GroqWhisperService, "_call_groq", staticmethod(fake_call))
+
+    first = await GroqWhisperService.generate_metadata(ANALYSIS, existing_metadata={})
+    second = await GroqWhisperService.generate_metadata(ANALYSIS, existing_metadata={})
+    assert first == second
+    assert first["bpm"] == 120.0
+    assert len(calls) == 1
+
+    await GroqWhisperService.generate_metadata(ANALYSIS, use_cache=False)
+    assert len(calls) == 2
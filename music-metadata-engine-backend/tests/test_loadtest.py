@@ -0,0 +1,83 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from loadtest.mock_upstreams import UpstreamProfile, create_app, parse_overrides
+from loadtest.run import find_saturation, percentile, run_level
+from loadtest.scenarios import Scenario, select
+
+
+def instant_profiles(**overrides):
+    profiles = {
+        name: UpstreamProfile(latency_ms=0)
+        for name in ("groq", "gemini", "supabase", "spotify", "lastfm", "discogs", "audd")
+    }
+    profiles.update(overrides)
+    return profiles
+
+
+@pytest.mark.asyncio
+async def test_mock_upstreams_serve_api_shapes_and_errors():
+    app = create_app(instant_profiles(audd=UpstreamProfile(latency_ms=0, error_rate=1.0)))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mock") as client:
+        chat = await client.post("/groq/openai/v1/chat/completions", json={"model": "m"})
+        assert chat.json()["choices"][0]["message"]["content"].startswith("{")
+
+        stream = await client.post(
+            "/gemini/v1beta/models/gemini-2.0-flash:streamGenerateContent", json={}
+        )
+        assert len(stream.json()) > 1  # JSON array of candidates
+
+        assert (await client.post("/audd/")).status_code == 503
+        await client.put("/_mock/profiles/audd", json={"error_rate": 0})
+        assert (await client.post("/audd/")).status_code == 200
+        assert (await client.get("/_mock/stats")).json() == {
+            "calls": {"groq": 1, "gemini": 1, "audd": 2},
+            "errors": {"audd": 1},
+        }
+
+
+def test_profile_overrides():
+    profiles = instant_profiles()
+    parse_overrides(["all.jitter_ms=5", "groq.error_status=429"], profiles)
+    assert profiles["gemini"].jitter_ms == 5
+    assert profiles["groq"].error_status == 429
+    with pytest.raises(ValueError):
+        parse_overrides(["groq.speed=1"], profiles)
+
+
+def test_percentiles_and_saturation():
+    assert percentile(list(range(1, 101)), 50) == 50
+    assert percentile(list(range(1, 101)), 99) == 99
+    levels = [
+        {"users": 1, "throughput_rps": 10.0, "error_rate": 0.0, "p99_ms": 100.0},
+        {"users": 4, "throughput_rps": 35.0, "error_rate": 0.0, "p99_ms": 150.0},
+        {"users": 16, "throughput_rps": 36.0, "error_rate": 0.0, "p99_ms": 900.0},
+        {"users": 64, "throughput_rps": 30.0, "error_rate": 0.05, "p99_ms": 4000.0},
+    ]
+    result = find_saturation(levels, p99_slo_ms=500)
+    assert result["saturates_at"] == {"users": 4, "throughput_rps": 35.0}
+    assert result["slo_broken_at"]["users"] == 16
+    assert result["peak_throughput_rps"] == 36.0
+    assert {s.name for s in select("proxies")} == {
+        "spotify_search", "lastfm_artist", "discogs_release", "audd_recognize"
+    }
+
+
+@pytest.mark.asyncio
+async def test_run_level_drives_closed_loop_users():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    async def hit(client, user):
+        return await client.get("/ping", headers=user.headers)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+        level = await run_level(client, [Scenario("ping", 1, ("mixed",), hit)], users=3, duration=0.3)
+    assert level["users"] == 3
+    assert level["requests"] > 3
+    assert level["error_rate"] == 0.0
+    assert level["scenarios"]["ping"]["statuses"] == {"200": level["requests"]}
@@ -0,0 +1,49 @@
+import httpx
+import pytest
+
+from app.metrics import UPSTREAM_REQUEST_SECONDS, MetricsRegistry
+from app.utils.upstream import TimedTransport
+
+
+def test_histogram_and_gauge_rendering():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage time.", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="decode")
+    histogram.observe(0.5, stage="decode")
+    histogram.observe(5.0, stage="decode")
+    gauge = registry.gauge("queue_depth", "Depth.", ["queue"])
+    gauge.set_function(lambda: 3, queue="writes")
+    gauge.set_function(lambda: 1 / 0, queue="broken")
+
+    text = registry.render()
+    assert 'stage_seconds_bucket{stage="decode",le="0.1"} 1.0' in text
+    assert 'stage_seconds_bucket{stage="decode",le="1.0"} 2.0' in text
+    assert 'stage_seconds_bucket{stage="decode",le="+Inf"} 3.0' in text
+    assert 'stage_seconds_count{stage="decode"} 3.0' in text
+    assert 'queue_depth{queue="writes"} 3.0' in text
+    assert "broken" not in text
+
+    with pytest.raises(ValueError):
+        histogram.observe(1.0, wrong="label")
+
+
+@pytest.mark.asyncio
+async def test_upstream_calls_are_timed():
+    transport = TimedTransport(
+        "test-upstream", httpx.MockTransport(lambda request: httpx.Response(404))
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        await client.get("https://example.invalid/track")
+    assert UPSTREAM_REQUEST_SECONDS.count(service="test-upstream", status="404") == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    await client.get("/health/startup")
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'route="/health/startup"' in body
+    assert 'queue_depth{queue="history_writes"}' in body
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.services.mood_inference import MoodInferenceBatcher
+from app.utils.audio_model_handler import CLASS_LABELS, AudioModelHandler
+
+
+class FakeMoodModel:
+    """Keras-like model: scores depend on the input so results can be compared."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, batch, batch_size=None, verbose=0):
+        self.batch_sizes.append(len(batch))
+        means = batch.reshape(len(batch), -1).mean(axis=1, keepdims=True)
+        return means * np.linspace(0.1, 1.0, len(CLASS_LABELS))[::-1]
+
+
+@pytest.fixture
+def tracks(tmp_path):
+    sr = 22050
+    t = np.arange(sr * 2) / sr
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"tone_{i}.wav"
+        sf.write(path, 0.3 * np.sin(2 * np.pi * (110 * (i + 1)) * t), sr)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def handler():
+    handler = AudioModelHandler()
+    handler.model = FakeMoodModel()
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_predict_call(handler, tracks):
+    batcher = MoodInferenceBatcher(
+        handler, max_batch_size=32, max_wait=0.5, preprocess_workers=4
+    )
+    try:
+        results = await batcher.predict_many(tracks, top_n=3)
+    finally:
+        await batcher.stop()
+
+    assert handler.model.batch_sizes == [len(tracks)]
+    assert all(len(moods) == 3 for moods in results)
+    assert results[0][0]["mood"] == CLASS_LABELS[0]
+
+    # Same scores as the one-at-a-time path
+    single = handler.predict_moods(tracks[2], top_n=3)
+    assert [m["score"] for m in single] == pytest.approx(
+        [m["score"] for m in results[2]]
+    )
+
+
+def test_predict_moods_batch_chunks_and_skips_bad_input(handler, tracks):
+    results = handler.predict_moods_batch(
+        tracks + [b"not audio"], top_n=2, batch_size=4, workers=2
+    )
+    assert handler.model.batch_sizes == [4, 2]
+    assert all(len(moods) == 2 for moods in results[:-1])
+    assert results[-1] == []
+
+
+def test_window_starts():
+    assert AudioModelHandler.window_starts(20.0, windows=5) == [0.0]
+    assert AudioModelHandler.window_starts(100.0, windows=3) == [0.0, 35.0, 70.0]
+    assert AudioModelHandler.window_starts(100.0, windows=3, hop=10) == [0.0, 10.0, 20.0]
+
+
+def test_windowed_prediction_scores_whole_track_in_one_batch(handler, tmp_path):
+    sr = 22050
+    t = np.arange(sr * 80) / sr
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t)
+    signal[: sr * 40] *= 0.001  # long quiet intro
+    path = tmp_path / "long.wav"
+    sf.write(path, signal, sr)
+
+    result = handler.predict_moods_windowed(str(path), windows=4, top_n=2)
+
+    assert handler.model.batch_sizes == [4]
+    assert [w["start"] for w in result["timeline"]] == [0.0, 16.667, 33.333, 50.0]
+    assert result["timeline"][-1]["end"] == 80.0
+    assert len(result["moods"]) == 2
+    # Bytes input takes the same path
+    from_bytes = handler.predict_moods_windowed(path.read_bytes(), windows=4, top_n=2)
+    assert from_bytes["moods"][0]["score"] == pytest.approx(result["moods"][0]["score"])
+
+
+def test_windowed_prediction_decodes_unseekable_formats_once(handler, tmp_path, monkeypatch):
+    sr = 22050
+    t = np.arange(sr * 80) / sr
+    path = tmp_path / "long.wav"
+    sf.write(path, 0.3 * np.sin(2 * np.pi * 220 * t), sr)
+    seeked = handler.predict_moods_windowed(path.read_bytes(), windows=4, top_n=2)
+    assert seeked["decode"] == "seek"
+
+    # As on libsndfile builds without MPEG support: no header info for MP3
+    def no_info(*args, **kwargs):
+        raise RuntimeError("Format not recognised.")
+
+    monkeypatch.setattr(sf, "info", no_info)
+    decoded = handler.predict_moods_windowed(path.read_bytes(), windows=4, top_n=2)
+    assert decoded["decode"] == "full"
+    assert [w["start"] for w in decoded["timeline"]] == [0.0, 16.667, 33.333, 50.0]
+    assert decoded["moods"][0]["score"] == pytest.approx(seeked["moods"][0]["score"], rel=1e-3)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from app.services.mood_rules import (
+    DEFAULT_MOOD_RULES,
+    FEATURES,
+    MoodRuleEngine,
+    feature_matrix,
+    features_from_analysis,
+)
+
+
+def legacy_moods(energy_mean, bpm, mode, danceability, spectral_centroid):
+    """The if-statements analyze_core used before the rules table."""
+    moods = []
+    if energy_mean > 0.1 and bpm > 120:
+        moods.append("Energetic")
+    if energy_mean < 0.05 and bpm < 100:
+        moods.append("Calm")
+    if mode == "Major" and bpm > 110:
+        moods.append("Happy")
+    if mode == "Minor" and bpm < 110:
+        moods.append("Melancholic")
+    if danceability > 1.2:
+        moods.append("Danceable")
+    if spectral_centroid < 1500:
+        moods.append("Dark")
+    if spectral_centroid > 3500:
+        moods.append("Bright")
+    return moods
+
+
+def test_default_rules_match_legacy_heuristics():
+    rng = np.random.default_rng(0)
+    n = 5000
+    tracks = [
+        {
+            "energy_mean": float(rng.uniform(0, 0.2)),
+            "bpm": float(rng.uniform(60, 180)),
+            "mode": "Major" if rng.random() > 0.5 else "Minor",
+            "danceability": float(rng.uniform(0.5, 2.0)),
+            "spectral_centroid": float(rng.uniform(500, 5000)),
+        }
+        for _ in range(n)
+    ]
+    results = MoodRuleEngine(DEFAULT_MOOD_RULES).tag(feature_matrix(tracks))
+    assert [r["moods"] for r in results] == [legacy_moods(**t) for t in tracks]
+
+
+def test_nested_analysis_and_missing_features():
+    core = {
+        "bpm": 128.0,
+        "mode": "Major",
+        "energy": {"mean": 0.12},
+        "rhythm": {"danceability": 1.5},
+        "spectral": {"centroid": 4000.0},
+    }
+    assert features_from_analysis(core)["is_major"] == 1.0
+    engine = MoodRuleEngine(DEFAULT_MOOD_RULES)
+    tagged = engine.tag_one(core)
+    assert tagged["moods"] == ["Energetic", "Happy", "Danceable", "Bright"]
+    assert tagged["rules"] == ["energetic", "happy", "danceable", "bright"]
+
+    # Missing features never satisfy a condition
+    assert engine.tag_one({"bpm": 90})["moods"] == []
+    assert feature_matrix([{}]).shape == (1, len(FEATURES))
+
+
+def test_invalid_rules_are_rejected():
+    with pytest.raises(ValueError):
+        MoodRuleEngine([{"id": "x", "mood": "X", "when": {"loudness": {">": 1}}}])
+    with pytest.raises(ValueError):
+        MoodRuleEngine([{"id": "x", "mood": "X", "when": {"bpm": {"~": 1}}}])
+
+
+@pytest.mark.asyncio
+async def test_retag_endpoint_with_new_thresholds(client):
+    tracks = [{"bpm": 125, "energy_mean": 0.08}, {"bpm": 90, "energy_mean": 0.2}]
+    rules = [
+        {"id": "fast", "mood": "Energetic", "when": {"bpm": {">=": 120}}},
+        {"id": "loud", "mood": "Energetic", "when": {"energy_mean": {">": 0.15}}},
+    ]
+    response = await client.post("/analysis/retag", json={"tracks": tracks, "rules": rules})
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"moods": ["Energetic"], "rules": ["fast"]},
+        {"moods": ["Energetic"], "rules": ["loud"]},
+    ]
+
+    bad = await client.post(
+        "/analysis/retag", json={"tracks": tracks, "rules": [{"id": "x"}]}
+    )
+    assert bad.status_code == 400
+
+    bad = await client.post("/analysis/retag", json={"tracks": [tracks[0], {"bpm": "fast"}]})
+    assert bad.status_code == 400
+    assert "Track 1" in bad.json()["detail"] and "bpm" in bad.json()["detail"]
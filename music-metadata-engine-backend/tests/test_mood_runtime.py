@@ -0,0 +1,129 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.utils import mood_model_runtime as runtime
+
+
+def test_resolve_backend_prefers_lightweight_runtimes(tmp_path, monkeypatch):
+    keras_path = tmp_path / "mood.h5"
+    onnx_path = tmp_path / "mood.onnx"
+    tflite_path = tmp_path / "mood.tflite"
+    keras_path.write_bytes(b"h5")
+    paths = dict(
+        keras_path=str(keras_path), onnx_path=str(onnx_path), tflite_path=str(tflite_path)
+    )
+
+    def missing():
+        raise ImportError("not installed")
+
+    monkeypatch.setattr(runtime, "get_tensorflow", lambda: object())
+    monkeypatch.setattr(runtime, "get_onnxruntime", lambda: object())
+    monkeypatch.setattr(runtime, "get_tflite_interpreter", missing)
+
+    assert runtime.resolve_backend("auto", **paths) == ("keras", str(keras_path))
+    onnx_path.write_bytes(b"onnx")
+    assert runtime.resolve_backend("auto", **paths) == ("onnx", str(onnx_path))
+
+    # A runtime that is not installed is skipped in auto mode
+    monkeypatch.setattr(runtime, "get_onnxruntime", missing)
+    tflite_path.write_bytes(b"tflite")
+    assert runtime.resolve_backend("auto", **paths) == ("keras", str(keras_path))
+
+    # An explicit backend is used as configured, or not at all
+    assert runtime.resolve_backend("tflite", **paths) == ("tflite", str(tflite_path))
+    tflite_path.unlink()
+    assert runtime.resolve_backend("tflite", **paths) is None
+
+
+def test_derived_path():
+    assert runtime.derived_path("models/m.h5", "onnx") == "models/m.onnx"
+    assert runtime.derived_path("models/m.h5", "tflite") == "models/m.tflite"
+
+
+class FakeInterpreter:
+    """TFLite-like interpreter that records overlapping calls and echoes its input."""
+
+    def __init__(self, model_path=None, num_threads=None):
+        self.shape = [1, 4]
+        self.active = 0
+        self.overlaps = 0
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": self.shape}]
+
+    def get_output_details(self):
+        return [{"index": 1}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = shape
+
+    def set_tensor(self, index, value):
+        self.active += 1
+        self.overlaps += self.active > 1
+        self.value = value
+
+    def invoke(self):
+        time.sleep(0.002)
+
+    def get_tensor(self, index):
+        self.active -= 1
+        return self.value.sum(axis=1)
+
+
+def test_tflite_predict_is_serialized(monkeypatch):
+    monkeypatch.setattr(runtime, "get_tflite_interpreter", lambda: FakeInterpreter)
+    model = runtime.TFLiteMoodModel("mood.tflite")
+    batches = [np.full((1 + i % 3, 4), i, dtype=np.float32) for i in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outputs = list(pool.map(model.predict, batches))
+    assert model.interpreter.overlaps == 0
+    assert all(np.array_equal(out, b.sum(axis=1)) for out, b in zip(outputs, batches))
+
+
+@pytest.fixture
+def keras_model_path(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    model = tf.keras.Sequential(
+        [
+            tf.keras.layers.Input(shape=(128, 64, 1)),
+            tf.keras.layers.Conv2D(4, 3, activation="relu"),
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(22, activation="sigmoid"),
+        ]
+    )
+    path = tmp_path / "mood.h5"
+    model.save(path)
+    return str(path)
+
+
+def parity_batch():
+    return np.random.default_rng(1).random((3, 128, 64, 1), dtype=np.float32)
+
+
+def test_onnx_export_matches_keras(keras_model_path, tmp_path):
+    pytest.importorskip("tf2onnx")
+    pytest.importorskip("onnxruntime")
+    output = runtime.export_onnx(keras_model_path, str(tmp_path / "mood.onnx"))
+
+    keras_model = runtime.load_backend("keras", keras_model_path)
+    onnx_model = runtime.load_backend("onnx", output)
+    assert runtime.parity(keras_model, onnx_model, parity_batch()) < 1e-4
+
+
+def test_tflite_export_matches_keras(keras_model_path, tmp_path):
+    output = runtime.export_tflite(keras_model_path, str(tmp_path / "mood.tflite"))
+
+    keras_model = runtime.load_backend("keras", keras_model_path)
+    tflite_model = runtime.load_backend("tflite", output)
+    assert runtime.parity(keras_model, tflite_model, parity_batch()) < 1e-4
+    # Quantized weights stay close to the float model
+    quantized = runtime.export_tflite(
+        keras_model_path, str(tmp_path / "mood_int8.tflite"), quantize=True
+    )
+    assert runtime.parity(keras_model, runtime.load_backend("tflite", quantized), parity_batch()) < 0.05
@@ -0,0 +1,91 @@
+import json
+import marshal
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app import metrics
+from app.config import settings
+from app.metrics import ANALYSIS_STAGE_SECONDS
+from app.profiling import ProfileStore, ProfilingMiddleware
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "s3cret")
+    monkeypatch.setattr(metrics, "_observer", metrics._observer)
+    store = ProfileStore(str(tmp_path), max_profiles=2)
+
+    app = FastAPI()
+
+    @app.post("/analysis/slow")
+    async def slow():
+        with ANALYSIS_STAGE_SECONDS.time(stage="decode"):
+            busy(0.03)
+        with ANALYSIS_STAGE_SECONDS.time(stage="core"):
+            busy(0.02)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, paths=["/analysis"], store=store)
+    return app, store
+
+
+@pytest.mark.asyncio
+async def test_profiled_request_stores_speedscope_and_stage_breakdown(profiled):
+    app, store = profiled
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        plain = await client.post("/analysis/slow")
+        wrong = await client.post("/analysis/slow", headers={"X-Profile-Token": "nope"})
+        response = await client.post("/analysis/slow", params={"profile_token": "s3cret"})
+
+    assert "x-profile-id" not in plain.headers
+    assert "x-profile-id" not in wrong.headers
+    assert response.json() == {"ok": True}
+    timing = response.headers["server-timing"]
+    assert timing.startswith("decode;dur=") and ", core;dur=" in timing
+
+    summary = store.get(response.headers["x-profile-id"])
+    assert summary["status"] == 200
+    assert list(summary["breakdown"]) == ["decode", "core"]
+    assert summary["breakdown"]["decode"] >= 0.03
+
+    with open(store.artifact_path(summary["id"])) as f:
+        speedscope = json.load(f)
+    names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+    assert "busy" in names
+    assert speedscope["profiles"][0]["type"] == "sampled"
+
+
+@pytest.mark.asyncio
+async def test_cprofile_engine_and_pruning(profiled, monkeypatch):
+    app, store = profiled
+    monkeypatch.setattr(settings, "PROFILING_ENGINE", "cprofile")
+    headers = {"X-Profile-Token": "s3cret"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        ids = [
+            (await client.post("/analysis/slow", headers=headers)).headers["x-profile-id"]
+            for _ in range(3)
+        ]
+
+    assert store.get(ids[0]) is None  # only the newest two are kept
+    stats = marshal.loads(open(store.artifact_path(ids[-1]), "rb").read())
+    assert any(func[2] == "busy" for func in stats)
+    assert [p["id"] for p in store.list()] == ids[:0:-1]
+    assert store.get("../../etc/passwd") is None
+
+
+@pytest.mark.asyncio
+async def test_profiles_routes_are_gated(client, monkeypatch):
+    assert (await client.get("/profiles")).status_code == 404  # no token configured
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "s3cret")
+    assert (await client.get("/profiles", headers={"X-Profile-Token": "x"})).status_code == 403
+    response = await client.get("/profiles/0123456789abcdef", headers={"X-Profile-Token": "s3cret"})
+    assert response.status_code == 404
@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.main import app
+from app.routes.auth import get_current_user
+from app.services import quota as quota_module
+from app.services.quota import QuotaExceeded, QuotaService, RateLimitExceeded
+
+
+def make_service(tmp_path, **overrides):
+    options = {"default_limit": 10, "rate_limit": 0, "rate_window_seconds": 60}
+    options.update(overrides)
+    return QuotaService(path=str(tmp_path / "quota.db"), **options)
+
+
+def test_consume_is_atomic_across_threads(tmp_path):
+    service = make_service(tmp_path)
+    metadata = {"analysis_count": 2, "analysis_limit": 20}
+
+    def attempt(_):
+        try:
+            service.consume("user-1", metadata)
+            return True
+        except QuotaExceeded:
+            return False
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(attempt, range(40)))
+
+    # Seeded at 2 of 20: exactly 18 requests may pass, however they interleave
+    assert results.count(True) == 18
+    assert service.status("user-1") == {"analysis_count": 20, "analysis_limit": 20}
+
+
+def test_limit_follows_supabase_metadata(tmp_path):
+    service = make_service(tmp_path)
+    service.consume("user-1", {"analysis_count": 0, "analysis_limit": 1})
+    with pytest.raises(QuotaExceeded):
+        service.consume("user-1", {"analysis_count": 0, "analysis_limit": 1})
+    # A plan upgrade raises the limit; the local count is kept
+    assert service.consume("user-1", {"analysis_limit": 5})["analysis_count"] == 2
+
+
+def test_sliding_window_rate_limit(tmp_path, monkeypatch):
+    service = make_service(tmp_path, rate_limit=3, rate_window_seconds=60)
+    now = [6000.0]
+    monkeypatch.setattr(quota_module.time, "time", lambda: now[0])
+
+    for _ in range(3):
+        service.consume("user-1")
+    with pytest.raises(RateLimitExceeded):
+        service.consume("user-1")
+
+    # Halfway into the next window, half of the previous window still counts
+    now[0] += 90
+    service.consume("user-1")
+    with pytest.raises(RateLimitExceeded) as error:
+        service.consume("user-1")
+    assert error.value.retry_after == 30
+    assert service.status("user-1")["analysis_count"] == 4
+
+
+def test_sync_writes_only_changed_counts(tmp_path, monkeypatch):
+    service = make_service(tmp_path)
+    client = MagicMock()
+    monkeypatch.setattr("app.supabase_client.get_supabase", lambda: client)
+
+    service.consume("user-1", {"analysis_count": 3})
+    service.consume("user-2")
+    assert service.sync_to_supabase(batch_size=10) == 2
+    client.auth.admin.update_user_by_id.assert_any_call(
+        "user-1", {"user_metadata": {"analysis_count": 4}}
+    )
+    assert service.sync_to_supabase(batch_size=10) == 0
+
+
+@pytest.mark.asyncio
+async def test_quota_status_endpoint(client, tmp_path, monkeypatch):
+    service = make_service(tmp_path)
+    monkeypatch.setattr(quota_module, "quota_service", service)
+    monkeypatch.setattr("app.routes.quota.quota_service", service)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        id="user-1", user_metadata={"analysis_count": 4, "analysis_limit": 10}
+    )
+    try:
+        response = await client.get("/quota/status")
+        assert response.json() == {"analysis_count": 4, "analysis_limit": 10}
+
+        service.consume("user-1", {"analysis_count": 4, "analysis_limit": 10})
+        response = await client.get("/quota/status")
+        assert response.json() == {"analysis_count": 5, "analysis_limit": 10}
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_gives_the_unit_back(client, tmp_path, monkeypatch):
+    from app.routes import generative
+
+    service = make_service(tmp_path)
+    monkeypatch.setattr("app.dependencies.quota_service", service)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        id="user-1", user_metadata={"analysis_count": 4, "analysis_limit": 10}
+    )
+    outcome = {"fail": True}
+
+    async def generate(prompt, model_name=None, **kwargs):
+        if outcome["fail"]:
+            raise RuntimeError("Gemini is down")
+        return {"visual_prompt": "neon skyline"}
+
+    monkeypatch.setattr(generative.gemini_gateway, "generate", generate)
+    body = {"metadata": {"title": "Song"}}
+    try:
+        response = await client.post("/generate/cover_art_idea", json=body)
+        assert response.status_code == 500
+        assert service.status("user-1")["analysis_count"] == 4
+
+        outcome["fail"] = False
+        response = await client.post("/generate/cover_art_idea", json=body)
+        assert response.status_code == 200
+        assert service.status("user-1")["analysis_count"] == 5
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,15 @@
+import pytest
+from app.utils import result_codec
+from app.utils.result_codec import decode_result, encode_result, result_hash
+
+RESULT = {"title": "Track", "bpm": 120.5, "mfcc": [0.1] * 13, "moods": ["Dark"]}
+
+
+@pytest.mark.parametrize("compressed", [True, False])
+def test_round_trip(monkeypatch, compressed):
+    if not compressed:
+        monkeypatch.setattr(result_codec, "get_zstd", lambda: None)
+    digest, codec, blob, raw_size = encode_result(RESULT)
+    assert digest == result_hash(dict(reversed(list(RESULT.items()))))
+    assert len(blob) < raw_size
+    assert decode_result(codec, blob) == RESULT
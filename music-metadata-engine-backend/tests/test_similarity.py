@@ -0,0 +1,119 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.config import settings
+from app.routes import similar as similar_routes
+from app.services import similarity
+from app.services.similarity import EMBEDDING_DIM, SimilarityIndex
+
+
+def clustered(n, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 3, (clusters, EMBEDDING_DIM))
+    labels = rng.integers(0, clusters, n)
+    return (centers[labels] + rng.normal(0, 1, (n, EMBEDDING_DIM))).astype(np.float32), labels
+
+
+def exact_neighbours(vectors, query, k):
+    mean, std = vectors.mean(axis=0), vectors.std(axis=0) + 1e-6
+    z = (vectors - mean) / std * similarity.GROUP_WEIGHTS
+    distances = ((z - z[query]) ** 2).sum(axis=1)
+    distances[query] = np.inf
+    return set(np.argsort(distances)[:k].tolist())
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    idx = SimilarityIndex(str(tmp_path / "similarity"))
+    monkeypatch.setattr(similar_routes, "similarity_index", idx)
+    monkeypatch.setattr(similarity, "similarity_index", idx)
+    yield idx
+    idx.close()
+
+
+def test_ivf_recall_and_incremental_insert(index, monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_IVF_MIN_ROWS", 1000)
+    vectors, _ = clustered(3000)
+    index.add_many([(f"t{i}", v, f"track {i}", None) for i, v in enumerate(vectors)])
+    assert index.stats()["mode"] == "flat"  # training runs in the background
+    index.wait_for_training()
+    stats = index.stats()
+    assert stats["mode"] == "ivf" and stats["tracks"] == 3000
+
+    recall = []
+    for query in range(0, 3000, 150):
+        found = {int(r["key"][1:]) for r in index.similar(f"t{query}", k=10)}
+        recall.append(len(found & exact_neighbours(vectors, query, 10)) / 10)
+    assert np.mean(recall) >= 0.9
+
+    # A new track is searchable immediately, without retraining
+    index.add("new", vectors[42] + 0.01, "new")
+    assert index.similar("t42", k=1)[0]["key"] == "new"
+    assert index.stats()["trained_rows"] == stats["trained_rows"]
+
+    # Re-adding a key replaces its embedding
+    index.add("new", vectors[7] + 0.01, "new")
+    assert index.similar("t7", k=1)[0]["key"] == "new"
+    assert index.stats()["tracks"] == 3001
+
+
+def test_index_reopens_from_disk(index):
+    vectors, labels = clustered(200)
+    index.add_many(
+        [(f"t{i}", v, None, {"cluster": int(c)}) for i, (v, c) in enumerate(zip(vectors, labels))]
+    )
+    reopened = SimilarityIndex(index.directory)
+    results = reopened.similar("t0", k=5)
+    assert [r["metadata"]["cluster"] for r in results] == [int(labels[0])] * 5
+    assert reopened.similar("missing") is None
+    reopened.close()
+
+
+def test_writers_sharing_a_directory(index, monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_IVF_MIN_ROWS", 200)
+    vectors, _ = clustered(800, seed=1)
+    other = SimilarityIndex(index.directory)
+
+    def insert(idx, start):
+        for i in range(start, len(vectors), 2):
+            idx.add(f"t{i}", vectors[i])
+
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(insert, [index, other], [0, 1]))
+    index.wait_for_training()
+    other.wait_for_training()
+    other.close()
+
+    stats = index.stats()
+    assert stats["tracks"] == 800 and stats["mode"] == "ivf"
+    assert [p for p in os.listdir(index.directory) if p.endswith(".tmp.npz")] == []
+    # Rows written by either instance hold the right embedding
+    for query in (0, 1, 400, 799):
+        assert index.search(vectors[query], k=1)[0]["key"] == f"t{query}"
+
+
+def wav(seconds, freq, sr=22050):
+    t = np.arange(int(seconds * sr)) / sr
+    buffer = io.BytesIO()
+    sf.write(buffer, 0.5 * np.sin(2 * np.pi * freq * t), sr, format="WAV")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_similar_endpoints(client, index):
+    for freq in (220, 440, 880):
+        files = {"file": (f"tone{freq}.wav", wav(3, freq), "audio/wav")}
+        response = await client.post("/similar", files=files, data={"add": "true"})
+        assert response.status_code == 200
+    key = response.json()["key"]
+
+    response = await client.get(f"/similar/tracks/{key}", params={"k": 2})
+    assert response.status_code == 200
+    assert [r["name"] for r in response.json()["results"]] == ["tone440.wav", "tone220.wav"]
+    assert (await client.get("/similar/tracks/unknown")).status_code == 404
+    assert (await client.get("/similar/stats")).json()["tracks"] == 3
@@ -0,0 +1,79 @@
+import sys
+import pytest
+from app.routes import health as health_routes
+from app.startup import ImportProfiler
+from app.warmup import WarmupService
+
+
+def test_import_profiler_records_modules(tmp_path, monkeypatch):
+    (tmp_path / "profiled_pkg_mod.py").write_text("import json\nVALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    profiler = ImportProfiler()
+    profiler.start()
+    try:
+        import profiled_pkg_mod  # noqa: F401
+    finally:
+        profiler.stop()
+        sys.modules.pop("profiled_pkg_mod", None)
+
+    assert "profiled_pkg_mod" in profiler.modules
+    report = profiler.report(top=5)
+    assert report["module_count"] >= 1
+    assert report["total_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_warmup_gates_readiness():
+    service = WarmupService()
+
+    @service.step("ok")
+    def _ok():
+        return None
+
+    @service.step("broken")
+    def _broken():
+        raise ImportError("missing optional dependency")
+
+    assert not service.ready
+    await service.run()
+    status = service.status()
+    assert status["ready"]
+    assert status["components"]["ok"]["status"] == "warm"
+    assert status["components"]["broken"]["status"] == "failed"
+
+    await service.run(only=["ok"])
+    assert service.components["broken"]["status"] == "skipped"
+    assert "seconds" in service.components["ok"]
+
+
+@pytest.mark.asyncio
+async def test_ready_endpoint_reports_warmup(client, monkeypatch):
+    service = WarmupService()
+    monkeypatch.setattr(health_routes, "warmup", service)
+
+    @service.step("fast")
+    def _fast():
+        return None
+
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["components"]["fast"]["status"] == "pending"
+
+    await service.run()
+    response = await client.get("/health/ready")
+    assert response.status_code == 200 and response.json()["failed"] == []
+
+
+@pytest.mark.asyncio
+async def test_failed_warmup_step_still_reports_ready(client, monkeypatch):
+    service = WarmupService()
+    monkeypatch.setattr(health_routes, "warmup", service)
+
+    @service.step("crepe")
+    def _crepe():
+        raise ImportError("No module named 'crepe'")
+
+    await service.run()
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["failed"] == ["crepe"]
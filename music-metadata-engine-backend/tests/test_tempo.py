@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.tempo import analyze_rhythm, estimate_tempo_batch, onset_envelope
+
+SR = 22050
+
+
+def clicks(bpm, seconds=20, offbeats=False):
+    y = np.zeros(SR * seconds, dtype=np.float32)
+    click = np.sin(2 * np.pi * 1500 * np.arange(600) / SR) * np.exp(-np.arange(600) / 120)
+    period = 60 / bpm
+    times = np.arange(0, seconds - 0.1, period / 2 if offbeats else period)
+    for t in times:
+        start = int(t * SR)
+        y[start : start + 600] += click[: len(y[start : start + 600])]
+    return y
+
+
+def test_rhythm_from_one_envelope():
+    pytest.importorskip("librosa")
+    rhythm = analyze_rhythm(clicks(123), SR)
+    assert rhythm["bpm"] == pytest.approx(123, abs=1.0)
+    assert rhythm["confidence"] > 0.5 and rhythm["octave"] == 1.0
+    assert len(rhythm["beat_frames"]) == pytest.approx(20 * 123 / 60, abs=4)
+    assert rhythm["onset_env"].ndim == 1 and 0 < rhythm["danceability"] <= 1
+
+
+def test_batch_and_octave_correction(monkeypatch):
+    pytest.importorskip("librosa")
+    envelopes = [onset_envelope(clicks(bpm), SR) for bpm in (90, 140)] + [np.zeros(1000)]
+    batch = estimate_tempo_batch(envelopes, SR)
+    assert [round(t["bpm"]) for t in batch] == [90, 140, 0]
+
+    monkeypatch.setattr(settings, "TEMPO_MAX_BPM", 130.0)
+    assert estimate_tempo_batch(envelopes[1:2], SR)[0]["bpm"] == pytest.approx(70, abs=1)
+    # Offbeat hits make 90 BPM look like 180; raising the floor picks the double
+    monkeypatch.setattr(settings, "TEMPO_MIN_BPM", 100.0)
+    tempo = estimate_tempo_batch([onset_envelope(clicks(90, offbeats=True), SR)], SR)[0]
+    assert tempo["bpm"] == pytest.approx(180, abs=2) and tempo["octave"] == 2.0
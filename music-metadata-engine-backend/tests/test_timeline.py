@@ -0,0 +1,75 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.config import settings
+from app.routes import timeline as timeline_routes
+from app.services import timeline
+from app.services.timeline import TimelineStore, build_pyramid
+
+KEY = "ab" * 32
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = TimelineStore(str(tmp_path / "timelines"))
+    monkeypatch.setattr(timeline_routes, "timeline_store", store)
+    monkeypatch.setattr(timeline, "timeline_store", store)
+    monkeypatch.setattr(settings, "SIMILARITY_ENABLED", False)
+    monkeypatch.setattr(settings, "FEATURE_STORE_ENABLED", False)
+    monkeypatch.setattr(settings, "WAVEFORM_ENABLED", False)
+    return store
+
+
+def test_pyramid_keeps_peaks():
+    curve = np.zeros(1001, dtype=np.float32)
+    curve[777] = 1.0
+    levels = build_pyramid(curve, np.maximum)
+    assert [len(level) for level in levels] == [1001, 501, 251, 126, 63]
+    assert all(level.max() == 1.0 for level in levels)
+    assert build_pyramid(np.arange(128.0))[1][:2].tolist() == [0.5, 2.5]  # mean by default
+
+
+def test_range_query_picks_resolution(store):
+    frames = 10000  # ~232 s at 22050 Hz / 512
+    ramp = np.linspace(0, 1, frames)
+    store.save(KEY, 22050, 512, {"rms": ramp, "centroid": ramp * 4000}, [1.0, 100.0, 200.0])
+
+    full = store.query(KEY, points=20000)
+    assert full["level"] == 0 and len(full["rms"]) == frames
+
+    overview = store.query(KEY, points=500)
+    assert len(overview["rms"]) <= 500 and overview["beats"] == [1.0, 100.0, 200.0]
+
+    zoom = store.query(KEY, start=100.0, end=110.0, points=1000, curves=["centroid"])
+    assert zoom["level"] == 0 and set(zoom) >= {"centroid"} and "rms" not in zoom
+    assert zoom["first_frame_time"] == pytest.approx(100.0, abs=0.03)
+    assert zoom["centroid"][0] == pytest.approx(4000 * 100 / 232.2, rel=0.01)
+    assert zoom["beats"] == [100.0]
+    with pytest.raises(ValueError):
+        store.query(KEY, curves=["pitch"])
+
+
+@pytest.mark.asyncio
+async def test_local_analysis_stores_timeline(client, store):
+    sr = 22050
+    t = np.arange(8 * sr) / sr
+    clicks = (np.sin(2 * np.pi * 1000 * t) * (t % 0.5 < 0.02)).astype(np.float32)
+    buffer = io.BytesIO()
+    sf.write(buffer, clicks, sr, format="WAV")
+    response = await client.post(
+        "/analysis/local-only",
+        files={"file": ("clicks.wav", buffer.getvalue(), "audio/wav")},
+        data={"timeline": "true"},
+    )
+    assert response.status_code == 200
+    info = response.json()["core"]["timeline"]
+    assert info["curves"] == ["rms", "centroid", "onset"] and info["beats"] > 0
+
+    response = await client.get(f"/timeline/{info['key']}", params={"points": 100, "end": 4})
+    body = response.json()
+    assert len(body["rms"]) <= 100 and all(0 <= b <= 4 for b in body["beats"])
+    assert (await client.get("/timeline/" + "0" * 64)).status_code == 404
+    assert (await client.get("/timeline/../../etc")).status_code == 404
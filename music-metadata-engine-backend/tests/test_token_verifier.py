@@ -0,0 +1,101 @@
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+from app.services.token_verifier import InvalidToken, TokenUser, TokenVerifier, token_verifier
+
+SECRET = "test-secret-with-enough-length-for-hs256"
+
+
+def make_token(secret=SECRET, expires_in=3600, **claims):
+    payload = {
+        "sub": "user-1",
+        "aud": "authenticated",
+        "exp": int(time.time()) + expires_in,
+        "email": "a@example.com",
+        "user_metadata": {"analysis_count": 1, "analysis_limit": 10},
+        **claims,
+    }
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def make_verifier(secret=SECRET):
+    return TokenVerifier(
+        jwt_secret=secret,
+        jwks_url=None,
+        cache_ttl_seconds=60,
+        cache_max_entries=2,
+        jwks_ttl_seconds=3600,
+    )
+
+
+def test_local_verification_and_cache(monkeypatch):
+    verifier = make_verifier()
+    token = make_token()
+
+    user = verifier.verify(token)
+    assert isinstance(user, TokenUser)
+    assert user.id == "user-1"
+    assert user.user_metadata["analysis_limit"] == 10
+
+    # Second call is served from the cache without decoding again
+    monkeypatch.setattr(verifier, "decode", lambda _: pytest.fail("not cached"))
+    assert verifier.verify(token) is user
+
+
+def test_rejects_bad_tokens():
+    verifier = make_verifier()
+    with pytest.raises(InvalidToken):
+        verifier.verify(make_token(secret="another-secret-of-sufficient-length"))
+    with pytest.raises(InvalidToken):
+        verifier.verify(make_token(expires_in=-10))
+    with pytest.raises(InvalidToken):
+        verifier.verify(make_token(aud="anon"))
+    with pytest.raises(InvalidToken):
+        verifier.verify("not-a-jwt")
+
+
+def test_lru_eviction():
+    verifier = make_verifier()
+    tokens = [make_token(sub=f"user-{i}") for i in range(3)]
+    for token in tokens:
+        verifier.verify(token)
+    assert len(verifier._cache) == 2
+    assert verifier._cache_get(verifier._cache_key(tokens[0])) is None
+
+
+def test_falls_back_to_supabase_without_secret(monkeypatch):
+    verifier = make_verifier(secret=None)
+    calls = []
+    remote_user = SimpleNamespace(id="user-1", user_metadata={})
+
+    def fetch(token):
+        calls.append(token)
+        return remote_user
+
+    monkeypatch.setattr(verifier, "_fetch_remote", fetch)
+    token = make_token()
+    assert verifier.verify(token) is remote_user
+    assert verifier.verify(token) is remote_user
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_me_endpoint_uses_local_verification(client, monkeypatch):
+    monkeypatch.setattr(token_verifier, "jwt_secret", SECRET)
+    token_verifier.clear()
+    try:
+        response = await client.get(
+            "/auth/me", headers={"Authorization": f"Bearer {make_token()}"}
+        )
+        assert response.status_code == 200
+        assert response.json()["id"] == "user-1"
+
+        response = await client.get(
+            "/auth/me", headers={"Authorization": f"Bearer {make_token(expires_in=-10)}"}
+        )
+        assert response.status_code == 401
+    finally:
+        token_verifier.clear()
@@ -0,0 +1,77 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.config import settings
+from app.routes import waveform as waveform_routes
+from app.services import waveform
+from app.services.waveform import Peaks, PeaksBuilder, WaveformStore, compute_peaks
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = WaveformStore(str(tmp_path / "waveforms"))
+    monkeypatch.setattr(waveform_routes, "waveform_store", store)
+    monkeypatch.setattr(waveform, "waveform_store", store)
+    monkeypatch.setattr(settings, "SIMILARITY_ENABLED", False)
+    monkeypatch.setattr(settings, "FEATURE_STORE_ENABLED", False)
+    return store
+
+
+def test_streaming_matches_single_pass():
+    signal = np.sin(np.linspace(0, 300, 10007)).astype(np.float32) * 0.5
+    whole = PeaksBuilder(8000, 256, bits=16)
+    whole.feed(signal)
+    streamed = PeaksBuilder(8000, 256, bits=16)
+    for i in range(0, len(signal), 1000):  # blocks not aligned to buckets
+        streamed.feed(signal[i : i + 1000])
+    a, b = whole.finish(), streamed.finish()
+    assert a.length == b.length == 40  # 39 full buckets + the tail
+    assert np.array_equal(a.data, b.data)
+    assert a.data.max() == pytest.approx(16384, abs=2) and a.data.min() < -16000
+
+
+def test_dat_format_and_zoom(tmp_path):
+    stereo = np.zeros((1024, 2), dtype=np.float32)
+    stereo[100] = [1.0, 1.0]
+    stereo[700] = [-1.0, 0.0]  # mixed to mono: -0.5
+    path = str(tmp_path / "clip.wav")
+    sf.write(path, stereo, 44100)
+    peaks = compute_peaks(path, samples_per_pixel=256, bits=8)
+    assert peaks.data.tolist() == [0, 127, 0, 0, -64, 0, 0, 0]
+
+    blob = peaks.to_dat()
+    assert struct.unpack("<iIiiI", blob[:20]) == (1, 1, 44100, 256, 4)
+    assert Peaks.from_dat(blob).data.tolist() == peaks.data.tolist()
+    assert peaks.resample(768).data.tolist() == [-64, 127, 0, 0]
+    with pytest.raises(ValueError):
+        peaks.resample(300)
+
+
+@pytest.mark.asyncio
+async def test_analysis_stores_peaks_and_serves_them(client, store):
+    sr = 22050
+    tone = (0.5 * np.sin(2 * np.pi * 220 * np.arange(4 * sr) / sr)).astype(np.float32)
+    buffer = io.BytesIO()
+    sf.write(buffer, tone, sr, format="WAV")
+    response = await client.post(
+        "/analysis/local-only", files={"file": ("tone.wav", buffer.getvalue(), "audio/wav")}
+    )
+    info = response.json()["core"]["waveform"]
+    assert info["length"] == -(-4 * sr // settings.WAVEFORM_SAMPLES_PER_PIXEL)
+
+    response = await client.get(f"/waveform/{info['key']}.json", params={"samples_per_pixel": 512})
+    body = response.json()
+    assert body["length"] == len(body["data"]) // 2 == -(-info["length"] // 2)
+    assert body["bits"] == 8 and max(body["data"]) == 63
+    assert "max-age" in response.headers["cache-control"]
+
+    response = await client.get(f"/waveform/{info['key']}.dat")
+    assert len(response.content) == 20 + 2 * info["length"]
+    etag = response.headers["etag"]
+    response = await client.get(f"/waveform/{info['key']}.dat", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert (await client.get("/waveform/" + "0" * 64 + ".dat")).status_code == 404
@@ -16,7 +16,7 @@ const getAuthToken = (): string | null => {
 // API Base URL configuration
 // In development (local): uses proxy defined in vite.config.ts (relative path)
 // In production (Vercel): points to Hugging Face Backend URL defined in env vars
-const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || '';
+export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || '';
 
 // Generic POST function for our backend
 const post = async <T>(url: string, body: any, isFormData: boolean = false): Promise<T> => {
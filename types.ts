@@ -52,6 +52,9 @@ export interface Metadata {
     vocalStyle?: VocalStyle;
     useCases?: string[];
     structure?: string;
+
+    // SHA-256 of the analyzed file; keys the stored waveform peaks
+    trackKey?: string;
 }
 
 export interface AnalysisRecord {
@@ -38,6 +38,11 @@ export default defineConfig(({ mode }) => {
           target: 'http://127.0.0.1:8001',
           changeOrigin: true,
           secure: false,
+        },
+        '/waveform': {
+          target: 'http://127.0.0.1:8001',
+          changeOrigin: true,
+          secure: false,
         }
       },
     },